@@ -0,0 +1,127 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+
+
+def normalize_query(query: str) -> str:
+    """Case-, whitespace- and trailing-punctuation-insensitive cache key"""
+    return re.sub(r"\s+", " ", query.strip().lower()).rstrip(" ?!.")
+
+
+class AnswerCache:
+    """
+    Two-tier cache for RAG answers.
+
+    Exact tier: keyed on the normalized query.
+    Semantic tier: reuses an answer when the query embedding is within a cosine
+    threshold of a cached one and the guards (extracted constraints such as category
+    and year, plus the laureates named) are identical, so "Physics 1921" never answers
+    "Physics 1922" and one laureate's answer never serves another.
+
+    Entries expire after a TTL, the least recently used are evicted past
+    max_entries, and everything is dropped when the collection fingerprint changes.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, similarity_threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.fingerprint = None
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    # ---------------- MAINTENANCE ----------------
+    def check_fingerprint(self, fingerprint: str):
+        """Drop every entry when the collection has been re-ingested"""
+        with self._lock:
+            if fingerprint != self.fingerprint:
+                if self._entries:
+                    self.invalidations += 1
+                self._entries.clear()
+                self.fingerprint = fingerprint
+
+    def _expired(self, entry: dict) -> bool:
+        return time.monotonic() - entry["created"] > self.ttl_seconds
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    # ---------------- LOOKUP ----------------
+    def get_exact(self, query: str) -> Optional[dict]:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry["result"]
+
+    def get_similar(self, embedding: List[float], guard: dict) -> Optional[dict]:
+        """Best cached answer whose query is close enough and has the same guard"""
+        with self._lock:
+            candidates = [
+                (key, entry) for key, entry in self._entries.items()
+                if entry["guard"] == guard and not self._expired(entry)
+            ]
+            if not candidates:
+                self.misses += 1
+                return None
+
+            query_vector = np.asarray(embedding, dtype=np.float32)
+            query_vector /= np.linalg.norm(query_vector) or 1.0
+            matrix = np.stack([entry["embedding"] for _, entry in candidates])
+            scores = matrix @ query_vector
+            best = int(np.argmax(scores))
+            if scores[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            key, entry = candidates[best]
+            self._entries.move_to_end(key)
+            self.semantic_hits += 1
+            return entry["result"]
+
+    def put(self, query: str, embedding: List[float], guard: dict, result: dict):
+        vector = np.asarray(embedding, dtype=np.float32)
+        vector /= np.linalg.norm(vector) or 1.0
+        with self._lock:
+            key = normalize_query(query)
+            self._entries[key] = {
+                "result": result,
+                "embedding": vector,
+                "guard": guard,
+                "created": time.monotonic()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # ---------------- STATS ----------------
+    def stats(self) -> dict:
+        hits = self.exact_hits + self.semantic_hits
+        total = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
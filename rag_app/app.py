@@ -1,8 +1,10 @@
 import streamlit as st
 import pandas as pd
 import os
-import requests
 from retrieval_pipeline import RetrievalPipeline
+from backends import check_backends, embedding_model_name, llm_model_name
+from metrics import registry as metrics
+import collection_versions
 import config
 
 # ---------------- PAGE CONFIG ----------------
@@ -17,20 +19,41 @@ with st.sidebar:
     st.title("🏆 Nobel Prize RAG")
     st.markdown("---")
 
-    # Vector DB Status
-    db_exists = os.path.exists(config.CHROMA_PERSIST_DIRECTORY)
-    db_status = "🟢 Ready" if db_exists and os.listdir(config.CHROMA_PERSIST_DIRECTORY) else "🔴 Not Found"
+    # Vector DB Status: the published collection version (a reindex in progress doesn't change it)
+    db_ready = collection_versions.is_ready()
+    db_version = collection_versions.current_version()
+    db_status = "🟢 Ready" if db_ready else "🔴 Not Found"
     st.write(f"**Vector DB:** {db_status}")
+    if db_ready and db_version:
+        st.caption(f"Version {db_version}")
+    # Filled in once the pipeline is loaded (below)
+    warmup_placeholder = st.empty()
 
     st.markdown("---")
 
     # Models
     st.subheader("🤖 Models")
-    st.write(f"**LLM:** {config.OLLAMA_LLM_MODEL}")
-    st.write(f"**Embeddings:** {config.OLLAMA_EMBEDDING_MODEL}")
+    st.write(f"**LLM:** {llm_model_name()} ({config.LLM_BACKEND})")
+    st.write(f"**Embeddings:** {embedding_model_name()} ({config.EMBEDDING_BACKEND})")
 
     st.markdown("---")
 
+    # Per-stage latencies of this process (updated on every rerun)
+    if config.SHOW_METRICS_IN_SIDEBAR and metrics.enabled:
+        st.subheader("📊 Metrics")
+        stages = metrics.summaries("rag_stage_seconds")
+        if stages:
+            st.dataframe(
+                pd.DataFrame([
+                    {"stage": stage, "count": s["count"], "p50 (ms)": s["p50"] * 1000, "p95 (ms)": s["p95"] * 1000}
+                    for stage, s in sorted(stages.items())
+                ]).round(1),
+                hide_index=True
+            )
+        else:
+            st.caption("No requests yet")
+        st.markdown("---")
+
     # Clear chat
     if st.button("🔄 Clear Chat"):
         st.session_state.messages = []
@@ -40,20 +63,15 @@ with st.sidebar:
 st.title("🏆 Nobel Prize RAG Assistant")
 st.write("Ask questions about Nobel Prize winners, categories, and years.")
 
-# ---------------- CHECK OLLAMA ----------------
-def check_ollama():
-    try:
-        response = requests.get(f"{config.OLLAMA_BASE_URL}/api/tags", timeout=2)
-        return response.status_code == 200
-    except:
-        return False
-
-if not check_ollama():
-    st.error("🔴 Ollama is not running. Please run: `ollama serve`")
+# ---------------- CHECK BACKENDS ----------------
+unhealthy = [(kind, name, message) for kind, name, ok, message in check_backends() if not ok]
+if unhealthy:
+    for kind, name, message in unhealthy:
+        st.error(f"🔴 {name} ({kind}): {message}")
     st.stop()
 
 # ---------------- CHECK VECTOR DB ----------------
-if not os.path.exists(config.CHROMA_PERSIST_DIRECTORY) or not os.listdir(config.CHROMA_PERSIST_DIRECTORY):
+if not db_ready:
     st.error("🔴 Vector database not found. Run: `python main.py ingest`")
     
     if os.path.exists(config.CSV_FILE_PATH):
@@ -67,10 +85,26 @@ if not os.path.exists(config.CHROMA_PERSIST_DIRECTORY) or not os.listdir(config.
 # ---------------- LOAD PIPELINE ----------------
 @st.cache_resource
 def load_pipeline():
-    return RetrievalPipeline()
+    pipeline = RetrievalPipeline()
+    if config.WARMUP_ENABLED:
+        # Pre-load the index and models in the background; the UI renders meanwhile
+        pipeline.start_warm_up()
+    return pipeline
 
 pipeline = load_pipeline()
 
+# Readiness (refreshed on every rerun)
+warmup = pipeline.warmup_status
+if warmup["state"] == "warming":
+    warmup_placeholder.write("**Pipeline:** 🟡 Warming up...")
+elif warmup["state"] == "ready":
+    warmup_placeholder.write(f"**Pipeline:** 🟢 Ready (warm-up {warmup['total']:.1f}s)")
+elif warmup["state"] == "failed":
+    with warmup_placeholder.container():
+        st.write("**Pipeline:** 🟠 Ready, warm-up incomplete")
+        for step, error in warmup["errors"].items():
+            st.caption(f"{step}: {error}")
+
 # ---------------- SESSION STATE ----------------
 if "messages" not in st.session_state:
     st.session_state.messages = []
@@ -79,6 +113,8 @@ if "messages" not in st.session_state:
 for msg in st.session_state.messages:
     with st.chat_message(msg["role"]):
         st.markdown(msg["content"])
+        if msg.get("timing"):
+            st.caption(msg["timing"])
         # Display sources for assistant messages
         if msg["role"] == "assistant" and "sources" in msg:
             with st.expander(f"Sources ({len(msg['sources'])})"):
@@ -99,33 +135,37 @@ if prompt := st.chat_input("Ask about Nobel Prize..."):
 
     # Generate assistant response
     with st.chat_message("assistant"):
-        with st.spinner("Searching..."):
-            try:
-                # Get answer + sources
-                result = pipeline.ask_with_sources(prompt)
-                st.markdown(result['answer'])
-
-                # Save assistant message with sources
-                st.session_state.messages.append({
-                    "role": "assistant",
-                    "content": result['answer'],
-                    "sources": result.get('source_documents', [])
-                })
-
-                # Show sources in expander
-                # if result.get('source_documents'):
-                #     with st.expander(f"📚 Sources ({len(result['source_documents'])})"):
-                #         for i, doc in enumerate(result['source_documents'], 1):
-                #             name = doc['metadata'].get('fullName', doc['metadata'].get('orgName', 'Unknown'))
-                #             st.markdown(f"**Source {i}:** {name}")
-                #             st.markdown(f"*Category: {doc['metadata'].get('category', 'N/A')}*")
-                #             st.markdown(f"*Year: {doc['metadata'].get('awardYear', 'N/A')}*")
-                #             st.markdown(f"```\n{doc['content'][:200]}...\n```")
-
-            except Exception as e:
-                response = f" Error: {str(e)}"
-                st.error(response)
-                st.session_state.messages.append({"role": "assistant", "content": response, "sources": []})
+        try:
+            # Retrieval happens up front; the answer is then streamed token by token
+            with st.spinner("Searching..."):
+                stream = pipeline.stream_with_sources(prompt)
+
+            placeholder = st.empty()
+            with placeholder.container():
+                streamed = st.write_stream(stream)
+
+            # The hallucination guard may replace the streamed text once it is complete
+            if stream.answer != streamed:
+                placeholder.markdown(stream.answer)
+
+            timing = (
+                f"First token {stream.timings['time_to_first_token']:.2f}s · "
+                f"total {stream.timings['total']:.2f}s"
+            )
+            st.caption(timing)
+
+            # Save assistant message with sources
+            st.session_state.messages.append({
+                "role": "assistant",
+                "content": stream.answer,
+                "sources": stream.source_documents,
+                "timing": timing
+            })
+
+        except Exception as e:
+            response = f" Error: {str(e)}"
+            st.error(response)
+            st.session_state.messages.append({"role": "assistant", "content": response, "sources": []})
 
 # ---------------- WELCOME SECTION ----------------
 if not st.session_state.messages:
@@ -142,7 +182,7 @@ if not st.session_state.messages:
 st.markdown("---")
 st.markdown(
     "<div style='text-align: center; color: gray;'>"
-    "Powered by Ollama + LangChain + ChromaDB"
+    "Powered by LangChain + ChromaDB"
     "</div>",
     unsafe_allow_html=True
 )
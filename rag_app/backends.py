@@ -0,0 +1,224 @@
+import importlib.util
+import os
+from typing import Callable, Dict, List, Tuple
+import config
+
+# Model classes and client libraries are imported inside the factories, so the registry
+# (model names, health checks) is cheap to import, e.g. for the Streamlit sidebar
+
+
+# ---------------- REGISTRY ----------------
+class Backend:
+    """
+    A named backend: factory, model name for cache keys/manifests, a health check,
+    an optional warm-up hook called with a created instance, and for remote backends
+    the name of the transport (transport.py) its calls go through
+    """
+
+    def __init__(self, name: str, factory: Callable, model_name: Callable[[], str],
+                 health_check: Callable[[], Tuple[bool, str]], warm_up: Callable = None,
+                 transport: str = None):
+        self.name = name
+        self.factory = factory
+        self.model_name = model_name
+        self.health_check = health_check
+        self.warm_up = warm_up
+        self.transport = transport
+
+
+EMBEDDING_BACKENDS: Dict[str, Backend] = {}
+LLM_BACKENDS: Dict[str, Backend] = {}
+
+
+def _always_ok() -> Tuple[bool, str]:
+    return True, "in-process"
+
+
+def register_embedding_backend(name: str, model_name: Callable[[], str], health_check: Callable = _always_ok,
+                               transport: str = None):
+    def decorator(factory):
+        EMBEDDING_BACKENDS[name] = Backend(name, factory, model_name, health_check, transport=transport)
+        return factory
+    return decorator
+
+
+def register_llm_backend(name: str, model_name: Callable[[], str], health_check: Callable = _always_ok,
+                         warm_up: Callable = None, transport: str = None):
+    def decorator(factory):
+        LLM_BACKENDS[name] = Backend(name, factory, model_name, health_check, warm_up, transport)
+        return factory
+    return decorator
+
+
+def _lookup(registry: Dict[str, Backend], name: str, kind: str) -> Backend:
+    if name not in registry:
+        raise ValueError(f"Unknown {kind} backend: {name} (available: {', '.join(sorted(registry))})")
+    return registry[name]
+
+
+# ---------------- HEALTH CHECKS ----------------
+def check_ollama() -> Tuple[bool, str]:
+    import requests
+    try:
+        response = requests.get(f"{config.OLLAMA_BASE_URL}/api/tags", timeout=2)
+    except requests.RequestException:
+        return False, "Ollama is not running. Please run: `ollama serve`"
+    if response.status_code != 200:
+        return False, f"Ollama returned HTTP {response.status_code}"
+    return True, config.OLLAMA_BASE_URL
+
+
+def check_groq() -> Tuple[bool, str]:
+    if not config.GROQ_API_KEY:
+        return False, "GROQ_API_KEY is not set"
+    return True, "API key configured"
+
+
+def check_local_embeddings() -> Tuple[bool, str]:
+    if importlib.util.find_spec("model2vec") is None:
+        return False, "model2vec is not installed: pip install model2vec"
+    return True, "in-process"
+
+
+# ---------------- WARM-UP HOOKS ----------------
+def warm_up_groq(llm):
+    """Open the pooled HTTPS connection with a free API call (lists models) on the transport's client"""
+    from transport import get_transport
+    base_url = (llm.groq_api_base or os.getenv("GROQ_BASE_URL") or "https://api.groq.com").rstrip("/")
+    get_transport("groq").http_client().get(
+        f"{base_url}/openai/v1/models",
+        headers={"Authorization": f"Bearer {llm.groq_api_key.get_secret_value()}"}
+    ).raise_for_status()
+
+
+def warm_up_ollama_llm(llm):
+    """Ask Ollama to load the chat model into memory (a generate request without a prompt)"""
+    import requests
+    requests.post(
+        f"{config.OLLAMA_BASE_URL}/api/generate",
+        json={"model": config.OLLAMA_LLM_MODEL},
+        timeout=120
+    ).raise_for_status()
+
+
+# ---------------- BACKENDS ----------------
+@register_embedding_backend("ollama", model_name=lambda: config.OLLAMA_EMBEDDING_MODEL, health_check=check_ollama,
+                            transport="ollama")
+def _ollama_embeddings():
+    from langchain_ollama import OllamaEmbeddings
+    from transport import get_transport
+    # The ollama client builds its own httpx clients; size their keep-alive pools
+    # and timeouts like the shared transport's
+    client_kwargs = get_transport("ollama").httpx_options()
+    return OllamaEmbeddings(
+        model=config.OLLAMA_EMBEDDING_MODEL,
+        base_url=config.OLLAMA_BASE_URL,
+        client_kwargs=client_kwargs,
+        async_client_kwargs=client_kwargs
+    )
+
+
+@register_embedding_backend("local", model_name=lambda: config.LOCAL_EMBEDDING_MODEL, health_check=check_local_embeddings)
+def _local_embeddings():
+    from local_models import LocalEmbeddings
+    return LocalEmbeddings(config.LOCAL_EMBEDDING_MODEL, batch_size=config.LOCAL_EMBEDDING_BATCH_SIZE)
+
+
+@register_embedding_backend("stub", model_name=lambda: f"stub-hashing-{config.STUB_EMBEDDING_DIMENSIONS}")
+def _stub_embeddings():
+    from local_models import HashingEmbeddings
+    return HashingEmbeddings(dimensions=config.STUB_EMBEDDING_DIMENSIONS)
+
+
+@register_llm_backend("groq", model_name=lambda: config.GROQ_MODEL, health_check=check_groq, warm_up=warm_up_groq,
+                      transport="groq")
+def _groq_llm():
+    from langchain_groq import ChatGroq
+    from transport import get_transport
+    transport = get_transport("groq")
+    return ChatGroq(
+        model=config.GROQ_MODEL,
+        temperature=0.7,
+        http_client=transport.http_client(),
+        http_async_client=transport.http_async_client(),
+        # Retries are done by the transport, which also honours Retry-After
+        max_retries=0
+    )
+
+
+@register_llm_backend("ollama", model_name=lambda: config.OLLAMA_LLM_MODEL, health_check=check_ollama,
+                      warm_up=warm_up_ollama_llm, transport="ollama")
+def _ollama_llm():
+    from langchain_ollama import ChatOllama
+    from transport import get_transport
+    client_kwargs = get_transport("ollama").httpx_options()
+    return ChatOllama(
+        model=config.OLLAMA_LLM_MODEL,
+        base_url=config.OLLAMA_BASE_URL,
+        temperature=0.0,
+        top_p=0.9,
+        num_ctx=4096,
+        client_kwargs=client_kwargs,
+        async_client_kwargs=client_kwargs
+    )
+
+
+@register_llm_backend("stub", model_name=lambda: "echo-stub")
+def _stub_llm():
+    from local_models import EchoChatModel
+    return EchoChatModel()
+
+
+# ---------------- FACTORIES ----------------
+def embedding_model_name(name: str = None) -> str:
+    """Identifies the embedding model in cache keys and the ingest manifest"""
+    return _lookup(EMBEDDING_BACKENDS, name or config.EMBEDDING_BACKEND, "embedding").model_name()
+
+
+def llm_model_name(name: str = None) -> str:
+    return _lookup(LLM_BACKENDS, name or config.LLM_BACKEND, "LLM").model_name()
+
+
+def create_embeddings(name: str = None):
+    """Embeddings of a remote backend are wrapped so their calls go through its transport"""
+    backend = _lookup(EMBEDDING_BACKENDS, name or config.EMBEDDING_BACKEND, "embedding")
+    embeddings = backend.factory()
+    if backend.transport is None:
+        return embeddings
+    from transport import ResilientEmbeddings, get_transport
+    return ResilientEmbeddings(embeddings, get_transport(backend.transport))
+
+
+def create_llm(name: str = None):
+    backend = _lookup(LLM_BACKENDS, name or config.LLM_BACKEND, "LLM")
+    llm = backend.factory()
+    if backend.transport is None:
+        return llm
+    from transport import ResilientChatModel, get_transport
+    return ResilientChatModel(inner=llm, transport=get_transport(backend.transport))
+
+
+def warm_up_llm(llm, name: str = None):
+    """Run the LLM backend's warm-up hook, if it has one"""
+    backend = _lookup(LLM_BACKENDS, name or config.LLM_BACKEND, "LLM")
+    if backend.warm_up is not None:
+        # Hooks take the backend's own model, not the transport wrapper
+        inner = getattr(llm, "inner", llm)
+        if backend.transport is not None:
+            from transport import get_transport
+            get_transport(backend.transport).call(backend.warm_up, inner)
+        else:
+            backend.warm_up(inner)
+
+
+def check_backends() -> List[Tuple[str, str, bool, str]]:
+    """Health of the configured backends as (kind, name, ok, message) tuples"""
+    results = []
+    for kind, registry, name in (
+        ("embeddings", EMBEDDING_BACKENDS, config.EMBEDDING_BACKEND),
+        ("llm", LLM_BACKENDS, config.LLM_BACKEND),
+    ):
+        backend = _lookup(registry, name, kind)
+        ok, message = backend.health_check()
+        results.append((kind, name, ok, message))
+    return results
@@ -0,0 +1,131 @@
+"""
+Benchmark: column-wise build_documents vs the original iterrows loop.
+
+Run from rag_app/:
+    python -m benchmarks.csv_builder --factors 1 10 100
+"""
+import argparse
+import time
+import pandas as pd
+from langchain_core.documents import Document
+from typing import List
+from utils import build_documents, row_keys
+import config
+
+
+def build_documents_rowwise(df: pd.DataFrame, metadata_columns: List[str], source: str) -> List[Document]:
+    """Original iterrows implementation, kept as the reference for build_documents"""
+    documents = []
+    keys = row_keys(df)
+    
+    for idx, row in df.iterrows():
+        text_parts = []
+        
+        # Laureate/Organization name
+        if pd.notna(row.get('fullName')):
+            text_parts.append(f"Laureate: {row['fullName']}")
+        elif pd.notna(row.get('orgName')):
+            text_parts.append(f"Organization: {row['orgName']}")
+
+        # Prize information
+        if pd.notna(row.get('awardYear')):
+            text_parts.append(f"Year: {row['awardYear']}")
+        if pd.notna(row.get('category')):
+            text_parts.append(f"Category: {row['category']}")
+        if pd.notna(row.get('categoryFullName')):
+            text_parts.append(f"Category Full Name: {row['categoryFullName']}")
+        if pd.notna(row.get('motivation')):
+            text_parts.append(f"Motivation: {row['motivation']}")
+        if pd.notna(row.get('prizeAmount')):
+            text_parts.append(f"Prize Amount: {row['prizeAmount']} SEK")
+        if pd.notna(row.get('dateAwarded')):
+            text_parts.append(f"Date Awarded: {row['dateAwarded']}")
+        
+        # Personal information
+        if pd.notna(row.get('gender')):
+            text_parts.append(f"Gender: {row['gender']}")
+        if pd.notna(row.get('birth_date')):
+            text_parts.append(f"Birth Date: {row['birth_date']}")
+        if pd.notna(row.get('birth_city')):
+            birth_info = f"Birth Place: {row['birth_city']}"
+            if pd.notna(row.get('birth_country')):
+                birth_info += f", {row['birth_country']}"
+            text_parts.append(birth_info)
+        
+        # Organizational information
+        if pd.notna(row.get('orgName')):
+            if pd.notna(row.get('acronym')):
+                text_parts.append(f"Acronym: {row['acronym']}")
+            if pd.notna(row.get('org_founded_date')):
+                text_parts.append(f"Founded: {row['org_founded_date']}")
+        
+        # Affiliations
+        for i in range(1, 5):
+            col = f'affiliation_{i}'
+            if col in row and pd.notna(row[col]):
+                text_parts.append(f"Affiliation {i}: {row[col]}")
+        
+        # Type of laureate
+        if pd.notna(row.get('ind_or_org')):
+            text_parts.append(f"Type: {row['ind_or_org']}")
+        
+        if text_parts:
+            combined_text = "\n".join(text_parts)
+            
+            metadata = {}
+            for col in metadata_columns:
+                if col in row and pd.notna(row[col]):
+                    metadata[col] = str(row[col])
+            
+            metadata["row_index"] = idx
+            metadata["row_key"] = keys[idx]
+            metadata["source"] = source
+            
+            doc = Document(page_content=combined_text, metadata=metadata)
+            documents.append(doc)
+    
+    return documents
+
+
+def enlarge(df: pd.DataFrame, factor: int) -> pd.DataFrame:
+    """Repeat the laureate rows factor times with a fresh RangeIndex"""
+    return pd.concat([df] * factor, ignore_index=True)
+
+
+def time_builder(builder, df: pd.DataFrame, repeat: int):
+    best = float("inf")
+    documents = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        documents = builder(df, config.METADATA_COLUMNS, source=str(config.CSV_FILE_PATH))
+        best = min(best, time.perf_counter() - start)
+    return best, documents
+
+
+def same_output(left, right) -> bool:
+    return len(left) == len(right) and all(
+        a.page_content == b.page_content and list(a.metadata.items()) == list(b.metadata.items())
+        for a, b in zip(left, right)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    base = pd.read_csv(config.CSV_FILE_PATH)
+    print(f"{'rows':>8} {'iterrows (s)':>13} {'vectorized (s)':>15} {'speedup':>8}  identical")
+    for factor in args.factors:
+        df = enlarge(base, factor)
+        rowwise_time, rowwise_docs = time_builder(build_documents_rowwise, df, args.repeat)
+        vectorized_time, vectorized_docs = time_builder(build_documents, df, args.repeat)
+        print(
+            f"{len(df):>8} {rowwise_time:>13.3f} {vectorized_time:>15.3f} "
+            f"{rowwise_time / vectorized_time:>7.1f}x  {same_output(rowwise_docs, vectorized_docs)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark: embedding backends on the same corpus (HTTP Ollama vs in-process models).
+
+Embeds every document rendered from nobel.csv in BATCH_SIZE batches, then times
+single-query embeddings, for each healthy backend. No embedding cache is used.
+
+Run from rag_app/:
+    python -m benchmarks.embedding_backends --backends ollama local stub
+"""
+import argparse
+import time
+from backends import EMBEDDING_BACKENDS, create_embeddings
+from utils import iter_batches, iter_csv_documents, percentile
+import config
+
+
+def bench_backend(name: str, texts, queries) -> dict:
+    start = time.perf_counter()
+    embeddings = create_embeddings(name)
+    load_time = time.perf_counter() - start
+
+    call_times = []
+    start = time.perf_counter()
+    for batch in iter_batches(texts, config.BATCH_SIZE):
+        call_start = time.perf_counter()
+        embeddings.embed_documents(batch)
+        call_times.append(time.perf_counter() - call_start)
+    corpus_time = time.perf_counter() - start
+
+    query_times = []
+    for query in queries:
+        call_start = time.perf_counter()
+        embeddings.embed_query(query)
+        query_times.append(time.perf_counter() - call_start)
+
+    return {
+        "backend": name,
+        "load_s": load_time,
+        "corpus_s": corpus_time,
+        "texts_per_s": len(texts) / corpus_time if corpus_time else 0.0,
+        "batch_p50_ms": percentile(call_times, 50) * 1000,
+        "query_p50_ms": percentile(query_times, 50) * 1000,
+        "query_p95_ms": percentile(query_times, 95) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backends", nargs="+", default=sorted(EMBEDDING_BACKENDS))
+    parser.add_argument("--queries", type=int, default=50)
+    args = parser.parse_args()
+
+    texts = [doc.page_content for doc in iter_csv_documents(str(config.CSV_FILE_PATH), config.METADATA_COLUMNS)]
+    queries = [f"Who won the Nobel Prize in Physics in {year}?" for year in range(1901, 1901 + args.queries)]
+
+    print(f"Corpus: {len(texts)} documents, batch size {config.BATCH_SIZE}")
+    print(f"{'backend':<10} {'load (s)':>9} {'corpus (s)':>11} {'texts/s':>9} {'batch p50':>10} {'query p50':>10} {'query p95':>10}")
+    for name in args.backends:
+        ok, message = EMBEDDING_BACKENDS[name].health_check()
+        if not ok:
+            print(f"{name:<10} skipped: {message}")
+            continue
+        try:
+            r = bench_backend(name, texts, queries)
+        except Exception as e:
+            print(f"{name:<10} failed: {e}")
+            continue
+        print(
+            f"{r['backend']:<10} {r['load_s']:>9.2f} {r['corpus_s']:>11.2f} {r['texts_per_s']:>9.1f} "
+            f"{r['batch_p50_ms']:>8.1f}ms {r['query_p50_ms']:>8.2f}ms {r['query_p95_ms']:>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Benchmark: sharded ingestion (python main.py ingest --workers N) at 1/2/4/8 workers.
+
+The laureate CSV is enlarged --factor times into a scratch file. With --long-text N
+each motivation is also padded to about N characters over several lines, standing
+in for biographies and lecture text: rows are then split into several chunks, and
+the CSV has quoted multi-line fields for the shard planner to keep whole.
+
+Chunk stage: wall-clock time to produce every chunk (CSV parse, document build,
+splitting) with IngestionPipeline.iter_chunks, and whether the chunk ids and
+content hashes are identical to the single-process run.
+
+--full additionally runs the whole ingest per worker count in a fresh interpreter,
+into a scratch DB, and compares the resulting manifests (chunk id -> hash).
+
+Run from rag_app/ (offline with the stub backends):
+    EMBEDDING_BACKEND=stub python -m benchmarks.ingest_scaling --factor 20 --long-text 3000
+    EMBEDDING_BACKEND=stub python -m benchmarks.ingest_scaling --factor 5 --full
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def build_csv(path: str, factor: int, long_text: int):
+    import pandas as pd
+    import config
+    df = pd.read_csv(config.CSV_FILE_PATH, dtype=str)
+    df = pd.concat([df] * factor, ignore_index=True)
+    if long_text:
+        motivation = df["motivation"].fillna("")
+        paragraph = (motivation + ".\n").where(motivation != "", "No motivation recorded.\n")
+        df["motivation"] = (paragraph * (long_text // paragraph.str.len().clip(lower=1) + 1)).str[:long_text]
+    df.to_csv(path, index=False)
+    return len(df)
+
+
+def chunk_run(csv_path: str, workers: int) -> dict:
+    from ingestion_pipeline import IngestionPipeline
+    from utils import compute_chunk_hash
+    pipeline = IngestionPipeline(workers=workers)
+    start = time.perf_counter()
+    hashes = [(chunk.metadata["chunk_id"], compute_chunk_hash(chunk)) for chunk in pipeline.iter_chunks(csv_path)]
+    return {"wall_s": time.perf_counter() - start, "hashes": hashes, "split_stats": dict(pipeline.split_stats)}
+
+
+def full_run(root: Path, csv_path: str, workers: int, env: dict) -> dict:
+    import config
+    with tempfile.TemporaryDirectory(prefix="ingest-scaling-db-") as db_dir:
+        script = (
+            "import config, ingestion_pipeline; "
+            f"config.CSV_FILE_PATH = {csv_path!r}; "
+            f"ingestion_pipeline.main(resume=False, workers={workers})"
+        )
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-c", script], cwd=root, env=dict(env, CHROMA_DB_DIR=db_dir),
+            capture_output=True, text=True, check=True
+        )
+        wall_s = time.perf_counter() - start
+        with open(os.path.join(db_dir, config.COLLECTION_POINTER_FILE), encoding="utf-8") as f:
+            version = json.load(f)["version"]
+        manifest = os.path.join(db_dir, config.COLLECTION_VERSIONS_DIR, version, config.INGEST_MANIFEST_FILE)
+        with open(manifest, encoding="utf-8") as f:
+            chunks = json.load(f)["chunks"]
+    return {"wall_s": wall_s, "chunks": chunks}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--factor", type=int, default=10)
+    parser.add_argument("--long-text", type=int, default=0, help="pad motivations to about this many characters")
+    parser.add_argument("--full", action="store_true", help="also time complete ingests into scratch DBs")
+    parser.add_argument("--json", help="also write the results to this path")
+    args = parser.parse_args()
+
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    results = {"cpus": os.cpu_count(), "chunks": {}, "full": {}}
+    with tempfile.TemporaryDirectory(prefix="ingest-scaling-") as scratch:
+        csv_path = os.path.join(scratch, "laureates.csv")
+        rows = build_csv(csv_path, args.factor, args.long_text)
+        print(f"CSV: {rows} rows, {os.path.getsize(csv_path) / 1e6:.1f} MB | {os.cpu_count()} CPUs")
+
+        print(f"{'workers':>7} {'chunks':>8} {'wall (s)':>9} {'speedup':>8}  identical")
+        baseline = None
+        for workers in args.workers:
+            r = chunk_run(csv_path, workers)
+            baseline = baseline or r
+            identical = r["hashes"] == baseline["hashes"]
+            results["chunks"][workers] = {"wall_s": r["wall_s"], "chunks": len(r["hashes"]), "identical": identical}
+            print(f"{workers:>7} {len(r['hashes']):>8} {r['wall_s']:>9.2f} "
+                  f"{baseline['wall_s'] / r['wall_s']:>7.2f}x  {identical}")
+
+        if args.full:
+            print(f"\nFull ingest ({os.environ.get('EMBEDDING_BACKEND', 'configured')} embeddings)")
+            print(f"{'workers':>7} {'chunks':>8} {'wall (s)':>9} {'speedup':>8}  identical manifest")
+            baseline = None
+            for workers in args.workers:
+                r = full_run(root, csv_path, workers, env)
+                baseline = baseline or r
+                identical = r["chunks"] == baseline["chunks"]
+                results["full"][workers] = {"wall_s": r["wall_s"], "chunks": len(r["chunks"]), "identical": identical}
+                print(f"{workers:>7} {len(r['chunks']):>8} {r['wall_s']:>9.2f} "
+                      f"{baseline['wall_s'] / r['wall_s']:>7.2f}x  {identical}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
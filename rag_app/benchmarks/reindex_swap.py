@@ -0,0 +1,150 @@
+"""
+Benchmark: query latency while the collection is re-ingested (blue/green swap).
+
+A RetrievalPipeline serves retrieve() calls in a loop, single-threaded, while
+`python main.py ingest` rebuilds the collection in another process. Every query's
+latency is recorded with the collection version that served it. The report gives
+latency percentiles by phase:
+
+  before   the reindex has not started
+  reindex  the ingest process is running (the live version keeps serving)
+  swap     published, the new version loading in the background
+  after    the new version serving
+
+It also shows the swap's load time and checks that the ingest garbage-collected old
+versions. On a machine with few cores the ingest process competes with the queries
+for CPU, so "reindex" latency shows that contention as well as any effect of the swap.
+
+Run from rag_app/ after an ingest (offline with the stub backends):
+    EMBEDDING_BACKEND=stub LLM_BACKEND=stub python -m benchmarks.reindex_swap --incremental
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+
+def summarize(latencies) -> dict:
+    ordered = sorted(latencies)
+    if not ordered:
+        return {"count": 0}
+    return {
+        "count": len(ordered),
+        "p50_ms": statistics.median(ordered) * 1000,
+        "p95_ms": ordered[int(0.95 * (len(ordered) - 1))] * 1000,
+        "max_ms": ordered[-1] * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--before", type=float, default=3.0, help="seconds of queries before the reindex")
+    parser.add_argument("--after", type=float, default=3.0, help="seconds of queries after the swap")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reindex incrementally (a copy of the live version with one row changed)")
+    parser.add_argument("--json", help="also write the results to this path")
+    args = parser.parse_args()
+
+    import pandas as pd
+    import config
+    import collection_versions
+    from retrieval_pipeline import RetrievalPipeline
+    from benchmarks.retrieval_eval import generate_queries
+
+    if not collection_versions.is_ready():
+        raise SystemExit("No published collection: run `python main.py ingest` first")
+    df = pd.read_csv(config.CSV_FILE_PATH, dtype=str)
+    queries = [item["query"] for item in generate_queries(df, per_type=max(1, args.queries // 4), seed=7)]
+
+    pipeline = RetrievalPipeline()
+    for query in queries:
+        pipeline.retrieve(query)
+    start_version = pipeline.collection_version
+    print(f"Serving version {start_version} | {len(queries)} queries, warmed")
+
+    samples = []
+
+    def query_for(seconds: float = None, until=None):
+        deadline = time.perf_counter() + seconds if seconds is not None else None
+        i = len(samples)
+        while True:
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            if until is not None and until():
+                return
+            start = time.perf_counter()
+            pipeline.retrieve(queries[i % len(queries)])
+            samples.append((phase, time.perf_counter() - start, pipeline.collection_version))
+            i += 1
+
+    phase = "before"
+    query_for(args.before)
+
+    command = [sys.executable, "main.py", "ingest", "--no-resume"]
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    if args.incremental:
+        # A copy only gets published if something changed: touch one row's motivation
+        scratch_csv = os.path.join(tempfile.mkdtemp(prefix="reindex-swap-"), "laureates.csv")
+        changed = df.copy()
+        changed.loc[0, "motivation"] = f"{changed.loc[0, 'motivation']} (reindex {time.time():.0f})"
+        changed.to_csv(scratch_csv, index=False)
+        command = [sys.executable, "-c",
+                   "import config, ingestion_pipeline; "
+                   f"config.CSV_FILE_PATH = {scratch_csv!r}; "
+                   "ingestion_pipeline.main(incremental=True)"]
+    phase = "reindex"
+    started = time.perf_counter()
+    ingest = subprocess.Popen(command, cwd=Path(__file__).resolve().parent.parent, env=env,
+                              stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    query_for(until=lambda: ingest.poll() is not None)
+    output = ingest.communicate()[0]
+    reindex_s = time.perf_counter() - started
+    if ingest.returncode != 0:
+        print(output)
+        raise SystemExit(f"ingest failed ({ingest.returncode})")
+    published = collection_versions.current_version()
+
+    phase = "swap"
+    query_for(until=lambda: pipeline.collection_version == published)
+    phase = "after"
+    query_for(args.after)
+    if args.incremental:
+        shutil.rmtree(os.path.dirname(scratch_csv), ignore_errors=True)
+
+    results = {
+        "from_version": start_version,
+        "to_version": published,
+        "reindex_s": reindex_s,
+        "swaps": list(pipeline.swap_stats),
+        "versions_on_disk": collection_versions.list_versions(),
+        "phases": {}
+    }
+    print(f"Reindex took {reindex_s:.1f}s; published {published}")
+    for swap in pipeline.swap_stats:
+        print(f"Swap {swap['from']} -> {swap['to']}: loaded in {swap['load_s']:.2f}s off the request path")
+    print(f"Versions on disk: {len(results['versions_on_disk'])} (keep {config.COLLECTION_VERSIONS_KEEP})")
+    print(f"{'phase':<8} {'queries':>8} {'p50 (ms)':>9} {'p95 (ms)':>9} {'max (ms)':>9}  versions served")
+    for name in ("before", "reindex", "swap", "after"):
+        rows = [sample for sample in samples if sample[0] == name]
+        r = results["phases"][name] = summarize([latency for _, latency, _ in rows])
+        served = sorted({version for _, _, version in rows})
+        if r["count"]:
+            print(f"{name:<8} {r['count']:>8} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['max_ms']:>9.2f}  "
+                  f"{', '.join(served)}")
+        else:
+            print(f"{name:<8} {0:>8}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
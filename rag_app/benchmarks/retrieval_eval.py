@@ -0,0 +1,260 @@
+"""
+Benchmark: retrieval quality and latency on a labeled query set generated from nobel.csv.
+
+Ground truth comes from the CSV itself: for every generated query the matching
+rows are known, so a retrieved chunk is relevant when its row_key is one of theirs.
+Query types: category+year, laureate name, organization, birth country.
+
+Reports recall@k, MRR, embedding/search/LLM latency percentiles and retrieval
+throughput, overall and per query type, and writes everything as JSON so runs
+can be compared.
+
+Run from rag_app/ (offline with the stub backends, or with the configured ones):
+    EMBEDDING_BACKEND=stub LLM_BACKEND=stub python main.py bench --ingest
+    python main.py bench --per-type 50 --llm-queries 10 --output before.json
+"""
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+from utils import iter_csv_frames, percentile, row_keys
+import config
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+# ---------------- LABELED QUERIES ----------------
+def _present(value) -> bool:
+    return isinstance(value, str) and value.strip() != ""
+
+
+def generate_queries(df: pd.DataFrame, per_type: int, seed: int) -> list:
+    """Labeled queries as dicts: type, query, relevant (set of CSV row keys)"""
+    rng = random.Random(seed)
+    labeled = []
+
+    def add(query_type, template, groups):
+        keys = sorted(groups)
+        for key in rng.sample(keys, min(per_type, len(keys))):
+            labeled.append({
+                "type": query_type,
+                "query": template.format(*key) if isinstance(key, tuple) else template.format(key),
+                "relevant": set(groups[key])
+            })
+
+    prizes = df[df["category"].map(_present) & df["awardYear"].map(_present)]
+    add("category_year", "Who won the Nobel Prize in {} in {}?",
+        prizes.groupby(["category", "awardYear"]).groups)
+
+    individuals = df[(df["ind_or_org"] == "Individual") & df["fullName"].map(_present)]
+    add("laureate", "What did {} receive the Nobel Prize for?",
+        individuals.groupby("fullName").groups)
+
+    organizations = df[df["orgName"].map(_present)]
+    add("organization", "Which Nobel Prize was awarded to {}?",
+        organizations.groupby("orgName").groups)
+
+    countries = df[df["birth_country"].map(_present)]
+    add("country", "Which Nobel laureates were born in {}?",
+        countries.groupby("birth_country").groups)
+
+    keys = row_keys(df)
+    for item in labeled:
+        item["relevant"] = {keys[i] for i in item["relevant"]}
+    return labeled
+
+
+# ---------------- METRICS ----------------
+def score(relevant: set, retrieved_rows: list) -> dict:
+    """
+    recall@k is normalized by min(|relevant|, k), so a country query with 100
+    relevant rows can still reach 1.0 with k=5. rr is the reciprocal rank of the
+    first relevant chunk (0 when none was retrieved).
+    """
+    k = len(retrieved_rows)
+    hits = len(relevant & set(retrieved_rows))
+    recall = hits / min(len(relevant), k) if k else 0.0
+    rr = next((1 / rank for rank, row in enumerate(retrieved_rows, start=1) if row in relevant), 0.0)
+    return {"recall": recall, "rr": rr}
+
+
+def latency_summary(seconds: list) -> dict:
+    return {
+        "count": len(seconds),
+        "p50_ms": percentile(seconds, 50) * 1000,
+        "p95_ms": percentile(seconds, 95) * 1000,
+        "p99_ms": percentile(seconds, 99) * 1000,
+        "mean_ms": sum(seconds) / len(seconds) * 1000 if seconds else 0.0
+    }
+
+
+def quality_summary(scores: list) -> dict:
+    n = len(scores)
+    return {
+        "queries": n,
+        "recall_at_k": sum(s["recall"] for s in scores) / n if n else 0.0,
+        "mrr": sum(s["rr"] for s in scores) / n if n else 0.0
+    }
+
+
+# ---------------- RUN ----------------
+def run_benchmark(pipeline, labeled: list, llm_queries: int) -> dict:
+    timings = defaultdict(list)
+    scores = defaultdict(list)
+    context_stats = []
+    rerank_stats = []
+
+    wall_start = time.perf_counter()
+    for item in labeled:
+        query = item["query"]
+
+        start = time.perf_counter()
+        embedding = pipeline.embeddings.embed_query(query)
+        timings["embed"].append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        constraints = pipeline.query_analyzer.extract_constraints(query)
+        reranked = len(pipeline.rerank_stats)
+        docs = pipeline.search(embedding, constraints, query)
+        timings["search"].append(time.perf_counter() - start)
+        if len(pipeline.rerank_stats) > reranked:
+            rerank_stats.append(pipeline.rerank_stats[-1])
+            timings["rerank"].append(rerank_stats[-1]["seconds"])
+
+        context = pipeline.build_context(docs, query)
+        if pipeline.context_compressor is not None:
+            context_stats.append(pipeline.context_stats[-1])
+
+        rows = [doc.metadata.get("row_key") for doc in docs]
+        item_score = score(item["relevant"], rows)
+        scores[item["type"]].append(item_score)
+        scores["all"].append(item_score)
+
+        if len(timings["llm"]) < llm_queries:
+            start = time.perf_counter()
+            pipeline.answer_chain.invoke({"context": context, "question": query})
+            timings["llm"].append(time.perf_counter() - start)
+    retrieval_wall = time.perf_counter() - wall_start - sum(timings["llm"])
+
+    return {
+        "quality": {
+            query_type: quality_summary(scores[query_type])
+            for query_type in [t for t in scores if t != "all"] + ["all"]
+        },
+        "latency": {stage: latency_summary(t) for stage, t in timings.items() if t},
+        "throughput_qps": len(labeled) / retrieval_wall if retrieval_wall > 0 else 0.0,
+        "context": context_summary(context_stats),
+        "rerank": rerank_summary(rerank_stats)
+    }
+
+
+def context_summary(stats: list) -> dict:
+    """Mean prompt-context tokens before/after compression (empty when compression is off)"""
+    if not stats:
+        return {}
+    return {
+        key: sum(s[key] for s in stats) / len(stats)
+        for key in ("original_tokens", "context_tokens", "tokens_saved")
+    }
+
+
+def rerank_summary(stats: list) -> dict:
+    """Mean candidates re-scored and chunks kept per query (empty when re-ranking is off)"""
+    if not stats:
+        return {}
+    return {key: sum(s[key] for s in stats) / len(stats) for key in ("candidates", "kept")}
+
+
+def settings_snapshot() -> dict:
+    from backends import embedding_model_name, llm_model_name
+    return {
+        "embedding_backend": config.EMBEDDING_BACKEND,
+        "embedding_model": embedding_model_name(),
+        "llm_backend": config.LLM_BACKEND,
+        "llm_model": llm_model_name(),
+        "chunk_size": config.CHUNK_SIZE,
+        "chunk_overlap": config.CHUNK_OVERLAP,
+        "retrieval_k": config.RETRIEVAL_K,
+        "filtered_retrieval_k": config.FILTERED_RETRIEVAL_K,
+        "hybrid_retrieval": config.HYBRID_RETRIEVAL_ENABLED,
+        "hybrid_candidate_k": config.HYBRID_CANDIDATE_K,
+        "hybrid_weights": [config.HYBRID_VECTOR_WEIGHT, config.HYBRID_SPARSE_WEIGHT],
+        "rrf_k": config.RRF_K,
+        "rerank": config.RERANKER if config.RERANK_ENABLED else None,
+        "rerank_candidates": config.RERANK_CANDIDATES,
+        "rerank_threshold": config.RERANK_THRESHOLD,
+        "context_compression": config.CONTEXT_COMPRESSION_ENABLED,
+        "context_token_budget": config.CONTEXT_TOKEN_BUDGET
+    }
+
+
+def print_report(report: dict):
+    print(f"\n Retrieval benchmark ({report['settings']['embedding_model']}, k={report['settings']['retrieval_k']})")
+    print(f" {'type':<15} {'queries':>7} {'recall@k':>9} {'MRR':>6}")
+    for query_type, quality in report["quality"].items():
+        print(f" {query_type:<15} {quality['queries']:>7} {quality['recall_at_k']:>9.3f} {quality['mrr']:>6.3f}")
+    print(f" {'stage':<15} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for stage, latency in report["latency"].items():
+        print(f" {stage:<15} {latency['p50_ms']:>7.1f}ms {latency['p95_ms']:>7.1f}ms {latency['p99_ms']:>7.1f}ms")
+    print(f" Retrieval throughput: {report['throughput_qps']:.1f} queries/s")
+    if report["context"]:
+        context = report["context"]
+        print(
+            f" Context tokens: {context['original_tokens']:.0f} -> {context['context_tokens']:.0f} "
+            f"({context['tokens_saved']:.0f} saved per query)"
+        )
+    if report.get("rerank"):
+        rerank = report["rerank"]
+        print(f" Re-ranking: {rerank['candidates']:.1f} candidates -> {rerank['kept']:.1f} chunks per query")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--per-type", type=int, default=25, help="queries generated per query type")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--llm-queries", type=int, default=0, help="also time the LLM on the first N queries")
+    parser.add_argument("--ingest", action="store_true", help="run an incremental ingest first")
+    parser.add_argument("--no-rerank", action="store_true", help="disable the re-ranking stage (for comparison)")
+    parser.add_argument("--use-cache", action="store_true", help="keep the embedding cache (off by default so latencies are real)")
+    parser.add_argument("--output", help="JSON report path (default: benchmarks/results/retrieval-<timestamp>.json)")
+    args = parser.parse_args(argv)
+
+    if args.ingest:
+        from ingestion_pipeline import IngestionPipeline
+        IngestionPipeline().run(str(config.CSV_FILE_PATH), incremental=True)
+    if not args.use_cache:
+        config.EMBEDDING_CACHE_ENABLED = False
+    if args.no_rerank:
+        config.RERANK_ENABLED = False
+
+    from retrieval_pipeline import RetrievalPipeline
+    pipeline = RetrievalPipeline()
+    # Components are built on first use; load everything before anything is timed
+    pipeline.warm_up()
+
+    df = pd.concat(iter_csv_frames(str(config.CSV_FILE_PATH), config.CSV_READ_CHUNKSIZE))
+    labeled = generate_queries(df, args.per_type, args.seed)
+    print(f" Generated {len(labeled)} labeled queries (seed {args.seed})")
+
+    report = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "settings": settings_snapshot(),
+        "query_set": {"per_type": args.per_type, "seed": args.seed, "queries": len(labeled)},
+        **run_benchmark(pipeline, labeled, args.llm_queries)
+    }
+    print_report(report)
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"retrieval-{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f" Report written to {output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark: cold-start cost of the CLI and of the Streamlit app's first render.
+
+Each scenario runs in a fresh interpreter with `python -X importtime`; the report
+shows wall time (median of --repeat runs), total import time, and the heaviest
+top-level imports.
+
+Scenarios:
+  main.py          `python main.py` (usage only; what every command pays up front)
+  ingest           main.py + the ingestion pipeline (`python main.py ingest` before any work)
+  streamlit        imports and pipeline construction the app does before its first render
+
+Run from rag_app/ (use --root to measure another checkout, e.g. a git worktree):
+    python -m benchmarks.startup --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SCENARIOS = {
+    "main.py": ["main.py"],
+    "ingest": ["-c", "import main; from ingestion_pipeline import IngestionPipeline"],
+    "streamlit": [
+        "-c",
+        "from retrieval_pipeline import RetrievalPipeline; "
+        "from backends import embedding_model_name, llm_model_name; "
+        "RetrievalPipeline(); embedding_model_name(); llm_model_name()"
+    ],
+}
+
+
+def parse_importtime(stderr: str):
+    """Total import time and (module, cumulative seconds) for top-level imports"""
+    top_level = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if name.startswith("  "):
+            continue
+        top_level.append((name.strip(), int(cumulative) / 1e6))
+    return sum(seconds for _, seconds in top_level), top_level
+
+
+def run_scenario(root: Path, args, repeat: int, env: dict) -> dict:
+    walls = []
+    stderr = ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", *args],
+            cwd=root, env=env, capture_output=True, text=True
+        )
+        walls.append(time.perf_counter() - start)
+        stderr = completed.stderr
+    import_total, top_level = parse_importtime(stderr)
+    return {
+        "wall_s": statistics.median(walls),
+        "import_s": import_total,
+        "heaviest": sorted(top_level, key=lambda item: item[1], reverse=True)[:5]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--root", type=Path, default=Path(__file__).resolve().parent.parent)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--json", help="also write the results to this path")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    # Client construction must not fail for lack of credentials; nothing is sent
+    env.setdefault("GROQ_API_KEY", "startup-benchmark")
+    env["PYTHONWARNINGS"] = "ignore"
+
+    results = {}
+    print(f"{'scenario':<12} {'wall (s)':>9} {'imports (s)':>12}  heaviest imports")
+    for name in args.scenarios:
+        r = results[name] = run_scenario(args.root, SCENARIOS[name], args.repeat, env)
+        heaviest = ", ".join(f"{module} {seconds:.2f}s" for module, seconds in r["heaviest"][:3])
+        print(f"{name:<12} {r['wall_s']:>9.2f} {r['import_s']:>12.2f}  {heaviest}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
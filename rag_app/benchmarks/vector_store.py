@@ -0,0 +1,179 @@
+"""
+Benchmark: Chroma (HNSW) vs the flat NumPy index (float16 and int8) on the same vectors.
+
+The flat indexes are exported from the existing Chroma collection into a scratch
+directory. Each store is then measured in a fresh interpreter: load time (open
+plus the first query), resident memory, per-query latency for single queries,
+and throughput for one batched query. Recall@k is measured against exact
+cosine-similarity neighbours computed in float32 from Chroma's stored embeddings.
+
+Query vectors are the embeddings of the labeled queries from retrieval_eval,
+made with the configured embedding backend.
+
+Run from rag_app/ after an ingest (offline with the stub backends):
+    EMBEDDING_BACKEND=stub python -m benchmarks.vector_store --queries 200 --k 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# "-mmap": searched straight from the memory map, without the float32 decode cache
+STORES = ["chroma", "flat-float16", "flat-int8", "flat-float16-mmap", "flat-int8-mmap"]
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux /proc), falling back to the peak RSS"""
+    try:
+        with open("/proc/self/status", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+# ---------------- WORKER (one store, fresh interpreter) ----------------
+def open_store(store: str, flat_root: str):
+    import config
+    import collection_versions
+    if store == "chroma":
+        from langchain_community.vectorstores import Chroma
+        return Chroma(
+            persist_directory=collection_versions.current_path(),
+            collection_name=config.CHROMA_COLLECTION_NAME
+        )._collection
+    from flat_index import FlatVectorStore
+    decode_cache_bytes = 0 if store.endswith("-mmap") else config.FLAT_INDEX_DECODE_CACHE_MB * 2 ** 20
+    return FlatVectorStore.load(os.path.join(flat_root, store.removesuffix("-mmap")), decode_cache_bytes=decode_cache_bytes)
+
+
+def worker(store: str, flat_root: str, queries_path: str, k: int) -> dict:
+    import numpy as np
+    queries = np.load(queries_path).tolist()
+    if store == "chroma":
+        import chromadb  # noqa: F401  (import cost is not load time)
+    else:
+        import flat_index  # noqa: F401
+    base_rss = rss_mb()
+
+    start = time.perf_counter()
+    collection = open_store(store, flat_root)
+    collection.query(query_embeddings=[queries[0]], n_results=k, include=[])
+    load_s = time.perf_counter() - start
+    loaded_rss = rss_mb()
+
+    latencies, ids = [], []
+    for query in queries:
+        start = time.perf_counter()
+        response = collection.query(query_embeddings=[query], n_results=k, include=[])
+        latencies.append(time.perf_counter() - start)
+        ids.append(response["ids"][0])
+
+    start = time.perf_counter()
+    collection.query(query_embeddings=queries, n_results=k, include=[])
+    batch_s = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "load_s": load_s,
+        "rss_mb": loaded_rss,
+        "rss_delta_mb": loaded_rss - base_rss,
+        "query_p50_ms": statistics.median(latencies) * 1000,
+        "query_p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+        "batch_qps": len(queries) / batch_s if batch_s else 0.0,
+        "ids": ids
+    }
+
+
+# ---------------- DRIVER ----------------
+def prepare(scratch: str, num_queries: int, k: int):
+    """Export the flat indexes, embed the queries, and compute exact neighbours"""
+    import numpy as np
+    import pandas as pd
+    import config
+    import collection_versions
+    from backends import create_embeddings
+    from flat_index import export_from_chroma, normalize
+    from langchain_community.vectorstores import Chroma
+    from benchmarks.retrieval_eval import generate_queries
+
+    # Opening a missing collection would create an empty one
+    path = collection_versions.current_path()
+    if not os.path.exists(os.path.join(path, config.INGEST_MANIFEST_FILE)):
+        raise SystemExit(f"No ingested collection in {path}: run `python main.py ingest` first")
+    collection = Chroma(
+        persist_directory=path,
+        collection_name=config.CHROMA_COLLECTION_NAME
+    )._collection
+    data = collection.get(include=["embeddings"])
+    for dtype in ("float16", "int8"):
+        export_from_chroma(collection, os.path.join(scratch, f"flat-{dtype}"), dtype)
+
+    df = pd.read_csv(config.CSV_FILE_PATH, dtype=str)
+    labeled = generate_queries(df, per_type=max(1, num_queries // 4), seed=13)[:num_queries]
+    embeddings = create_embeddings()
+    queries = np.asarray([embeddings.embed_query(item["query"]) for item in labeled], dtype=np.float32)
+    queries_path = os.path.join(scratch, "queries.npy")
+    np.save(queries_path, queries)
+
+    scores = normalize(queries) @ normalize(data["embeddings"]).T
+    ids = np.asarray(data["ids"])
+    exact = [ids[np.argsort(-row, kind="stable")[:k]].tolist() for row in scores]
+    return queries_path, exact, len(data["ids"])
+
+
+def recall(results, exact) -> float:
+    return statistics.mean(len(set(got) & set(want)) / len(want) for got, want in zip(results, exact))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--stores", nargs="+", default=STORES, choices=STORES)
+    parser.add_argument("--json", help="also write the results to this path")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--flat-root", help=argparse.SUPPRESS)
+    parser.add_argument("--queries-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.flat_root, args.queries_file, args.k)))
+        return
+
+    root = Path(__file__).resolve().parent.parent
+    env = dict(os.environ, PYTHONWARNINGS="ignore")
+    with tempfile.TemporaryDirectory(prefix="vector-store-bench-") as scratch:
+        queries_path, exact, rows = prepare(scratch, args.queries, args.k)
+        print(f"Collection: {rows} vectors | {len(exact)} queries | k={args.k}")
+        print(f"{'store':<18} {'load (s)':>9} {'RSS (MB)':>9} {'+RSS (MB)':>10} "
+              f"{'p50 (ms)':>9} {'p95 (ms)':>9} {'batch q/s':>10} {'recall@k':>9}")
+        results = {}
+        for store in args.stores:
+            completed = subprocess.run(
+                [sys.executable, "-m", "benchmarks.vector_store", "--worker", store, "--flat-root", scratch,
+                 "--queries-file", queries_path, "--k", str(args.k)],
+                cwd=root, env=env, capture_output=True, text=True, check=True
+            )
+            r = json.loads(completed.stdout.strip().splitlines()[-1])
+            r["recall_at_k"] = recall(r.pop("ids"), exact)
+            results[store] = r
+            print(f"{store:<18} {r['load_s']:>9.3f} {r['rss_mb']:>9.1f} {r['rss_delta_mb']:>10.1f} "
+                  f"{r['query_p50_ms']:>9.2f} {r['query_p95_ms']:>9.2f} {r['batch_qps']:>10.0f} "
+                  f"{r['recall_at_k']:>9.3f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Iterable, List, Optional, Set
+import config
+
+# Layout under CHROMA_PERSIST_DIRECTORY:
+#   CURRENT                    pointer file: {"version": ..., "published_at": ...}
+#   versions/<version>/        one complete collection (Chroma or flat index, BM25, manifest)
+#   leases/<reader>.json       versions a running reader has open; the file's mtime is its heartbeat
+# Version names sort in creation order. A collection stored directly in the persist
+# directory (before versioning) is served as long as no version has been published.
+
+
+def root() -> str:
+    return str(config.CHROMA_PERSIST_DIRECTORY)
+
+
+def pointer_path() -> str:
+    return os.path.join(root(), config.COLLECTION_POINTER_FILE)
+
+
+def versions_dir() -> str:
+    return os.path.join(root(), config.COLLECTION_VERSIONS_DIR)
+
+
+def version_path(version: str) -> str:
+    return os.path.join(versions_dir(), version)
+
+
+def leases_dir() -> str:
+    return os.path.join(root(), config.COLLECTION_LEASES_DIR)
+
+
+def own_entries() -> Set[str]:
+    """Names in the persist directory that belong to the versioning, not to a collection"""
+    return {config.COLLECTION_POINTER_FILE, config.COLLECTION_VERSIONS_DIR, config.COLLECTION_LEASES_DIR}
+
+
+# ---------------- POINTER ----------------
+def read_pointer() -> Optional[dict]:
+    try:
+        with open(pointer_path(), "r", encoding="utf-8") as f:
+            pointer = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return pointer if isinstance(pointer, dict) and pointer.get("version") else None
+
+
+def current_version() -> Optional[str]:
+    """Published version, or None (nothing published yet: the unversioned layout, if any)"""
+    pointer = read_pointer()
+    return pointer["version"] if pointer else None
+
+
+def current_path() -> str:
+    """Directory of the live collection"""
+    version = current_version()
+    return version_path(version) if version else root()
+
+
+def pointer_mtime() -> Optional[int]:
+    """Cheap change check for readers: one stat, no read"""
+    try:
+        return os.stat(pointer_path()).st_mtime_ns
+    except OSError:
+        return None
+
+
+def publish(version: str):
+    """Make a finished version live: the pointer is replaced atomically, readers swap on their next check"""
+    path = pointer_path()
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "published_at": datetime.now().isoformat(timespec="seconds")}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_manifest(path: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(path, config.INGEST_MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def is_ready() -> bool:
+    """True when there is a complete collection to serve (the readiness check of app.py)"""
+    manifest = load_manifest(current_path())
+    if manifest is not None:
+        return manifest.get("complete", True)
+    if current_version() is not None:
+        return False
+    # Unversioned collection built before ingest manifests existed
+    own = own_entries()
+    return os.path.isdir(root()) and any(name not in own for name in os.listdir(root()))
+
+
+# ---------------- VERSIONS ----------------
+def list_versions() -> List[str]:
+    try:
+        return sorted(entry.name for entry in os.scandir(versions_dir()) if entry.is_dir())
+    except OSError:
+        return []
+
+
+def pending_versions() -> List[str]:
+    """Versions created after the live one and never published: builds in progress or interrupted"""
+    current = current_version()
+    return [version for version in list_versions() if current is None or version > current]
+
+
+def new_version(copy_from: str = None) -> str:
+    """
+    Create the directory of the next version, empty or as a copy of the collection in
+    copy_from (the pointer and other versions are never copied). Returns its name.
+    """
+    os.makedirs(versions_dir(), exist_ok=True)
+    while True:
+        version = datetime.now().strftime("v%Y%m%d-%H%M%S-%f")
+        path = version_path(version)
+        try:
+            if copy_from:
+                skip = own_entries()
+                shutil.copytree(copy_from, path, ignore=lambda d, names: skip & set(names) if d == copy_from else ())
+            else:
+                os.makedirs(path)
+            return version
+        except FileExistsError:
+            time.sleep(0.001)
+
+
+# ---------------- LEASES ----------------
+def lease_path(reader: str) -> str:
+    return os.path.join(leases_dir(), reader + ".json")
+
+
+def write_lease(reader: str, in_use: Iterable[str]):
+    """Record (or renew) the versions a reader has open"""
+    os.makedirs(leases_dir(), exist_ok=True)
+    path = lease_path(reader)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"versions": sorted(set(in_use)), "pid": os.getpid()}, f)
+    os.replace(tmp_path, path)
+
+
+def release_lease(reader: str):
+    try:
+        os.remove(lease_path(reader))
+    except OSError:
+        pass
+
+
+def leased_versions(ttl: float = None) -> Set[str]:
+    """Versions held by a lease renewed within the last `ttl` seconds; expired leases are removed"""
+    ttl = config.COLLECTION_LEASE_TTL_SECONDS if ttl is None else ttl
+    try:
+        entries = [entry for entry in os.scandir(leases_dir()) if entry.name.endswith(".json")]
+    except OSError:
+        return set()
+    leased = set()
+    now = time.time()
+    for entry in entries:
+        try:
+            if now - entry.stat().st_mtime > ttl:
+                os.remove(entry.path)
+                continue
+            with open(entry.path, "r", encoding="utf-8") as f:
+                leased.update(json.load(f).get("versions", []))
+        except (OSError, ValueError, AttributeError):
+            # Removed or replaced meanwhile
+            continue
+    return leased
+
+
+def collect_garbage(keep: int = None) -> List[str]:
+    """
+    Delete replaced versions beyond the newest `keep` (the live one included) and
+    interrupted builds older than the live version, except versions a reader still
+    leases (idle readers that have not swapped yet, queries still running on the
+    version a reader swapped away from). Builds newer than the live version are never
+    touched. Returns the versions deleted.
+    """
+    keep = max(1, config.COLLECTION_VERSIONS_KEEP if keep is None else keep)
+    current = current_version()
+    if current is None:
+        return []
+    older = [version for version in list_versions() if version < current]
+    finished = [version for version in older if (load_manifest(version_path(version)) or {}).get("complete")]
+    retained = set(finished[max(0, len(finished) - (keep - 1)):]) | leased_versions()
+    removed = []
+    for version in older:
+        if version in retained:
+            continue
+        try:
+            shutil.rmtree(version_path(version))
+            removed.append(version)
+        except OSError as e:
+            # e.g. files still open on Windows; retried by the next collection
+            print(f" Could not delete collection version {version}: {e}")
+    return removed
@@ -6,16 +6,52 @@ load_dotenv()
 
 BASE_DIR = Path(__file__).parent
 DATA_DIR = BASE_DIR / "data"
-CHROMA_DB_DIR = BASE_DIR / "chroma_db"
+CHROMA_DB_DIR = Path(os.getenv("CHROMA_DB_DIR", BASE_DIR / "chroma_db"))
+CACHE_DIR = BASE_DIR / "cache"
 DATA_DIR.mkdir(exist_ok=True)
 CHROMA_DB_DIR.mkdir(exist_ok=True)
+CACHE_DIR.mkdir(exist_ok=True)
 CHUNK_SIZE = 1500
 CHUNK_OVERLAP = 200
+# Backends (see backends.py registry)
+#   embeddings: "ollama" (HTTP), "local" (in-process model2vec, CPU/NumPy), "stub" (hashing)
+#   llm:        "groq", "ollama", "stub" (echoes the retrieved context)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "ollama")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "groq")
+LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL", "minishlab/potion-base-8M")
+LOCAL_EMBEDDING_BATCH_SIZE = 256
+STUB_EMBEDDING_DIMENSIONS = 256
 OLLAMA_BASE_URL = "http://localhost:11434"
 OLLAMA_LLM_MODEL = "mistral:latest"  
 OLLAMA_EMBEDDING_MODEL = "nomic-embed-text:latest"  
 CHROMA_COLLECTION_NAME = "nobel_pprzes_info"
 CHROMA_PERSIST_DIRECTORY = str(CHROMA_DB_DIR)
+# Vector store: "chroma" (HNSW, approximate) or "flat" (flat_index.py: exact NumPy search
+# over one memory-mapped float16 or int8 file, kept in FLAT_INDEX_DIR under the persist
+# directory). `python main.py export-flat` builds the flat index from an existing Chroma DB.
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma")
+FLAT_INDEX_DIR = "flat_index"
+FLAT_INDEX_DTYPE = os.getenv("FLAT_INDEX_DTYPE", "float16")
+# Searches keep a float32 copy of the flat index if it fits in this budget (0 = always
+# convert block by block from the memory map)
+FLAT_INDEX_DECODE_CACHE_MB = 64
+# Chunk-id -> content-hash manifest kept next to the collection for incremental ingest
+INGEST_MANIFEST_FILE = "ingest_manifest.json"
+# Blue/green collections (collection_versions.py): every ingest builds a new version under
+# COLLECTION_VERSIONS_DIR and publishes it by atomically replacing the pointer file, so the
+# live collection is never modified; running RetrievalPipelines load the new version in the
+# background and swap to it. The newest COLLECTION_VERSIONS_KEEP finished versions (the live
+# one included) are kept, older ones deleted unless a reader still holds a lease on them.
+COLLECTION_VERSIONS_DIR = "versions"
+COLLECTION_POINTER_FILE = "CURRENT"
+COLLECTION_VERSIONS_KEEP = 2
+# Every RetrievalPipeline leases the versions it has open (the served one and the one it
+# just swapped away from) with a file under COLLECTION_LEASES_DIR, rewritten every
+# COLLECTION_LEASE_HEARTBEAT_SECONDS; a lease not renewed for COLLECTION_LEASE_TTL_SECONDS
+# (reader gone) no longer protects its versions
+COLLECTION_LEASES_DIR = "leases"
+COLLECTION_LEASE_HEARTBEAT_SECONDS = 30
+COLLECTION_LEASE_TTL_SECONDS = 120
 CSV_FILE_PATH = DATA_DIR / "nobel.csv"
 TEXT_COLUMNS = [
     "category", "categoryFullName", "motivation", "categoryTopMotivation",
@@ -34,7 +70,156 @@ METADATA_COLUMNS = [
     "gender", "ind_or_org", "birth_country", "death_country", "dateAwarded"
 ]
 RETRIEVAL_K = 5
+# k used when the query pins both category and awardYear (at most 3 laureates share a prize)
+FILTERED_RETRIEVAL_K = 3
+
+# Hybrid retrieval: a BM25 index over the same chunks (built at ingest time, stored next
+# to the collection) fused with vector search by reciprocal-rank fusion
+HYBRID_RETRIEVAL_ENABLED = True
+BM25_INDEX_FILE = "bm25_index.json"
+BM25_K1 = 1.5
+BM25_B = 0.75
+# Candidates taken from each retriever before fusion; the fused list is cut to k
+HYBRID_CANDIDATE_K = 20
+HYBRID_VECTOR_WEIGHT = 1.0
+HYBRID_SPARSE_WEIGHT = 1.0
+RRF_K = 60
+
+# Re-ranking (reranker.py): over-fetch RERANK_CANDIDATES chunks, re-score them on the CPU
+# and keep at most k (RETRIEVAL_K / FILTERED_RETRIEVAL_K) whose score, scaled to [0, 1]
+# within the candidates, is at least RERANK_THRESHOLD.
+# Scorers: "lexical" (name/year/category/country matches plus term overlap) or
+# "cross-encoder" (needs sentence-transformers)
+RERANK_ENABLED = True
+RERANKER = os.getenv("RERANKER", "lexical")
+RERANK_CANDIDATES = 30
+RERANK_THRESHOLD = 0.5
+RERANKER_CROSS_ENCODER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+# Context assembly: retrieved chunks grouped by prize, repeated lines written once,
+# fields the question does not need dropped, and cut to a token budget (by rank)
+CONTEXT_COMPRESSION_ENABLED = True
+CONTEXT_TOKEN_BUDGET = 800
+CONTEXT_DROP_IRRELEVANT_FIELDS = True
+
+# Answer cache in front of the RAG chain: exact tier on the normalized query, semantic
+# tier on query-embedding cosine similarity. Invalidated whenever the collection changes.
+ANSWER_CACHE_ENABLED = True
+ANSWER_CACHE_MAX_ENTRIES = 512
+ANSWER_CACHE_TTL_SECONDS = 3600
+ANSWER_CACHE_SIMILARITY_THRESHOLD = 0.95
+
+# Query router (intent_router.py): the rules below are compiled into one word-boundary
+# regex and matched in a single pass over the case/accent-folded query. The first rule
+# that applies wins; a query no rule matches is "off_topic". A rule applies when one of
+# its phrases matches, plus (if given) one of its "with" phrases ("<year>" = a year
+# 1800-2099), and none of its "unless" phrases. "exact" rules need the whole query to be
+# the phrase. Intents with an entry in INTENT_ANSWERS get that canned answer without
+# retrieval or an LLM call; "nobel" goes through RAG.
+PRIZE_CATEGORY_WORDS = [
+    "physics", "chemistry", "medicine", "physiology", "literature", "peace", "economics", "economic"
+]
+QUERY_INTENTS = [
+    {"intent": "greeting", "exact": True, "phrases": [
+        "hi", "hello", "hey", "hi there", "hello there", "hey there", "good morning", "good afternoon",
+        "good evening"
+    ]},
+    {"intent": "identity", "phrases": ["who are you", "what are you", "introduce yourself"]},
+    {"intent": "invalid_category", "phrases": ["math", "maths", "mathematics"],
+     "with": ["nobel", "prize", "prizes", "category", "categories", "award", "awarded"]},
+    {"intent": "ambiguous", "phrases": ["first winner", "first winners"], "unless": PRIZE_CATEGORY_WORDS},
+    {"intent": "nobel", "phrases": [
+        "nobel", "prize", "prizes", "laureate", "laureates", "winner", "winners", "first winner", "first winners"
+    ]},
+    # "physics in 1921": a prize category with a year is a prize question without "Nobel"
+    {"intent": "nobel", "phrases": PRIZE_CATEGORY_WORDS, "with": ["<year>"]},
+]
+PRIZE_CATEGORY_LIST = (
+    "• Physics\n"
+    "• Chemistry\n"
+    "• Physiology or Medicine\n"
+    "• Literature\n"
+    "• Peace\n"
+    "• Economic Sciences"
+)
+INTENT_ANSWERS = {
+    "greeting": "Hello! I’m here to help you with Nobel Prize information.",
+    "identity": "I am an AI assistant specialized in Nobel Prize information.",
+    "invalid_category": (
+        "There is no Nobel Prize in Mathematics.\n\n"
+        "The Nobel Prizes are awarded in:\n" + PRIZE_CATEGORY_LIST
+    ),
+    "ambiguous": (
+        "Please specify the category for the first winner.\n\n"
+        "Available categories:\n" + PRIZE_CATEGORY_LIST
+    ),
+    "off_topic": "Sorry, I only answer questions related to Nobel Prizes.",
+}
+
+# Structured fast path: simple category/year/name/country questions answered from an
+# in-memory index over the CSV, without vector search or an LLM call
+STRUCTURED_FAST_PATH_ENABLED = True
+STRUCTURED_FAST_PATH_MAX_ROWS = 30
+
+# Streaming, pipelined ingestion: CSV read in row chunks, concurrent embedding workers
+# feeding a single Chroma writer
+BATCH_SIZE = 64
+CSV_READ_CHUNKSIZE = 256
+EMBEDDING_CONCURRENCY = 4
+EMBEDDING_QUEUE_SIZE = 8
+
+# Embedding cache shared by ingestion and retrieval, keyed on (model, text hash)
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = CACHE_DIR / "embeddings.sqlite3"
+EMBEDDING_CACHE_MEMORY_SIZE = 10000
+# Save the manifest after every N committed write batches, so a failed full ingest
+# resumes from its last checkpoint instead of starting over
+INGEST_CHECKPOINT_EVERY = 10
+# Sharded ingest (python main.py ingest --workers N): the CSV is cut into row ranges of
+# INGEST_SHARD_ROWS rows that worker processes parse, build and split; chunks still go
+# through the single writer in row order. 1 = parse and split in the ingest process
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+INGEST_SHARD_ROWS = 256
 
 
 GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
 GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+
+# In-process metrics (metrics.py): per-stage latency histograms, token/document counts
+# and cache hit counters, exported at GET /metrics and optionally in the Streamlit sidebar
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Recent samples kept per histogram for p50/p95/p99
+METRICS_WINDOW = 1000
+SHOW_METRICS_IN_SIDEBAR = False
+
+# Warm-up (RetrievalPipeline.warm_up): page in the HNSW segment files, load the embedding
+# model with a dummy call, open the LLM client's connection, then replay common queries
+# through retrieval to fill the caches. Started in the background by the app and server.
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+WARMUP_QUERIES_FILE = DATA_DIR / "warmup_queries.txt"
+WARMUP_MAX_QUERIES = 50
+# Also generate answers for the replayed queries (fills the answer cache, costs LLM calls)
+WARMUP_REPLAY_ANSWERS = False
+
+# Backend transport (transport.py): calls to HTTP backends share one pooled client and
+# one concurrency limit per backend (ingestion and retrieval alike), and are retried
+# on rate limits, 5xx and connection errors with exponential backoff and full jitter.
+# A Retry-After header from the server takes precedence over the computed delay.
+BACKEND_CONCURRENCY = {"ollama": 4, "groq": 8}
+DEFAULT_BACKEND_CONCURRENCY = 4
+HTTP_TIMEOUT_SECONDS = 120
+HTTP_CONNECT_TIMEOUT_SECONDS = 5
+RETRY_MAX_ATTEMPTS = 5
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 20
+
+# Async API: maximum number of concurrent in-flight LLM calls
+MAX_CONCURRENT_LLM_CALLS = 8
+
+# HTTP query service (python main.py serve): concurrent requests arriving within the
+# batch window share one embedding call and one Chroma query
+SERVER_HOST = os.getenv("SERVER_HOST", "127.0.0.1")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_BATCH_WINDOW_MS = 10
+SERVER_MAX_BATCH_SIZE = 32
+SERVER_REQUEST_TIMEOUT = 120
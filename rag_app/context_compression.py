@@ -0,0 +1,155 @@
+from collections import OrderedDict
+from typing import List, Tuple
+from metrics import estimate_tokens
+from structured_index import compile_terms, fold
+
+NAME_FIELDS = ("Laureate", "Organization")
+# Prize-level lines, emitted once per (category, awardYear, motivation) group
+SHARED_FIELDS = ("Year", "Category", "Category Full Name", "Motivation", "Prize Amount", "Date Awarded")
+# Lines every question may need
+ALWAYS_KEEP = {"Laureate", "Organization", "Year", "Category", "Motivation"}
+
+# Optional fields and the query words that make them relevant. "Affiliation" covers
+# Affiliation 1-4.
+FIELD_TRIGGERS = {
+    "Category Full Name": ["full name", "official name", "riksbank"],
+    "Prize Amount": ["amount", "money", "sek", "how much", "worth", "cash", "paid"],
+    "Date Awarded": ["date", "when", "day", "month"],
+    "Gender": ["gender", "woman", "women", "female", "females", "male", "males", "man", "men"],
+    "Birth Date": ["born", "birth", "birthday", "age", "old", "young", "younger", "older"],
+    "Birth Place": ["born", "birth", "birthplace", "where", "country", "city", "from", "native", "nationality"],
+    "Acronym": ["acronym", "abbreviation", "abbreviated", "stand for", "short"],
+    "Founded": ["founded", "established", "created", "when"],
+    "Affiliation": ["affiliation", "affiliations", "affiliated", "university", "institute", "where", "work", "worked"],
+    "Type": ["individual", "individuals", "person", "people", "organization", "organizations", "organisation", "institution"],
+}
+# Open-ended questions keep every field
+DESCRIBE_WORDS = ["tell", "about", "who is", "who was", "describe", "biography", "details", "information", "info", "everything"]
+
+# Constraint keys that make a field relevant even if no trigger word is used
+CONSTRAINT_FIELDS = {"gender": "Gender", "birth_country": "Birth Place", "ind_or_org": "Type"}
+
+
+def field_family(label: str) -> str:
+    return "Affiliation" if label.startswith("Affiliation") else label
+
+
+def parse_lines(text: str) -> List[Tuple[str, str]]:
+    """(label, line) pairs; lines that are not "Label: value" get an empty label"""
+    pairs = []
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        label, sep, _ = line.partition(": ")
+        pairs.append((label if sep else "", line))
+    return pairs
+
+
+class ContextCompressor:
+    """
+    Builds the prompt context from ranked chunks under a token budget.
+
+    Chunks are grouped by prize (category, awardYear, motivation) so the lines a
+    shared prize repeats for every co-laureate are written once; lines already
+    emitted for a laureate (multi-prize winners) are not repeated; optional fields
+    the question does not ask about are dropped; and groups are added in
+    retrieval-rank order until the budget is spent.
+    """
+
+    def __init__(self, token_budget: int, drop_irrelevant_fields: bool = True):
+        self.token_budget = token_budget
+        self.drop_irrelevant_fields = drop_irrelevant_fields
+        self.describe_pattern = compile_terms(DESCRIBE_WORDS)
+        self.field_patterns = {field: compile_terms(words) for field, words in FIELD_TRIGGERS.items()}
+
+    def relevant_fields(self, query: str, constraints: dict) -> set:
+        """Optional fields worth keeping for this question (None = keep everything)"""
+        folded = fold(query or "")
+        if not self.drop_irrelevant_fields or not folded or self.describe_pattern.search(folded):
+            return None
+        fields = {field for field, pattern in self.field_patterns.items() if pattern.search(folded)}
+        fields.update(field for key, field in CONSTRAINT_FIELDS.items() if key in (constraints or {}))
+        return fields
+
+    def group(self, docs) -> "OrderedDict":
+        """Prize groups in rank order: key -> {"shared": [...], "laureates": OrderedDict(name -> [lines])}"""
+        groups = OrderedDict()
+        seen_chunks = set()
+        for doc in docs:
+            if doc.page_content in seen_chunks:
+                continue
+            seen_chunks.add(doc.page_content)
+
+            pairs = parse_lines(doc.page_content)
+            fields = {label: line for label, line in pairs}
+            name = next((fields[f] for f in NAME_FIELDS if f in fields), None)
+            if name is None:
+                # Unstructured chunk (e.g. a later piece of a split row): its own group
+                groups[("chunk", len(groups))] = {"shared": [line for _, line in pairs], "laureates": OrderedDict()}
+                continue
+
+            metadata = doc.metadata or {}
+            key = (metadata.get("category"), metadata.get("awardYear"), fields.get("Motivation"))
+            group = groups.setdefault(key, {"shared": [], "laureates": OrderedDict()})
+            for label, line in pairs:
+                if label in SHARED_FIELDS:
+                    if line not in group["shared"]:
+                        group["shared"].append(line)
+                elif label not in NAME_FIELDS:
+                    group["laureates"].setdefault(name, []).append((label, line))
+                else:
+                    group["laureates"].setdefault(name, [])
+        return groups
+
+    def compress(self, docs, query: str = None, constraints: dict = None) -> Tuple[str, dict]:
+        """Context string plus stats: original/context token counts and tokens saved"""
+        original_tokens = estimate_tokens("\n\n".join(doc.page_content for doc in docs))
+        keep = self.relevant_fields(query, constraints)
+
+        def wanted(line: str) -> bool:
+            label = line.partition(": ")[0]
+            return keep is None or label in ALWAYS_KEEP or field_family(label) in keep or ": " not in line
+
+        blocks = []
+        emitted = set()
+        for group in self.group(docs).values():
+            lines = [line for line in group["shared"] if wanted(line)]
+            for name, details in group["laureates"].items():
+                lines.append(name)
+                for _, line in details:
+                    if wanted(line) and (name, line) not in emitted:
+                        emitted.add((name, line))
+                        lines.append(line)
+            blocks.append(lines)
+
+        context, used, truncated = [], 0, 0
+        for lines in blocks:
+            block = "\n".join(lines)
+            cost = estimate_tokens(block)
+            if used + cost <= self.token_budget:
+                context.append(block)
+                used += cost
+                continue
+            if not context:
+                # Even the most relevant group is over budget: keep its leading lines
+                kept = []
+                for line in lines:
+                    line_cost = estimate_tokens(line)
+                    if used + line_cost > self.token_budget:
+                        break
+                    kept.append(line)
+                    used += line_cost
+                context.append("\n".join(kept))
+            truncated = len(blocks) - len(context)
+            break
+
+        text = "\n\n".join(context)
+        context_tokens = estimate_tokens(text)
+        return text, {
+            "original_tokens": original_tokens,
+            "context_tokens": context_tokens,
+            "tokens_saved": original_tokens - context_tokens,
+            "groups": len(blocks),
+            "groups_truncated": truncated
+        }
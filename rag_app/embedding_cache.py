@@ -0,0 +1,182 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, List
+from langchain_core.embeddings import Embeddings
+import config
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with a disk-backed cache keyed on (model, kind, text hash).
+    A bounded in-memory LRU sits in front of the SQLite table so repeated
+    queries never touch the disk, and only cache misses reach the model.
+    """
+
+    def __init__(self, embeddings: Embeddings, model_name: str,
+                 cache_path: str = None, memory_size: int = None):
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.memory_size = memory_size if memory_size is not None else config.EMBEDDING_CACHE_MEMORY_SIZE
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self._conn = sqlite3.connect(
+            str(cache_path or config.EMBEDDING_CACHE_PATH),
+            check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " kind TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, kind, text_hash))"
+        )
+        self._conn.commit()
+
+        # Hit/miss counters
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # ---------------- CACHE ----------------
+    def _remember(self, key, vector: List[float]):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, kind: str, hashes: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        pending = []
+        with self._lock:
+            for h in hashes:
+                key = (kind, h)
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[h] = self._memory[key]
+                    self.memory_hits += 1
+                else:
+                    pending.append(h)
+
+            # SQLite caps the number of bound parameters, so query in slices
+            for i in range(0, len(pending), 500):
+                part = pending[i:i + 500]
+                rows = self._conn.execute(
+                    "SELECT text_hash, vector FROM embeddings"
+                    f" WHERE model = ? AND kind = ? AND text_hash IN ({','.join('?' * len(part))})",
+                    [self.model_name, kind, *part]
+                ).fetchall()
+                for h, blob in rows:
+                    vector = array("f", blob).tolist()
+                    found[h] = vector
+                    self._remember((kind, h), vector)
+                    self.disk_hits += 1
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def _store(self, kind: str, items: Dict[str, List[float]]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, kind, text_hash, vector) VALUES (?, ?, ?, ?)",
+                [
+                    (self.model_name, kind, h, array("f", vector).tobytes())
+                    for h, vector in items.items()
+                ]
+            )
+            self._conn.commit()
+            for h, vector in items.items():
+                self._remember((kind, h), vector)
+
+    def _split(self, kind: str, texts: List[str]):
+        """Return (hashes, cached vectors, unique texts that still need embedding)"""
+        hashes = [text_hash(t) for t in texts]
+        unique = dict(zip(hashes, texts))
+        found = self._lookup(kind, list(unique))
+        missing = {h: t for h, t in unique.items() if h not in found}
+        return hashes, found, missing
+
+    # ---------------- EMBEDDINGS API ----------------
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, found, missing = self._split("document", texts)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            self._store("document", computed)
+            found.update(computed)
+        return [found[h] for h in hashes]
+
+    def embed_query(self, text: str) -> List[float]:
+        hashes, found, missing = self._split("query", [text])
+        if missing:
+            computed = {hashes[0]: self.embeddings.embed_query(text)}
+            self._store("query", computed)
+            found.update(computed)
+        return found[hashes[0]]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries with a single model call. Ollama and the stub backends
+        embed queries exactly like documents, so cache misses go out as one batch.
+        """
+        hashes, found, missing = self._split("query", texts)
+        if missing:
+            vectors = self.embeddings.embed_documents(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            self._store("query", computed)
+            found.update(computed)
+        return [found[h] for h in hashes]
+
+    @staticmethod
+    async def _off_loop(func, *args):
+        """SQLite reads and writes block; run them on the default executor"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        hashes, found, missing = await self._off_loop(self._split, "document", texts)
+        if missing:
+            vectors = await self.embeddings.aembed_documents(list(missing.values()))
+            computed = dict(zip(missing, vectors))
+            await self._off_loop(self._store, "document", computed)
+            found.update(computed)
+        return [found[h] for h in hashes]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        hashes, found, missing = await self._off_loop(self._split, "query", [text])
+        if missing:
+            computed = {hashes[0]: await self.embeddings.aembed_query(text)}
+            await self._off_loop(self._store, "query", computed)
+            found.update(computed)
+        return found[hashes[0]]
+
+    # ---------------- STATS ----------------
+    @property
+    def hits(self) -> int:
+        return self.memory_hits + self.disk_hits
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "memory_entries": len(self._memory)
+        }
+
+
+def with_embedding_cache(embeddings: Embeddings, model_name: str) -> Embeddings:
+    """Wrap an embeddings object in the shared cache unless caching is disabled"""
+    if not config.EMBEDDING_CACHE_ENABLED:
+        return embeddings
+    return CachedEmbeddings(embeddings, model_name=model_name)
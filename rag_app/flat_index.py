@@ -0,0 +1,364 @@
+import json
+import os
+import uuid
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+
+# Indexes saved before vector files were named per save have these fixed names
+VECTORS_FILE = "vectors.npy"
+SCALES_FILE = "scales.npy"
+METADATA_FILE = "metadata.json"
+# Times load() re-reads the metadata when a concurrent save() deleted the files it named
+LOAD_ATTEMPTS = 5
+DTYPES = ("float16", "int8")
+# Rows converted to float32 per matrix product, bounding the temporary memory of a search
+SEARCH_BLOCK_ROWS = 8192
+
+
+def normalize(vectors) -> np.ndarray:
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def quantize(vectors: np.ndarray, dtype: str):
+    """Stored rows (and per-row scales for int8) for unit-length float32 vectors"""
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+    scales = np.abs(vectors).max(axis=1) / 127
+    scales[scales == 0] = 1
+    return np.round(vectors / scales[:, None]).astype(np.int8), scales.astype(np.float32)
+
+
+def extend_rows(array: np.ndarray, buffer: Optional[np.ndarray], rows: int):
+    """
+    (array with `rows` more rows at the end, uninitialized; its buffer). The array is a
+    view of a buffer that doubles when full, so appending batch by batch costs O(1)
+    per row instead of copying the whole array every time.
+    """
+    n = array.shape[0]
+    if buffer is None or array.base is not buffer or n + rows > len(buffer):
+        buffer = np.empty((max(2 * n, n + rows, 64), *array.shape[1:]), dtype=array.dtype)
+        buffer[:n] = array
+    return buffer[:n + rows], buffer
+
+
+class FlatVectorStore:
+    """
+    Exact-search vector store: unit-length embeddings in one .npy file (float16, or
+    int8 with a scale per row), memory-mapped when opened read-only, plus a columnar
+    metadata file (ids, documents, and one code array per metadata key).
+
+    A search is a batched matrix product over the whole file, so it returns the true
+    nearest neighbours by cosine similarity. Rows are converted to float32 block by
+    block, or once and kept if the float32 copy fits in decode_cache_bytes (numpy's
+    float16 conversion costs more than the product itself). It takes the subset of the Chroma
+    collection API the pipelines use: query, get, upsert, delete and count, with
+    `where` clauses of equality, $eq/$ne/$in, $and and $or. Distances are 1 - cosine.
+
+    Every save() writes the vectors to new files and then replaces the metadata file,
+    which names them: a reader sees either the old index or the new one, never a mix.
+    """
+
+    def __init__(self, path: str, ids: List[str], documents: List[str], metadatas: List[dict],
+                 vectors: np.ndarray, scales: Optional[np.ndarray], dtype: str, info: dict = None,
+                 decode_cache_bytes: int = 0):
+        if dtype not in DTYPES:
+            raise ValueError(f"Unknown flat index dtype: {dtype} (available: {', '.join(DTYPES)})")
+        self.path = path
+        self.ids = ids
+        self.documents = documents
+        self.metadatas = metadatas
+        self.vectors = vectors
+        self.scales = scales
+        self.dtype = dtype
+        self.info = dict(info or {})
+        self.decode_cache_bytes = decode_cache_bytes
+        self.vectors_file = VECTORS_FILE
+        self.scales_file = SCALES_FILE if scales is not None else None
+        # Rows upserted or deleted since the index was last saved (or loaded), for save_due()
+        self.saved_rows = len(ids)
+        self.changed_rows = 0
+        self._vector_buffer = None
+        self._scale_buffer = None
+        self._reindex()
+
+    def _reindex(self):
+        self.positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._columns = None
+        self._decoded = None
+
+    @property
+    def columns(self) -> dict:
+        """Columnar metadata: key -> (distinct values, int32 codes per row (-1 = missing), value -> code)"""
+        if self._columns is not None:
+            return self._columns
+        columns = {}
+        for key in sorted({key for metadata in self.metadatas for key in metadata}):
+            values, codes, lookup = [], np.full(len(self.ids), -1, dtype=np.int32), {}
+            for i, metadata in enumerate(self.metadatas):
+                if key in metadata:
+                    value = metadata[key]
+                    if value not in lookup:
+                        lookup[value] = len(values)
+                        values.append(value)
+                    codes[i] = lookup[value]
+            columns[key] = (values, codes, lookup)
+        self._columns = columns
+        return columns
+
+    # ---------------- PERSISTENCE ----------------
+    @classmethod
+    def empty(cls, path: str, dtype: str = "float16", info: dict = None) -> "FlatVectorStore":
+        return cls(path, [], [], [], np.zeros((0, 0), dtype=dtype), None, dtype, info)
+
+    @classmethod
+    def load(cls, path: str, mmap: bool = True, decode_cache_bytes: int = 0) -> Optional["FlatVectorStore"]:
+        """Open an exported index; mmap=False reads it into memory (needed to modify it)"""
+        metadata_path = os.path.join(path, METADATA_FILE)
+        mode = "r" if mmap else None
+        for attempt in range(LOAD_ATTEMPTS):
+            if not os.path.exists(metadata_path):
+                return None
+            with open(metadata_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            vectors_file = data.get("vectors_file", VECTORS_FILE)
+            scales_file = data.get("scales_file", SCALES_FILE) if data["dtype"] == "int8" else None
+            try:
+                vectors = np.load(os.path.join(path, vectors_file), mmap_mode=mode)
+                scales = np.load(os.path.join(path, scales_file)) if scales_file else None
+                break
+            except FileNotFoundError:
+                # Saved again between reading the metadata and opening its files: read the new one
+                if attempt == LOAD_ATTEMPTS - 1:
+                    raise
+        n = len(data["ids"])
+        metadatas = [{} for _ in range(n)]
+        for key, column in data["columns"].items():
+            values = column["values"]
+            for i, code in enumerate(column["codes"]):
+                if code >= 0:
+                    metadatas[i][key] = values[code]
+        if vectors.shape[0] != n:
+            raise ValueError(f"Flat index at {path} is inconsistent: {vectors.shape[0]} vectors, {n} ids")
+        store = cls(path, data["ids"], data["documents"], metadatas, vectors, scales, data["dtype"],
+                    data.get("info"), decode_cache_bytes)
+        store.vectors_file, store.scales_file = vectors_file, scales_file
+        return store
+
+    def save(self):
+        """
+        Write the vectors to newly named files, then replace the metadata file (atomically)
+        to point at them, then delete the files it replaced. A reader that opens the
+        metadata just before the replace and the files just after retries (see load).
+        """
+        os.makedirs(self.path, exist_ok=True)
+        generation = uuid.uuid4().hex[:12]
+        vectors_file = f"vectors-{generation}.npy"
+        scales_file = f"scales-{generation}.npy" if self.scales is not None else None
+        for name, array in ((vectors_file, self.vectors), (scales_file, self.scales)):
+            if name is not None:
+                with open(os.path.join(self.path, name), "wb") as f:
+                    np.save(f, np.ascontiguousarray(array))
+
+        tmp_path = os.path.join(self.path, METADATA_FILE + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "dtype": self.dtype,
+                "dimensions": int(self.vectors.shape[1]) if self.vectors.size else 0,
+                "info": self.info,
+                "vectors_file": vectors_file,
+                "scales_file": scales_file,
+                "ids": self.ids,
+                "documents": self.documents,
+                "columns": {
+                    key: {"values": values, "codes": codes.tolist()}
+                    for key, (values, codes, _) in self.columns.items()
+                }
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, os.path.join(self.path, METADATA_FILE))
+        self.vectors_file, self.scales_file = vectors_file, scales_file
+        self.saved_rows, self.changed_rows = len(self.ids), 0
+
+        current = {vectors_file, scales_file}
+        for entry in os.scandir(self.path):
+            if entry.name.endswith(".npy") and entry.name not in current:
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    # e.g. still memory-mapped by a reader on Windows; removed by a later save
+                    pass
+
+    def save_due(self) -> bool:
+        """
+        True once the rows changed since the last save outnumber the rows saved then.
+        Checkpoints that only save when due rewrite the index O(log n) times in a run,
+        for O(n) bytes written in total, instead of once per checkpoint.
+        """
+        return self.changed_rows >= max(1, self.saved_rows)
+
+    def files(self) -> List[str]:
+        names = [self.vectors_file, METADATA_FILE] + ([self.scales_file] if self.scales is not None else [])
+        return [os.path.join(self.path, name) for name in names]
+
+    # ---------------- WRITES ----------------
+    def upsert(self, ids: Sequence[str], embeddings, metadatas: Sequence[dict] = None,
+               documents: Sequence[str] = None):
+        vectors, scales = quantize(normalize(embeddings), self.dtype)
+        if not self.ids:
+            self.vectors = vectors[:0]
+            self.scales = scales[:0] if scales is not None else None
+        if not self.vectors.flags.writeable:
+            # Opened as a read-only memory map: modify an in-memory copy
+            self.vectors = np.array(self.vectors)
+        new_rows = []
+        self.changed_rows += len(ids)
+        for j, doc_id in enumerate(ids):
+            metadata = dict(metadatas[j]) if metadatas else {}
+            document = documents[j] if documents else ""
+            i = self.positions.get(doc_id)
+            if i is None:
+                self.positions[doc_id] = len(self.ids)
+                self.ids.append(doc_id)
+                self.documents.append(document)
+                self.metadatas.append(metadata)
+                new_rows.append(j)
+                continue
+            self.vectors[i] = vectors[j]
+            if scales is not None:
+                self.scales[i] = scales[j]
+            self.documents[i] = document
+            self.metadatas[i] = metadata
+        if new_rows:
+            self.vectors, self._vector_buffer = extend_rows(self.vectors, self._vector_buffer, len(new_rows))
+            self.vectors[-len(new_rows):] = vectors[new_rows]
+            if scales is not None:
+                self.scales, self._scale_buffer = extend_rows(self.scales, self._scale_buffer, len(new_rows))
+                self.scales[-len(new_rows):] = scales[new_rows]
+        self._columns = None
+        self._decoded = None
+
+    def delete(self, ids: Sequence[str]):
+        drop = {self.positions[doc_id] for doc_id in ids if doc_id in self.positions}
+        if not drop:
+            return
+        self.changed_rows += len(drop)
+        keep = np.array([i not in drop for i in range(len(self.ids))], dtype=bool)
+        self.vectors = np.array(self.vectors)[keep]
+        if self.scales is not None:
+            self.scales = self.scales[keep]
+        self.ids = [doc_id for i, doc_id in enumerate(self.ids) if keep[i]]
+        self.documents = [doc for i, doc in enumerate(self.documents) if keep[i]]
+        self.metadatas = [metadata for i, metadata in enumerate(self.metadatas) if keep[i]]
+        self._reindex()
+
+    # ---------------- READS ----------------
+    def count(self) -> int:
+        return len(self.ids)
+
+    def mask(self, where: Optional[dict]) -> Optional[np.ndarray]:
+        """Boolean row mask for a Chroma-style `where` clause (None = every row)"""
+        if not where:
+            return None
+        masks = []
+        for key, condition in where.items():
+            if key in ("$and", "$or"):
+                parts = [self.mask(clause) for clause in condition]
+                parts = [np.ones(len(self.ids), dtype=bool) if part is None else part for part in parts]
+                masks.append(np.logical_and.reduce(parts) if key == "$and" else np.logical_or.reduce(parts))
+                continue
+            if not isinstance(condition, dict):
+                condition = {"$eq": condition}
+            values, codes, lookup = self.columns.get(key, ([], np.full(len(self.ids), -1, dtype=np.int32), {}))
+            for op, operand in condition.items():
+                if op in ("$eq", "$ne"):
+                    matched = codes == lookup.get(operand, -2)
+                    masks.append(matched if op == "$eq" else ~matched)
+                elif op in ("$in", "$nin"):
+                    matched = np.isin(codes, [lookup[value] for value in operand if value in lookup])
+                    masks.append(matched if op == "$in" else ~matched)
+                else:
+                    raise ValueError(f"Unsupported where operator for the flat index: {op}")
+        return np.logical_and.reduce(masks)
+
+    def similarities(self, query_vectors: np.ndarray) -> np.ndarray:
+        """Cosine similarity of each (unit-length) query with every row, in blocks of rows"""
+        n = len(self.ids)
+        if self._decoded is None and n * self.vectors.shape[1] * 4 <= self.decode_cache_bytes:
+            self._decoded = np.asarray(self.vectors, dtype=np.float32)
+        if self._decoded is not None:
+            scores = query_vectors @ self._decoded.T
+            return scores * self.scales if self.scales is not None else scores
+
+        scores = np.empty((len(query_vectors), n), dtype=np.float32)
+        for start in range(0, n, SEARCH_BLOCK_ROWS):
+            block = np.asarray(self.vectors[start:start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+            scores[:, start:start + len(block)] = query_vectors @ block.T
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def _rows(self, rows, include) -> Dict[str, list]:
+        result = {"ids": [self.ids[i] for i in rows]}
+        if "documents" in include:
+            result["documents"] = [self.documents[i] for i in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [dict(self.metadatas[i]) for i in rows]
+        if "embeddings" in include:
+            vectors = np.asarray(self.vectors[list(rows)], dtype=np.float32)
+            if self.scales is not None:
+                vectors *= self.scales[list(rows)][:, None]
+            result["embeddings"] = vectors
+        return result
+
+    def query(self, query_embeddings, n_results: int = 10, where: dict = None,
+              include: Sequence[str] = ("documents", "metadatas", "distances")) -> Dict[str, list]:
+        """Exact top-n for each query vector, in Chroma's response shape (one list per query)"""
+        queries = normalize(query_embeddings)
+        response = {key: [] for key in ("ids", *include)}
+        if not self.ids:
+            for key in response:
+                response[key] = [[] for _ in queries]
+            return response
+
+        scores = self.similarities(queries)
+        mask = self.mask(where)
+        candidates = len(self.ids) if mask is None else int(mask.sum())
+        if mask is not None:
+            scores[:, ~mask] = -np.inf
+        k = min(n_results, candidates)
+
+        for row_scores in scores:
+            if k == 0:
+                top = np.array([], dtype=np.int64)
+            else:
+                top = np.argpartition(-row_scores, k - 1)[:k]
+                top = top[np.lexsort((top, -row_scores[top]))]
+            rows = self._rows(top.tolist(), include)
+            if "distances" in include:
+                rows["distances"] = (1 - row_scores[top]).tolist()
+            for key, values in rows.items():
+                response[key].append(values)
+        return response
+
+    def get(self, ids: Sequence[str] = None, where: dict = None,
+            include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, list]:
+        """Rows by id (unknown ids are skipped) and/or where clause, like Collection.get"""
+        if ids is not None:
+            rows = [self.positions[doc_id] for doc_id in ids if doc_id in self.positions]
+        else:
+            rows = range(len(self.ids))
+        mask = self.mask(where)
+        if mask is not None:
+            rows = [i for i in rows if mask[i]]
+        return self._rows(list(rows), include)
+
+
+def export_from_chroma(collection, path: str, dtype: str = "float16", info: dict = None) -> FlatVectorStore:
+    """Write a flat index holding every row of a Chroma collection"""
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    store = FlatVectorStore.empty(path, dtype, info)
+    if data["ids"]:
+        store.upsert(data["ids"], data["embeddings"], data["metadatas"], data["documents"])
+    store.save()
+    return store
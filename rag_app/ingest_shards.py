@@ -0,0 +1,137 @@
+import io
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterator, List, Tuple
+from utils import build_documents, chunk_document, create_text_splitter, detect_encoding
+import config
+
+QUOTE = ord('"')
+
+
+# ---------------- PLANNING ----------------
+def plan_shards(csv_path: str, rows_per_shard: int) -> Tuple[bytes, List[tuple]]:
+    """
+    Cut the CSV into row ranges at record boundaries, without parsing it.
+
+    Returns the header record and one (first_row, rows, start_byte, end_byte) per shard.
+    A newline ends a record only when the quote characters seen so far are balanced,
+    so quoted multi-line fields (biographies, lecture text) stay whole. Blank lines
+    are not counted as rows, like pandas, so first_row is the row's pandas index.
+    """
+    header_end = None
+    shards = []
+    row = 0
+    offset = record_start = 0
+    in_quotes = False
+    with open(csv_path, "rb") as f:
+        for line in f:
+            offset += len(line)
+            if line.count(QUOTE) % 2:
+                in_quotes = not in_quotes
+            if in_quotes:
+                continue
+            start, record_start = record_start, offset
+            if header_end is None:
+                header_end = offset
+                continue
+            if not line.strip(b"\r\n") and offset - start == len(line):
+                continue
+            if row % rows_per_shard == 0:
+                shards.append([row, 0, start, offset])
+            shards[-1][1] += 1
+            shards[-1][3] = offset
+            row += 1
+        f.seek(0)
+        header = f.read(header_end or 0)
+    return header, [tuple(shard) for shard in shards]
+
+
+# ---------------- WORKER ----------------
+_text_splitter = None
+
+
+def _splitter():
+    """One text splitter per worker process, built on the first oversize row"""
+    global _text_splitter
+    if _text_splitter is None:
+        _text_splitter = create_text_splitter(chunk_size=config.CHUNK_SIZE, chunk_overlap=config.CHUNK_OVERLAP)
+    return _text_splitter
+
+
+def read_shard(csv_path: str, encoding: str, header: bytes, shard: tuple):
+    """One shard as a DataFrame indexed by its rows' positions in the whole CSV"""
+    import pandas as pd
+    first_row, rows, start, end = shard
+    with open(csv_path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    frame = pd.read_csv(io.BytesIO(header + data), encoding=encoding, dtype=str)
+    if len(frame) != rows:
+        raise ValueError(f"Shard at row {first_row} parsed into {len(frame)} rows, expected {rows}")
+    frame.index = pd.RangeIndex(first_row, first_row + rows)
+    return frame
+
+
+def process_shard(csv_path: str, encoding: str, header: bytes, shard: tuple):
+    """Parse, build and split one shard: (chunks, split stats, stage timings)"""
+    start = time.perf_counter()
+    frame = read_shard(csv_path, encoding, header, shard)
+    documents = build_documents(frame, config.METADATA_COLUMNS, source=str(csv_path))
+    timings = {"load": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    chunks = []
+    stats = {"passthrough": 0, "split": 0}
+    for doc in documents:
+        doc_chunks, was_split = chunk_document(doc, config.CHUNK_SIZE, _splitter)
+        stats["split" if was_split else "passthrough"] += 1
+        chunks.extend(doc_chunks)
+    timings["split"] = time.perf_counter() - start
+    return chunks, stats, timings
+
+
+# ---------------- DRIVER ----------------
+def iter_sharded_chunks(csv_path: str, workers: int, split_stats: dict, stage_timings: dict,
+                        rows_per_shard: int = None) -> Iterator:
+    """
+    Chunks of the whole CSV, built by a pool of worker processes, in row order.
+
+    Shards are submitted at most 2 * workers ahead of the consumer, so memory stays
+    bounded whatever the CSV size. Chunks carry their global row positions, so the
+    output is the same as the single-process path. Worker time is added to
+    split_stats / stage_timings ("load" and "split" are then CPU seconds summed over
+    workers); "shard_wait" is the time the consumer spent waiting on the pool.
+    """
+    start = time.perf_counter()
+    encoding = detect_encoding(csv_path)
+    header, shards = plan_shards(csv_path, rows_per_shard or config.INGEST_SHARD_ROWS)
+    stage_timings["plan"] = stage_timings.get("plan", 0.0) + time.perf_counter() - start
+    if not shards:
+        return
+
+    # spawn, not fork: the ingest process already runs embedding and writer threads
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(shards)), mp_context=context) as pool:
+        remaining = iter(shards)
+        pending = deque()
+
+        def submit(count):
+            for shard in remaining:
+                pending.append(pool.submit(process_shard, csv_path, encoding, header, shard))
+                count -= 1
+                if count == 0:
+                    return
+
+        submit(2 * workers)
+        while pending:
+            start = time.perf_counter()
+            chunks, stats, timings = pending.popleft().result()
+            stage_timings["shard_wait"] = stage_timings.get("shard_wait", 0.0) + time.perf_counter() - start
+            submit(1)
+            for key, count in stats.items():
+                split_stats[key] = split_stats.get(key, 0) + count
+            for stage, seconds in timings.items():
+                stage_timings[stage] = stage_timings.get(stage, 0.0) + seconds
+            yield from chunks
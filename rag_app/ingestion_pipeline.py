@@ -1,110 +1,558 @@
 import os
+import json
+import queue
 import shutil
-from langchain_ollama import OllamaEmbeddings
-from langchain_community.vectorstores import Chroma
-from utils import load_csv_data, create_text_splitter
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from backends import create_embeddings, embedding_model_name
+from embedding_cache import with_embedding_cache
+from langchain_core.documents import Document
+from sparse_index import BM25Index
+from flat_index import FlatVectorStore, export_from_chroma
+from ingest_shards import iter_sharded_chunks
+from metrics import registry as metrics
+import collection_versions as versions
+from utils import iter_csv_documents, chunk_document, create_text_splitter, compute_chunk_hash, iter_batches, lazy_property, peek, timed_iter, unique_row_keys
 from tqdm import tqdm
 import config
 
 # Ingestion pipeline to process CSV, create embeddings, and store in Chroma DB
 class IngestionPipeline:
-    def __init__(self):
+    def __init__(self, workers: int = None):
         # Initialize embeddings
-        self.embeddings = OllamaEmbeddings(
-            model=config.OLLAMA_EMBEDDING_MODEL,
-            base_url=config.OLLAMA_BASE_URL
+        self.embeddings = with_embedding_cache(
+            create_embeddings(),
+            model_name=embedding_model_name()
         )
 
-        # Initialize text splitter
-        self.text_splitter = create_text_splitter(
+        # Processes that parse, build and split the CSV (1: all in this process)
+        self.workers = max(1, workers or config.INGEST_WORKERS)
+        self._init_lock = threading.RLock()
+        self.vectorstore = None
+        # Collection this pipeline reads and writes: the live one until a run starts
+        # a new version (collection_versions.py); the live version is never written
+        self.version = versions.current_version()
+        self.persist_directory = versions.current_path()
+        self.last_run_stats = {}
+        self.reset_stats()
+
+    @lazy_property
+    def text_splitter(self):
+        """Only needed for rows longer than CHUNK_SIZE, so built on first use"""
+        return create_text_splitter(
             chunk_size=config.CHUNK_SIZE,
             chunk_overlap=config.CHUNK_OVERLAP
         )
 
+    # ---------------- COLLECTION VERSIONS ----------------
+    def use_version(self, version: str):
+        """Point the pipeline at a collection version (the vector store is reopened on next use)"""
         self.vectorstore = None
+        self.version = version
+        self.persist_directory = versions.version_path(version)
 
-    def clear_existing_db(self):
-        """Safely clear the existing Chroma DB (Windows-safe)"""
-        if os.path.exists(config.CHROMA_PERSIST_DIRECTORY):
-            try:
-                # Close vectorstore if it's open
-                if self.vectorstore:
-                    self.vectorstore.persist()
-                    self.vectorstore = None
-            except Exception as e:
-                print(f" Warning closing vectorstore: {e}")
+    def start_version(self, copy_from: str = None):
+        """Build into a new version: empty, or a copy of the collection in copy_from"""
+        version = versions.new_version(copy_from=copy_from)
+        self.use_version(version)
+        print(f" Building collection version {version}" + (" (copy of the live one)" if copy_from else ""))
 
-            # Attempt to remove folder
-            try:
-                shutil.rmtree(config.CHROMA_PERSIST_DIRECTORY)
-                print(" Existing Chroma DB cleared")
-            except PermissionError:
-                print(" Could not delete Chroma DB. Make sure no process is using it (Streamlit, Python, Explorer).")
-                return
+    def find_interrupted_version(self):
+        """(version, manifest) of the newest unpublished build with a resumable checkpoint, or None"""
+        for version in reversed(versions.pending_versions()):
+            manifest = versions.load_manifest(versions.version_path(version))
+            if manifest is not None and not manifest.get("complete", True) and self.manifest_is_compatible(manifest):
+                return version, manifest
+        return None
 
-        os.makedirs(config.CHROMA_PERSIST_DIRECTORY, exist_ok=True)
-        print(" Chroma DB directory ready")
-    
-    def process_csv_row_by_row(self, csv_path: str):
-        """Process CSV into Document chunks"""
-        documents = load_csv_data(
-            csv_path,
-            text_columns=config.TEXT_COLUMNS,
-            metadata_columns=config.METADATA_COLUMNS
+    def publish(self):
+        """Make the version just built live (atomic pointer flip) and delete old versions"""
+        versions.publish(self.version)
+        removed = versions.collect_garbage()
+        print(
+            f" Published collection version {self.version}"
+            + (f", deleted {len(removed)} old version(s)" if removed else "")
         )
 
-        all_chunks = []
-        for doc in tqdm(documents, desc="Splitting documents into chunks"):
-            chunks = self.text_splitter.split_documents([doc])
-            for i, chunk in enumerate(chunks):
-                chunk.metadata = doc.metadata.copy()
-                chunk.metadata["chunk_id"] = f"{doc.metadata.get('row_index', 0)}_{i}"
-            all_chunks.extend(chunks)
+    def discard_version(self):
+        """Delete the unpublished version being built and go back to the live one"""
+        shutil.rmtree(self.persist_directory, ignore_errors=True)
+        self.vectorstore = None
+        self.version = versions.current_version()
+        self.persist_directory = versions.current_path()
+
+    def split_documents(self, documents):
+        """
+        Chunk a stream of Documents, tagging each chunk with a stable chunk_id.
+        Rows that already fit in CHUNK_SIZE pass straight through as a single chunk;
+        only oversize rows go through the recursive splitter.
+        """
+        for doc in documents:
+            start = time.perf_counter()
+            chunks, was_split = chunk_document(doc, config.CHUNK_SIZE, lambda: self.text_splitter)
+            self.split_stats["split" if was_split else "passthrough"] += 1
+            self.stage_timings["split"] = self.stage_timings.get("split", 0.0) + time.perf_counter() - start
+            yield from chunks
 
-        print(f" Created {len(all_chunks)} chunks from {len(documents)} documents")
+    def iter_chunks(self, csv_path: str):
+        """
+        Stream chunks from the CSV: row chunks -> Documents -> splits, nothing held in full.
+        With several workers, row-range shards are built and split in a process pool and
+        come back in row order, as the same chunks. Chunk ids come from row keys
+        (laureate id, year, category), so they survive rows being added, removed or moved.
+        """
+        if self.workers > 1:
+            chunks = iter_sharded_chunks(csv_path, self.workers, self.split_stats, self.stage_timings)
+        else:
+            documents = iter_csv_documents(
+                csv_path,
+                metadata_columns=config.METADATA_COLUMNS,
+                chunksize=config.CSV_READ_CHUNKSIZE
+            )
+            chunks = self.split_documents(timed_iter(documents, self.stage_timings, "load"))
+        return unique_row_keys(chunks)
+
+    def process_csv_row_by_row(self, csv_path: str):
+        """Process CSV into a list of Document chunks"""
+        all_chunks = list(tqdm(self.iter_chunks(csv_path), desc="Splitting documents into chunks"))
+        print(f" Created {len(all_chunks)} chunks")
         return all_chunks
 
-    def create_and_store_embeddings(self, chunks):
-        """Create embeddings in batches and store in Chroma DB"""
-        if not chunks:
-            raise ValueError("No chunks provided for embedding.")
+    def flat_index_path(self) -> str:
+        return os.path.join(self.persist_directory, config.FLAT_INDEX_DIR)
 
-        batch_size = getattr(config, "BATCH_SIZE", 100)
-        for i in tqdm(range(0, len(chunks), batch_size), desc="Storing embeddings"):
-            batch = chunks[i:i + batch_size]
-            if i == 0:
-                self.vectorstore = Chroma.from_documents(
-                    documents=batch,
-                    embedding=self.embeddings,
-                    persist_directory=str(config.CHROMA_PERSIST_DIRECTORY),
-                    collection_name=config.CHROMA_COLLECTION_NAME
+    def _open_vectorstore(self):
+        """Open (or create) the persisted Chroma collection, or the flat index (in memory, for writing)"""
+        if config.VECTOR_STORE_BACKEND == "flat":
+            store = FlatVectorStore.load(self.flat_index_path(), mmap=False)
+            if store is None:
+                store = FlatVectorStore.empty(
+                    self.flat_index_path(), config.FLAT_INDEX_DTYPE,
+                    info={"embedding_model": embedding_model_name()}
                 )
-            else:
-                self.vectorstore.add_documents(batch)
+            return store
+        if config.VECTOR_STORE_BACKEND != "chroma":
+            raise ValueError(f"Unknown vector store backend: {config.VECTOR_STORE_BACKEND} (available: chroma, flat)")
+        from langchain_community.vectorstores import Chroma
+        return Chroma(
+            persist_directory=self.persist_directory,
+            embedding_function=self.embeddings,
+            collection_name=config.CHROMA_COLLECTION_NAME
+        )
+
+    @property
+    def collection(self):
+        """Collection-level API (upsert/get/delete) of the open vector store"""
+        if isinstance(self.vectorstore, FlatVectorStore):
+            return self.vectorstore
+        return self.vectorstore._collection
+
+    def persist_vectors(self):
+        """The flat index is written explicitly; Chroma persists every write itself"""
+        if isinstance(self.vectorstore, FlatVectorStore):
+            self.vectorstore.save()
+
+    def create_and_store_embeddings(self, chunks, checkpoint: dict = None):
+        """
+        Create embeddings and store them in Chroma DB as a two-stage pipeline:
+        a pool of embedding workers feeds a single writer through a bounded queue,
+        so the embedding server keeps working while earlier batches are written.
+
+        If a checkpoint dict (chunk_id -> hash of what is stored) is given, the writer
+        adds every committed batch to it and saves it as an incomplete manifest every
+        INGEST_CHECKPOINT_EVERY batches and on failure, so the run can be resumed.
+        """
+        if self.vectorstore is None:
+            self.vectorstore = self._open_vectorstore()
 
-        print(f" Successfully stored {len(chunks)} chunks in Chroma DB")
+        workers = max(1, config.EMBEDDING_CONCURRENCY)
+        write_queue = queue.Queue(maxsize=config.EMBEDDING_QUEUE_SIZE)
+        # Bounds the batches held in memory (being embedded or waiting for the writer)
+        in_flight = threading.BoundedSemaphore(workers + config.EMBEDDING_QUEUE_SIZE)
+        state = {
+            "embed": 0.0, "write": 0.0, "stored": 0, "batches": 0, "errors": [],
+            "checkpoint": checkpoint, "lock": threading.Lock()
+        }
+        progress = tqdm(
+            desc="Storing embeddings",
+            unit="chunk",
+            total=len(chunks) if hasattr(chunks, "__len__") else None
+        )
+
+        writer = threading.Thread(
+            target=self._write_stage,
+            args=(write_queue, in_flight, state, progress),
+            daemon=True
+        )
+        start = time.perf_counter()
+        writer.start()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for batch in iter_batches(chunks, config.BATCH_SIZE):
+                    if state["errors"]:
+                        break
+                    in_flight.acquire()
+                    pool.submit(self._embed_stage, batch, write_queue, in_flight, state)
+        finally:
+            write_queue.put(None)
+            writer.join()
+            progress.close()
+
+        if state["errors"]:
+            if checkpoint is not None and state["stored"]:
+                self.save_checkpoint(checkpoint)
+                print(f" Ingest failed after {state['stored']} chunks; run it again to resume from the checkpoint")
+            raise state["errors"][0]
+        if not state["stored"]:
+            raise ValueError("No chunks provided for embedding.")
+
+        elapsed = time.perf_counter() - start
+        self.stage_timings.update({
+            "embed": state["embed"],
+            "write": state["write"],
+            "embed_and_store_wall": elapsed
+        })
+        print(f" Successfully stored {state['stored']} chunks in Chroma DB")
+        print(
+            f" Throughput: {state['stored'] / elapsed if elapsed else 0:.1f} chunks/s "
+            f"({workers} embedding workers, batch size {config.BATCH_SIZE}) | "
+            f"embed {state['embed']:.2f}s (summed over workers), write {state['write']:.2f}s, "
+            f"wall {elapsed:.2f}s"
+        )
         return self.vectorstore
 
-    def run(self, csv_path: str):
-        """Run the complete ingestion pipeline"""
+    def _embed_stage(self, batch, write_queue, in_flight, state):
+        """Worker: embed one batch and hand it to the writer"""
+        try:
+            start = time.perf_counter()
+            vectors = self.embeddings.embed_documents([chunk.page_content for chunk in batch])
+            elapsed = time.perf_counter() - start
+            metrics.observe("ingest_batch_seconds", elapsed, stage="embed")
+            with state["lock"]:
+                state["embed"] += elapsed
+            write_queue.put((batch, vectors))
+        except Exception as e:
+            state["errors"].append(e)
+            in_flight.release()
+
+    def _write_stage(self, write_queue, in_flight, state, progress):
+        """Single writer: upsert embedded batches into the collection in arrival order"""
+        while True:
+            item = write_queue.get()
+            if item is None:
+                return
+            batch, vectors = item
+            try:
+                # Keep draining after a failure so embedding workers never block on the queue
+                if not state["errors"]:
+                    start = time.perf_counter()
+                    # chunk_id doubles as the Chroma id so re-ingests upsert in place
+                    self.collection.upsert(
+                        ids=[chunk.metadata["chunk_id"] for chunk in batch],
+                        embeddings=vectors,
+                        metadatas=[chunk.metadata for chunk in batch],
+                        documents=[chunk.page_content for chunk in batch]
+                    )
+                    elapsed = time.perf_counter() - start
+                    metrics.observe("ingest_batch_seconds", elapsed, stage="write")
+                    state["write"] += elapsed
+                    state["stored"] += len(batch)
+                    state["batches"] += 1
+                    progress.update(len(batch))
+                    if state["checkpoint"] is not None:
+                        for chunk in batch:
+                            state["checkpoint"][chunk.metadata["chunk_id"]] = compute_chunk_hash(chunk)
+                        if state["batches"] % config.INGEST_CHECKPOINT_EVERY == 0:
+                            self.save_checkpoint(state["checkpoint"], periodic=True)
+            except Exception as e:
+                state["errors"].append(e)
+            finally:
+                in_flight.release()
+
+    # ---------------- SPARSE INDEX ----------------
+    def build_sparse_index(self):
+        """Rebuild the BM25 index from everything now in the collection (before the manifest is saved)"""
+        if not config.HYBRID_RETRIEVAL_ENABLED:
+            return
+        start = time.perf_counter()
+        index = BM25Index.from_vectorstore(self.collection, k1=config.BM25_K1, b=config.BM25_B)
+        index.save(os.path.join(self.persist_directory, config.BM25_INDEX_FILE))
+        self.stage_timings["bm25"] = time.perf_counter() - start
+        print(f" BM25 index: {len(index.ids)} chunks, {len(index.postings)} terms")
+
+    # ---------------- MANIFEST ----------------
+    def manifest_path(self) -> str:
+        return os.path.join(self.persist_directory, config.INGEST_MANIFEST_FILE)
+
+    def build_manifest(self, chunk_hashes: dict, complete: bool = True) -> dict:
+        """
+        Manifest recording which chunks (and which versions of them) are in the collection.
+        complete=False marks a checkpoint of an interrupted run.
+        """
+        return {
+            "collection_name": config.CHROMA_COLLECTION_NAME,
+            "embedding_model": embedding_model_name(),
+            "chunk_size": config.CHUNK_SIZE,
+            "chunk_overlap": config.CHUNK_OVERLAP,
+            "vector_store": self.vector_store_name(),
+            # Chunk ids were positional ("{row_index}_{i}") before; such manifests are rebuilt
+            "chunk_ids": "row_key",
+            "complete": complete,
+            "chunks": chunk_hashes
+        }
+
+    def load_manifest(self):
+        path = self.manifest_path()
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f" Warning: could not read ingest manifest: {e}")
+            return None
+
+    def save_manifest(self, manifest: dict):
+        """Write the manifest atomically so a crash never leaves it half-written"""
+        path = self.manifest_path()
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def vector_store_name(self) -> str:
+        if config.VECTOR_STORE_BACKEND == "flat":
+            return f"flat-{config.FLAT_INDEX_DTYPE}"
+        return config.VECTOR_STORE_BACKEND
+
+    def save_checkpoint(self, chunk_hashes: dict, periodic: bool = False):
+        """
+        Save the vectors and an incomplete manifest listing chunk_hashes. The flat index is
+        rewritten whole, so periodic checkpoints skip it until a save is due (see
+        FlatVectorStore.save_due); the last checkpoint saved still matches what is on disk.
+        """
+        if periodic and isinstance(self.vectorstore, FlatVectorStore) and not self.vectorstore.save_due():
+            return
+        self.persist_vectors()
+        self.save_manifest(self.build_manifest(dict(chunk_hashes), complete=False))
+
+    def manifest_is_compatible(self, manifest: dict) -> bool:
+        """A manifest is only reusable if the collection was built with the same settings"""
+        expected = self.build_manifest({})
+        # Manifests written before the vector store was selectable describe a Chroma DB
+        manifest = {"vector_store": "chroma", **manifest}
+        return all(
+            manifest.get(key) == value
+            for key, value in expected.items()
+            if key not in ("chunks", "complete")
+        )
+
+    def run_incremental(self, csv_path: str):
+        """
+        Embed only new/changed chunks and delete chunks that disappeared from the CSV.
+        Changes go into a copy of the live version, made once the first change is found
+        and published when done; an unchanged CSV publishes nothing. Also resumes an
+        interrupted build: its checkpoint lists the chunks already stored.
+        """
+        manifest = self.load_manifest()
+        if manifest is None or not self.manifest_is_compatible(manifest):
+            print(" No compatible ingest manifest found, running full ingestion")
+            return self.run(csv_path)
+
+        previous = manifest.get("chunks", {})
+        # Stored chunks as of now; updated batch by batch and saved as checkpoints
+        stored = dict(previous)
+        current = {}
+        stats = {"added": 0, "updated": 0, "deleted": 0, "skipped": 0}
+
+        def changed_chunks():
+            for chunk in self.iter_chunks(csv_path):
+                chunk_id = chunk.metadata["chunk_id"]
+                chunk_hash = compute_chunk_hash(chunk)
+                current[chunk_id] = chunk_hash
+
+                if chunk_id not in previous:
+                    stats["added"] += 1
+                    yield chunk
+                elif previous[chunk_id] != chunk_hash:
+                    stats["updated"] += 1
+                    yield chunk
+                else:
+                    stats["skipped"] += 1
+
+        # Scans the CSV up to the first change (all of it if nothing changed)
+        to_upsert = peek(changed_chunks())
+        if not current:
+            print(" No chunks created from CSV")
+            return None
+
+        changed = to_upsert is not None or any(chunk_id not in current for chunk_id in previous)
+        if self.version is None or self.version == versions.current_version():
+            if not changed:
+                self.last_run_stats = stats
+                print(f" Incremental ingest: collection unchanged ({stats['skipped']} chunks), live version kept")
+                self.report_stage_timings()
+                self.record_metrics()
+                return None
+            self.start_version(copy_from=self.persist_directory)
+            # The copy is incomplete (resumable) until the update is published
+            self.save_checkpoint(previous)
+
+        self.vectorstore = self._open_vectorstore()
+        if to_upsert is not None:
+            self.create_and_store_embeddings(to_upsert, checkpoint=stored)
+
+        stale_ids = [chunk_id for chunk_id in previous if chunk_id not in current]
+        stats["deleted"] = len(stale_ids)
+        if stale_ids:
+            self.collection.delete(ids=stale_ids)
+
+        self.persist_vectors()
+        self.build_sparse_index()
+        self.save_manifest(self.build_manifest(current))
+        self.publish()
+        self.last_run_stats = stats
+        print(
+            f" Incremental ingest: {stats['added']} added, {stats['updated']} updated, "
+            f"{stats['deleted']} deleted, {stats['skipped']} skipped"
+        )
+        self.report_stage_timings()
+        self.report_cache_stats()
+        self.record_metrics()
+        return self.vectorstore
+
+    def reset_stats(self):
+        self.stage_timings = {}
+        self.split_stats = {"passthrough": 0, "split": 0}
+
+    def report_stage_timings(self):
+        stages = ["plan", "load", "split", "shard_wait", "embed", "write", "embed_and_store_wall", "bm25"]
+        timings = " | ".join(
+            f"{stage} {self.stage_timings[stage]:.2f}s" for stage in stages if stage in self.stage_timings
+        )
+        print(f" Stage timings: {timings}")
+        print(
+            f" Chunking: {self.split_stats['passthrough']} rows passed through as one chunk, "
+            f"{self.split_stats['split']} rows split"
+        )
+
+    def record_metrics(self):
+        """Publish the run's stage timings and chunk counts to the metrics registry"""
+        for stage, seconds in self.stage_timings.items():
+            metrics.observe("ingest_stage_seconds", seconds, stage=stage)
+        for status, count in self.last_run_stats.items():
+            metrics.inc("ingest_chunks_total", count, status=status)
+
+    def report_cache_stats(self):
+        if hasattr(self.embeddings, "stats"):
+            stats = self.embeddings.stats()
+            print(
+                f" Embedding cache: {stats['memory_hits'] + stats['disk_hits']} hits, "
+                f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)"
+            )
+
+    def run(self, csv_path: str, incremental: bool = False, resume: bool = True):
+        """
+        Run the complete ingestion pipeline. If the last run was interrupted (its manifest
+        is an incomplete checkpoint), resume it instead of clearing the DB, unless resume=False.
+        """
         if not os.path.exists(csv_path):
             print(f" CSV file not found: {csv_path}")
             return None
 
+        self.reset_stats()
+        if incremental:
+            print(" Running incremental data ingestion pipeline...")
+            return self.run_incremental(csv_path)
+
+        interrupted = self.find_interrupted_version() if resume else None
+        if interrupted is not None:
+            version, manifest = interrupted
+            print(
+                f" Resuming interrupted ingestion of version {version} from its checkpoint "
+                f"({len(manifest.get('chunks', {}))} chunks already stored)..."
+            )
+            self.use_version(version)
+            return self.run_incremental(csv_path)
+
         print(" Running data ingestion pipeline...")
-        self.clear_existing_db()
-        chunks = self.process_csv_row_by_row(csv_path)
-        if not chunks:
+        # Build next to the live collection, which keeps serving until the new one is published
+        self.start_version()
+        # Mark the new collection as incomplete until the run finishes
+        self.save_checkpoint({})
+        chunk_hashes = {}
+
+        def tracked_chunks():
+            for chunk in self.iter_chunks(csv_path):
+                chunk_hashes[chunk.metadata["chunk_id"]] = compute_chunk_hash(chunk)
+                yield chunk
+
+        chunks = peek(tracked_chunks())
+        if chunks is None:
             print(" No chunks created from CSV")
+            self.discard_version()
             return None
 
-        return self.create_and_store_embeddings(chunks)
+        vectorstore = self.create_and_store_embeddings(chunks, checkpoint={})
+        self.persist_vectors()
+        self.build_sparse_index()
+        self.save_manifest(self.build_manifest(chunk_hashes))
+        self.publish()
+        self.last_run_stats = {"added": len(chunk_hashes), "updated": 0, "deleted": 0, "skipped": 0}
+        self.report_stage_timings()
+        self.report_cache_stats()
+        self.record_metrics()
+        return vectorstore
 
 
-def main():
+def export_flat_index(dtype: str = None):
+    """Export the existing Chroma collection to a flat index next to it (python main.py export-flat)"""
+    from langchain_community.vectorstores import Chroma
+    dtype = dtype or config.FLAT_INDEX_DTYPE
     pipeline = IngestionPipeline()
-    pipeline.run(str(config.CSV_FILE_PATH))
+    manifest = pipeline.load_manifest() or {}
+    vectorstore = Chroma(
+        persist_directory=pipeline.persist_directory,
+        collection_name=config.CHROMA_COLLECTION_NAME
+    )
+    start = time.perf_counter()
+    store = export_from_chroma(
+        vectorstore._collection, pipeline.flat_index_path(), dtype,
+        info={"embedding_model": manifest.get("embedding_model"), "source": "chroma"}
+    )
+    size = sum(os.path.getsize(path) for path in store.files())
+    print(
+        f" Exported {store.count()} vectors ({dtype}) to {store.path} "
+        f"in {time.perf_counter() - start:.2f}s ({size / 1e6:.1f} MB)"
+    )
+    print(" Set VECTOR_STORE_BACKEND=flat to search it")
+    return store
+
+
+def parse_workers(args: List[str]) -> Optional[int]:
+    """N from `--workers N` (or --workers=N) on a command line, None if absent; exits on a bad N"""
+    for i, arg in enumerate(args):
+        if arg == "--workers" or arg.startswith("--workers="):
+            value = arg.partition("=")[2] if "=" in arg else (args[i + 1] if i + 1 < len(args) else "")
+            if not value.isdigit() or int(value) < 1:
+                print(f" --workers needs a number of processes, e.g. --workers 4" + (f" (got {value!r})" if value else ""))
+                sys.exit(2)
+            return int(value)
+    return None
+
+
+def main(incremental: bool = False, resume: bool = True, workers: int = None):
+    pipeline = IngestionPipeline(workers=workers)
+    pipeline.run(str(config.CSV_FILE_PATH), incremental=incremental, resume=resume)
 
 
 if __name__ == "__main__":
-    main()
+    args = sys.argv[1:]
+    main(
+        incremental="--incremental" in args,
+        resume="--no-resume" not in args,
+        workers=parse_workers(args)
+    )
@@ -0,0 +1,113 @@
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+from structured_index import fold
+from metrics import registry as metrics
+
+YEAR = "<year>"
+YEAR_REGEX = r"1[89]\d{2}|20\d{2}"
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def normalize(text: str) -> str:
+    """Folded words joined by single spaces ("Hi!" -> "hi"), the form phrases are compared in"""
+    return " ".join(WORD_PATTERN.findall(fold(text)))
+
+
+class IntentRouter:
+    """
+    Routes a query to an intent from a rule table (config.QUERY_INTENTS).
+
+    Every phrase of every rule goes into one alternation (longest first, word
+    boundaries, any non-word run between the words of a phrase), so the folded
+    query is scanned once whatever the size of the table. A matched phrase also
+    counts for the table phrases it contains ("first winner" also matches
+    "winner"). Rules are then checked in order against the set of matched phrases.
+    """
+
+    def __init__(self, rules: List[dict], answers: Dict[str, str], default_intent: str = "off_topic"):
+        self.rules = [
+            {
+                "intent": rule["intent"],
+                "phrases": {normalize(p) for p in rule["phrases"]},
+                "with": {p if p == YEAR else normalize(p) for p in rule.get("with", [])},
+                "unless": {normalize(p) for p in rule.get("unless", [])},
+                "exact": rule.get("exact", False)
+            }
+            for rule in rules
+        ]
+        self.answers = dict(answers)
+        self.default_intent = default_intent
+
+        phrases = set()
+        for rule in self.rules:
+            phrases |= rule["phrases"] | rule["unless"] | (rule["with"] - {YEAR})
+        phrases.discard("")
+        alternation = "|".join(
+            r"\W+".join(re.escape(word) for word in p.split()) for p in sorted(phrases, key=len, reverse=True)
+        )
+        self.pattern = re.compile(rf"(?<!\w)(?:(?P<year>{YEAR_REGEX})|{alternation})(?!\w)")
+        self.implied = {
+            phrase: {p for p in phrases if re.search(rf"(?<!\w){re.escape(p)}(?!\w)", phrase)}
+            for phrase in phrases
+        }
+
+        self.counts = Counter()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls) -> "IntentRouter":
+        import config
+        return cls(config.QUERY_INTENTS, config.INTENT_ANSWERS)
+
+    def matches(self, text: str) -> set:
+        """Phrases (and YEAR) found in folded text, in one regex pass"""
+        found = set()
+        for match in self.pattern.finditer(text):
+            if match.group("year"):
+                found.add(YEAR)
+            else:
+                found |= self.implied[normalize(match.group(0))]
+        return found
+
+    def route(self, query: str) -> str:
+        text = fold(query)
+        found = self.matches(text)
+        for rule in self.rules:
+            if not rule["phrases"] & found:
+                continue
+            if rule["exact"]:
+                if normalize(text) in rule["phrases"]:
+                    return rule["intent"]
+                continue
+            if rule["with"] and not rule["with"] & found:
+                continue
+            if rule["unless"] & found:
+                continue
+            return rule["intent"]
+        return self.default_intent
+
+    def answer(self, intent: str) -> Optional[str]:
+        """Canned answer for an intent, or None if it needs retrieval"""
+        return self.answers.get(intent)
+
+    # ---------------- COUNTS ----------------
+    def record(self, intent: str):
+        """Count one request for an intent (once per request, wherever it is answered)"""
+        with self._lock:
+            self.counts[intent] += 1
+        metrics.inc("rag_requests_total", route=intent)
+
+    def stats(self) -> dict:
+        """Requests per intent and the share answered without retrieval or an LLM call"""
+        with self._lock:
+            counts = dict(self.counts)
+        total = sum(counts.values())
+        diverted = sum(count for intent, count in counts.items() if intent in self.answers)
+        return {
+            "counts": counts,
+            "total": total,
+            "diverted": diverted,
+            "diverted_share": diverted / total if total else 0.0
+        }
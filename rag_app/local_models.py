@@ -0,0 +1,100 @@
+import hashlib
+import math
+import re
+from typing import Any, Iterator, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+# ---------------- STUB BACKENDS (offline / tests) ----------------
+class HashingEmbeddings(Embeddings):
+    """
+    Deterministic feature-hashing embeddings: word unigrams and bigrams hashed into
+    a fixed number of signed buckets, then L2-normalized. No model, no network.
+    Queries and documents are embedded identically.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+        return [v / norm for v in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class EchoChatModel(BaseChatModel):
+    """
+    Deterministic stand-in for the chat LLM: answers with the first retrieved
+    context block from the prompt, formatted as bullet points. Supports streaming.
+    """
+
+    max_lines: int = 6
+
+    @property
+    def _llm_type(self) -> str:
+        return "echo-stub"
+
+    def _answer(self, messages: List[BaseMessage]) -> str:
+        prompt = messages[-1].content if messages else ""
+        context = prompt.split("Context:", 1)[-1].split("Question:", 1)[0].strip()
+        block = context.split("\n\n", 1)[0]
+        lines = [line for line in block.splitlines() if line.strip()][:self.max_lines]
+        if not lines:
+            return "Sorry, I don’t have information about that."
+        return "### Answer\n\n" + "\n".join(f"- {line}" for line in lines)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._answer(messages)))])
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for token in re.split(r"(\s+)", self._answer(messages)):
+            if token:
+                chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+                if run_manager:
+                    run_manager.on_llm_new_token(token, chunk=chunk)
+                yield chunk
+
+
+class LocalEmbeddings(Embeddings):
+    """
+    In-process CPU embeddings from a static (model2vec) model: tokens are looked up
+    in an embedding table and pooled with batched NumPy operations, so there is no
+    HTTP round-trip per call. Requires `pip install model2vec`.
+    """
+
+    def __init__(self, model_name: str, batch_size: int = 256):
+        try:
+            from model2vec import StaticModel
+        except ImportError as e:
+            raise ImportError("The 'local' embedding backend requires model2vec: pip install model2vec") from e
+        self.model = StaticModel.from_pretrained(model_name)
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        vectors = self.model.encode(list(texts), batch_size=self.batch_size, normalize=True)
+        return vectors.astype("float32").tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
@@ -1,27 +1,48 @@
 import sys
-import os
 
-from ingestion_pipeline import main as ingestion_main
-from retrieval_pipeline import RetrievalPipeline
+# Each command imports only what it needs, so e.g. `ingest` never loads the LLM client
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python main.py ingest       - Run data ingestion")
+        print("  python main.py ingest --incremental - Only embed new/changed rows")
+        print("  python main.py ingest --no-resume   - Start over even if the last run was interrupted")
+        print("  python main.py ingest --workers N   - Parse and split the CSV in N processes")
         print("  python main.py chat         - Run interactive chat (CLI)")
+        print("  python main.py export-flat [--dtype float16|int8] - Export chroma_db/ to the flat vector index")
+        print("  python main.py serve        - Run the HTTP query service (POST /ask, GET /stats)")
+        print("  python main.py bench        - Retrieval recall/MRR/latency benchmark (--help for options)")
         print("  streamlit run streamlit_app.py  - Run web UI")
         sys.exit(1)
 
     command = sys.argv[1].lower()
 
     if command == "ingest":
+        from ingestion_pipeline import main as ingestion_main, parse_workers
+        args = sys.argv[2:]
+        workers = parse_workers(args)
         print(" Running data ingestion pipeline...")
-        ingestion_main()
+        ingestion_main(
+            incremental="--incremental" in args,
+            resume="--no-resume" not in args,
+            workers=workers
+        )
+    elif command == "export-flat":
+        from ingestion_pipeline import export_flat_index
+        args = sys.argv[2:]
+        export_flat_index(args[args.index("--dtype") + 1] if "--dtype" in args[:-1] else None)
     elif command == "chat":
         print(" Interactive chat mode is not implemented in this pipeline version.")
         print("Please use the Streamlit UI:")
         print("  streamlit run streamlit_app.py")
         sys.exit(0)
+    elif command == "serve":
+        from server import serve
+        serve()
+    elif command == "bench":
+        from benchmarks.retrieval_eval import main as bench_main
+        bench_main(sys.argv[2:])
     else:
         print(f" Unknown command: {command}")
-        print("Use 'ingest' or 'chat'.")
+        print("Use 'ingest', 'export-flat', 'chat', 'serve' or 'bench'.")
@@ -0,0 +1,199 @@
+import functools
+import re
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Dict, Tuple
+from utils import percentile
+import config
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Upper bounds of the buckets for counts (tokens, documents)
+COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+_NULL_SPAN = nullcontext()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (words and punctuation) when the LLM reports no usage"""
+    return len(TOKEN_PATTERN.findall(text or ""))
+
+
+class Histogram:
+    """Cumulative buckets for Prometheus, plus a window of recent samples for percentiles"""
+
+    def __init__(self, buckets: Tuple[float, ...], window: int):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] += 1
+                break
+
+    def summary(self) -> dict:
+        recent = list(self.recent)
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": percentile(recent, 50),
+            "p95": percentile(recent, 95),
+            "p99": percentile(recent, 99)
+        }
+
+
+class Span:
+    """Times a block into a latency histogram: with metrics.span("search"): ..."""
+
+    __slots__ = ("registry", "name", "labels", "start")
+
+    def __init__(self, registry, name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            self.registry.inc("rag_errors_total", stage=self.labels.get("stage", self.name))
+        return False
+
+
+class MetricsRegistry:
+    """
+    In-process counters and histograms for the RAG and ingestion hot paths.
+
+    Metric names ending in _seconds use latency buckets, everything else count
+    buckets. When disabled every call returns immediately and span() hands back a
+    shared no-op context manager, so instrumentation costs one attribute check.
+    """
+
+    def __init__(self, enabled: bool = True, window: int = 1000):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self.counters: Dict[tuple, float] = {}
+        self.histograms: Dict[tuple, Histogram] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return (name, tuple(sorted(labels.items())))
+
+    # ---------------- RECORDING ----------------
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                buckets = LATENCY_BUCKETS if name.endswith("_seconds") else COUNT_BUCKETS
+                histogram = self.histograms[key] = Histogram(buckets, self.window)
+            histogram.observe(value)
+
+    def span(self, stage: str, name: str = "rag_stage_seconds"):
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, {"stage": stage})
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    # ---------------- EXPORT ----------------
+    def summaries(self, name: str, label: str = "stage") -> Dict[str, dict]:
+        """Histogram summaries of one metric keyed by a label value, e.g. per-stage latencies"""
+        with self._lock:
+            return {
+                dict(labels).get(label, ""): histogram.summary()
+                for (metric, labels), histogram in self.histograms.items()
+                if metric == name
+            }
+
+    @staticmethod
+    def _format_labels(labels: tuple, extra: str = "") -> str:
+        parts = [f'{key}="{value}"' for key, value in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(self.histograms.items(), key=lambda item: item[0])
+
+            seen = set()
+            for (name, labels), value in counters:
+                if name not in seen:
+                    lines.append(f"# TYPE {name} counter")
+                    seen.add(name)
+                lines.append(f"{name}{self._format_labels(labels)} {value:g}")
+
+            for (name, labels), histogram in histograms:
+                if name not in seen:
+                    lines.append(f"# TYPE {name} histogram")
+                    seen.add(name)
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative += count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{name}_bucket{self._format_labels(labels, le)} {cumulative}")
+                inf = 'le="+Inf"'
+                lines.append(f"{name}_bucket{self._format_labels(labels, inf)} {histogram.count}")
+                lines.append(f"{name}_sum{self._format_labels(labels)} {histogram.sum:g}")
+                lines.append(f"{name}_count{self._format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict:
+        """JSON-friendly dump: counters and histogram summaries keyed by name{labels}"""
+        with self._lock:
+            return {
+                "counters": {
+                    f"{name}{self._format_labels(labels)}": value
+                    for (name, labels), value in sorted(self.counters.items())
+                },
+                "histograms": {
+                    f"{name}{self._format_labels(labels)}": histogram.summary()
+                    for (name, labels), histogram in sorted(self.histograms.items(), key=lambda item: item[0])
+                }
+            }
+
+
+def timed(stage: str, name: str = "rag_request_seconds"):
+    """Decorator recording a function's wall time into the shared registry"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with registry.span(stage, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Process-wide registry shared by the pipelines, the HTTP service and the UI
+registry = MetricsRegistry(enabled=config.METRICS_ENABLED, window=config.METRICS_WINDOW)
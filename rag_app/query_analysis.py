@@ -0,0 +1,73 @@
+import re
+from typing import Dict, Optional
+from structured_index import BIRTH_WORDS, CATEGORY_SYNONYMS, DEATH_WORDS, GENDER_WORDS, YEAR_PATTERN, compile_terms, fold
+
+# Organizations as the subject ("which organizations won", "organization laureates", "winning
+# institutions"), as opposed to "which organization was Einstein affiliated with"
+_ORGANIZATION = r"(?:organi[sz]ations?|institutions?)"
+ORGANIZATION_SUBJECT_PATTERN = re.compile(
+    rf"\b{_ORGANIZATION}\s+(?:laureates?|winners?|recipients?|won|wins?|received|receive|got|"
+    rf"(?:that|which|who)\s+(?:won|wins?|received|got|were\s+awarded|was\s+awarded|have\s+won|has\s+won)|"
+    rf"(?:were|was|have\s+been|has\s+been)\s+awarded|(?:have|has|ever)\s+won)\b"
+    rf"|\b(?:winning|laureate|awarded|honou?red)\s+{_ORGANIZATION}\b"
+)
+
+
+class QueryAnalyzer:
+    """
+    Extracts metadata constraints (category, awardYear, gender, birth_country or
+    death_country, ind_or_org) from a question and turns them into a Chroma `where`
+    filter. Constraints are only emitted when they are unambiguous.
+    """
+
+    def __init__(self, countries: Dict[str, str] = None):
+        # folded country name/alias -> birth_country value as stored in metadata
+        self.countries = countries or {}
+        self.category_pattern = compile_terms(CATEGORY_SYNONYMS)
+        self.gender_pattern = compile_terms(GENDER_WORDS)
+        self.country_pattern = compile_terms(self.countries)
+        self.birth_pattern = compile_terms(BIRTH_WORDS)
+        self.death_pattern = compile_terms(DEATH_WORDS)
+
+    def extract_constraints(self, query: str) -> Dict[str, str]:
+        folded = fold(query)
+        constraints = {}
+
+        categories = {CATEGORY_SYNONYMS[m] for m in self.category_pattern.findall(folded)}
+        if len(categories) == 1:
+            constraints["category"] = categories.pop()
+
+        born = bool(self.birth_pattern.search(folded))
+        died = bool(self.death_pattern.search(folded))
+
+        # Years in "born in 1921" / "died in 1955" are not award years (and no metadata holds them)
+        years = set(YEAR_PATTERN.findall(folded))
+        if len(years) == 1 and not (born or died):
+            constraints["awardYear"] = years.pop()
+
+        genders = {GENDER_WORDS[m] for m in self.gender_pattern.findall(folded)}
+        if len(genders) == 1:
+            constraints["gender"] = genders.pop()
+
+        if self.country_pattern:
+            countries = {self.countries[m] for m in self.country_pattern.findall(folded)}
+            if len(countries) == 1 and not (born and died):
+                constraints["death_country" if died else "birth_country"] = countries.pop()
+
+        if ORGANIZATION_SUBJECT_PATTERN.search(folded):
+            constraints["ind_or_org"] = "Organization"
+
+        return constraints
+
+    @staticmethod
+    def to_where(constraints: Dict[str, str]) -> Optional[dict]:
+        """Chroma `where` clause; metadata values are stored as strings"""
+        clauses = [{key: value} for key, value in constraints.items()]
+        if not clauses:
+            return None
+        if len(clauses) == 1:
+            return clauses[0]
+        return {"$and": clauses}
+
+    def build_filter(self, query: str) -> Optional[dict]:
+        return self.to_where(self.extract_constraints(query))
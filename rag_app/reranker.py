@@ -0,0 +1,117 @@
+import importlib.util
+from typing import Callable, Dict, List, Tuple
+from sparse_index import tokenize
+
+# Words that say nothing about which chunk is relevant
+QUERY_STOPWORDS = {
+    "a", "an", "and", "the", "of", "in", "for", "to", "on", "at", "by", "with", "from",
+    "who", "whom", "what", "which", "when", "where", "why", "how", "is", "was", "were", "are",
+    "did", "do", "does", "has", "have", "had", "won", "win", "wins", "receive", "received",
+    "awarded", "give", "given", "nobel", "prize", "prizes", "laureate", "laureates", "tell", "me", "about",
+    # Question words that are also surnames ("born in Germany" is not about Max Born)
+    "born", "birth",
+}
+
+# Lexical scorer: weight of each signal. Metadata signals score 1 when the chunk's value
+# equals the constraint extracted from the question; "name" is the fraction of the
+# laureate/organization name found among the question's content words; "terms" the
+# fraction of those content words found in the chunk.
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "awardYear": 1.0,
+    "category": 1.0,
+    "birth_country": 1.0,
+    "death_country": 1.0,
+    "gender": 0.5,
+    "ind_or_org": 0.5,
+    "terms": 1.0,
+}
+
+
+# ---------------- SCORERS ----------------
+SCORERS: Dict[str, Callable] = {}
+
+
+def register_scorer(name: str):
+    """Register a scorer factory; a scorer maps (query, docs, constraints) to one score per doc"""
+    def decorator(factory):
+        SCORERS[name] = factory
+        return factory
+    return decorator
+
+
+@register_scorer("lexical")
+class LexicalScorer:
+    """Field-match scorer: exact name, year, category and country hits plus term overlap"""
+
+    def __init__(self, weights: Dict[str, float] = None):
+        self.weights = weights or FIELD_WEIGHTS
+
+    def score(self, query: str, docs, constraints: dict) -> List[float]:
+        content_terms = set(tokenize(query)) - QUERY_STOPWORDS
+        scores = []
+        for doc in docs:
+            metadata = doc.metadata or {}
+            score = 0.0
+
+            name_terms = set(tokenize(metadata.get("fullName") or metadata.get("orgName") or ""))
+            if name_terms:
+                score += self.weights["name"] * len(name_terms & content_terms) / len(name_terms)
+
+            for key, value in (constraints or {}).items():
+                if key in self.weights and str(metadata.get(key)) == value:
+                    score += self.weights[key]
+
+            if content_terms:
+                doc_terms = set(tokenize(doc.page_content))
+                score += self.weights["terms"] * len(content_terms & doc_terms) / len(content_terms)
+            scores.append(score)
+        return scores
+
+
+@register_scorer("cross-encoder")
+class CrossEncoderScorer:
+    """Cross-encoder relevance model (sentence-transformers, optional dependency)"""
+
+    def __init__(self, model_name: str = None):
+        import config
+        if importlib.util.find_spec("sentence_transformers") is None:
+            raise ImportError("sentence-transformers is not installed: pip install sentence-transformers")
+        from sentence_transformers import CrossEncoder
+        self.model = CrossEncoder(model_name or config.RERANKER_CROSS_ENCODER_MODEL, device="cpu")
+
+    def score(self, query: str, docs, constraints: dict) -> List[float]:
+        return [float(s) for s in self.model.predict([(query, doc.page_content) for doc in docs])]
+
+
+def create_scorer(name: str):
+    if name not in SCORERS:
+        raise ValueError(f"Unknown reranker: {name} (available: {', '.join(sorted(SCORERS))})")
+    return SCORERS[name]()
+
+
+# ---------------- RERANKER ----------------
+class Reranker:
+    """
+    Second retrieval stage: re-scores over-fetched candidates and keeps at most k.
+
+    Scores are min-max scaled within the candidate list, so one threshold works
+    for any scorer: a candidate is kept if its scaled score is at least `threshold`
+    (the best candidate always passes; equal scores all pass). Ties keep the
+    retrieval order.
+    """
+
+    def __init__(self, scorer, threshold: float = 0.5):
+        self.scorer = scorer
+        self.threshold = threshold
+
+    def rerank(self, query: str, docs, constraints: dict, k: int) -> Tuple[list, List[float]]:
+        """(kept docs, their scaled scores), best first"""
+        if not docs:
+            return [], []
+        raw = self.scorer.score(query, docs, constraints)
+        low, high = min(raw), max(raw)
+        scaled = [(s - low) / (high - low) if high > low else 1.0 for s in raw]
+        order = sorted(range(len(docs)), key=lambda i: -scaled[i])
+        kept = [i for i in order if scaled[i] >= self.threshold][:k]
+        return [docs[i] for i in kept], [scaled[i] for i in kept]
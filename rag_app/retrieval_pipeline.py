@@ -1,44 +1,29 @@
-from langchain_ollama import OllamaEmbeddings
-from langchain_community.vectorstores import Chroma
-from langchain_classic.chains import RetrievalQA
-from langchain_core.prompts import PromptTemplate
+from backends import create_embeddings, embedding_model_name, create_llm, warm_up_llm
+from langchain_core.documents import Document
+import asyncio
+import gc
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+import weakref
+from collections import defaultdict, deque
 import config
-from langchain_groq import ChatGroq
+from structured_index import StructuredIndex
+from query_analysis import QueryAnalyzer
+from answer_cache import AnswerCache
+from sparse_index import BM25Index, reciprocal_rank_fusion
+from context_compression import ContextCompressor
+from reranker import Reranker, create_scorer
+from intent_router import IntentRouter
+from metrics import registry as metrics, estimate_tokens, timed
+import collection_versions as versions
+from utils import lazy_property
 
-class RetrievalPipeline:
-    """
-    Retrieval-based pipeline for answering Nobel Prize related questions.
-    Handles greetings, ambiguity, invalid categories, and off-topic queries.
-    """
-
-    def __init__(self):
-        # Initialize embedding model
-        self.embeddings = OllamaEmbeddings(
-            model=config.OLLAMA_EMBEDDING_MODEL,
-            base_url=config.OLLAMA_BASE_URL
-        )
-
-        # Load existing Chroma vector store
-        self.vectorstore = Chroma(
-            persist_directory=str(config.CHROMA_PERSIST_DIRECTORY),
-            embedding_function=self.embeddings,
-            collection_name=config.CHROMA_COLLECTION_NAME
-        )
-
-        # Initialize LLM (low temperature for factual accuracy)
-        # self.llm = ChatOlaama(
-        #     model=config.OLLAMA_LLM_MODEL,
-        #     base_url=config.OLLAMA_BASE_URL,
-        #     temperature=0.0,
-        #     top_p=0.9,
-        #     num_ctx=4096
-        # )
-        self.llm = ChatGroq(
-            model=config.GROQ_MODEL,
-            temperature=0.7
-        )
-        # Prompt enforcing strict context usage
-        prompt_template = """
+# Prompt enforcing strict context usage
+PROMPT_TEMPLATE = """
 You are a Nobel Prize information assistant.
 
 Use only the provided context to answer the question.
@@ -59,65 +44,706 @@ Question:
 Answer:
 """
 
-        self.prompt = PromptTemplate(
-            template=prompt_template,
-            input_variables=["context", "question"]
+
+def _renew_lease_periodically(pipeline_ref, stop: threading.Event):
+    # Holds only a weak reference, so an unused pipeline is still collected
+    while not stop.wait(config.COLLECTION_LEASE_HEARTBEAT_SECONDS):
+        pipeline = pipeline_ref()
+        if pipeline is None:
+            return
+        pipeline.renew_lease()
+        del pipeline
+
+
+def _end_lease(lease_id: str, stop: threading.Event):
+    stop.set()
+    versions.release_lease(lease_id)
+
+
+class RetrievalPipeline:
+    """
+    Retrieval-based pipeline for answering Nobel Prize related questions.
+    Handles greetings, ambiguity, invalid categories, and off-topic queries.
+    """
+
+    def __init__(self):
+        # Heavy components (embeddings, Chroma, LLM client, CSV indexes) are built on
+        # first use by the lazy properties below, so constructing a pipeline is cheap.
+        # RLock: building one component may build another (vectorstore -> embeddings).
+        self._init_lock = threading.RLock()
+
+        # Context assembly under a prompt token budget
+        self.context_compressor = None
+        if config.CONTEXT_COMPRESSION_ENABLED:
+            self.context_compressor = ContextCompressor(
+                token_budget=config.CONTEXT_TOKEN_BUDGET,
+                drop_irrelevant_fields=config.CONTEXT_DROP_IRRELEVANT_FIELDS
+            )
+        self.context_stats = deque(maxlen=1000)
+
+        # Per-request re-ranking stats: candidates in, chunks kept, seconds spent
+        self.rerank_stats = deque(maxlen=1000)
+
+        # Per-request time-to-first-token / total timings of streamed answers
+        self.stream_timings = deque(maxlen=1000)
+
+        # Async API: one pipeline-owned event loop, global cap on in-flight LLM calls
+        self._loop = None
+        self._loop_lock = threading.Lock()
+        self._llm_semaphore = asyncio.Semaphore(config.MAX_CONCURRENT_LLM_CALLS)
+
+        # Collection version served (collection_versions.py). A newly published version is
+        # loaded on a background thread and swapped in; requests use the old one meanwhile
+        self.collection_version = versions.current_version()
+        self.persist_directory = versions.current_path()
+        self._pointer_mtime = versions.pointer_mtime()
+        self._swap_lock = threading.Lock()
+        self._swap_thread = None
+        # Vector store replaced by the last swap, closed at the next one (after in-flight queries)
+        self._retired_vectorstore = None
+        self._retired_version = None
+        self.swap_stats = deque(maxlen=100)
+        # Lease on the served and the retired version, so collect_garbage() leaves them alone
+        self._lease_id = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._lease_stop = threading.Event()
+        self.renew_lease()
+        threading.Thread(
+            target=_renew_lease_periodically, args=(weakref.ref(self), self._lease_stop),
+            name="rag-collection-lease", daemon=True
+        ).start()
+        weakref.finalize(self, _end_lease, self._lease_id, self._lease_stop)
+
+        # BM25 side of hybrid retrieval, loaded lazily from the persist directory
+        self.sparse_index = None
+        self._sparse_index_mtime = None
+        self._sparse_index_lock = threading.Lock()
+
+        # Flat vector index (VECTOR_STORE_BACKEND="flat"), memory-mapped from the persist directory
+        self.flat_index = None
+        self._flat_index_mtime = None
+        self._flat_index_lock = threading.Lock()
+
+        # Warm-up progress, read by the app sidebar and the server's /health
+        self.warmup_status = {"state": "cold", "steps": {}, "errors": {}}
+        self._warmup_thread = None
+
+        # Intent router, compiled once from the config table
+        self.router = IntentRouter.from_config()
+
+        self.answer_cache = None
+        if config.ANSWER_CACHE_ENABLED:
+            self.answer_cache = AnswerCache(
+                max_entries=config.ANSWER_CACHE_MAX_ENTRIES,
+                ttl_seconds=config.ANSWER_CACHE_TTL_SECONDS,
+                similarity_threshold=config.ANSWER_CACHE_SIMILARITY_THRESHOLD
+            )
+
+    # ---------------- COMPONENTS (built on first use) ----------------
+    @lazy_property
+    def embeddings(self):
+        from embedding_cache import with_embedding_cache
+        return with_embedding_cache(
+            create_embeddings(),
+            model_name=embedding_model_name()
         )
 
-        # Retrieval QA chain
-        self.qa_chain = RetrievalQA.from_chain_type(
-            llm=self.llm,
-            chain_type="stuff",
-            retriever=self.vectorstore.as_retriever(
-                search_kwargs={"k": config.RETRIEVAL_K}
-            ),
-            return_source_documents=True,
-            chain_type_kwargs={"prompt": self.prompt}
+    @lazy_property
+    def vectorstore(self):
+        """Existing Chroma vector store"""
+        return self._open_chroma(self.persist_directory)
+
+    def _open_chroma(self, path: str):
+        from langchain_community.vectorstores import Chroma
+        return Chroma(
+            persist_directory=path,
+            embedding_function=self.embeddings,
+            collection_name=config.CHROMA_COLLECTION_NAME
         )
 
-    def preprocess_query(self, query: str) -> str:
+    @property
+    def collection(self):
+        """Collection-level API (query/get) searches run against: Chroma's, or the flat index"""
+        self.check_collection_version()
+        if config.VECTOR_STORE_BACKEND == "flat":
+            return self.load_flat_index()
+        return self.vectorstore._collection
+
+    @lazy_property
+    def reranker(self):
+        """Re-ranking stage over the over-fetched candidates (None when disabled)"""
+        if not config.RERANK_ENABLED:
+            return None
+        return Reranker(create_scorer(config.RERANKER), threshold=config.RERANK_THRESHOLD)
+
+    @lazy_property
+    def structured_index(self):
+        """Structured index for questions answerable straight from the CSV"""
+        if config.STRUCTURED_FAST_PATH_ENABLED and os.path.exists(config.CSV_FILE_PATH):
+            return StructuredIndex.from_csv(config.CSV_FILE_PATH)
+        return None
+
+    @lazy_property
+    def query_analyzer(self):
+        """Query analysis turning category/year/... mentions into Chroma filters"""
+        return QueryAnalyzer(
+            countries=self.structured_index.countries if self.structured_index else None
+        )
+
+    @lazy_property
+    def llm(self):
+        """LLM from the configured backend (see backends.py)"""
+        return create_llm()
+
+    @lazy_property
+    def prompt(self):
+        from langchain_core.prompts import PromptTemplate
+        return PromptTemplate(
+            template=PROMPT_TEMPLATE,
+            input_variables=["context", "question"]
+        )
+
+    @lazy_property
+    def answer_chain(self):
+        """Answer chain: retrieved chunks are "stuffed" into the prompt"""
+        return self.prompt | self.llm
+
+    # ---------------- WARM-UP ----------------
+    def _segment_files(self, root: str = None):
+        """HNSW files (data_level0.bin, link_lists.bin, ...) of every segment, or the flat index files"""
+        root = root or self.persist_directory
+        if config.VECTOR_STORE_BACKEND == "flat":
+            from flat_index import FlatVectorStore
+            store = FlatVectorStore.load(os.path.join(root, config.FLAT_INDEX_DIR))
+            if store is not None:
+                yield from store.files()
+            return
+        if not os.path.isdir(root):
+            return
+        for entry in os.scandir(root):
+            if entry.is_dir():
+                for name in os.listdir(entry.path):
+                    if name.endswith(".bin"):
+                        yield os.path.join(entry.path, name)
+
+    def page_in_index(self, root: str = None) -> int:
+        """Read the segment files once so they sit in the OS page cache; returns bytes read"""
+        total = 0
+        for path in self._segment_files(root):
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    total += len(block)
+        return total
+
+    def load_warmup_queries(self):
+        path = config.WARMUP_QUERIES_FILE
+        if not path or not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            queries = [line.strip() for line in f if line.strip() and not line.startswith("#")]
+        return queries[:config.WARMUP_MAX_QUERIES]
+
+    def replay(self, queries):
+        """Run common queries through retrieval (or the full pipeline) to fill the caches"""
+        for query in queries:
+            if config.WARMUP_REPLAY_ANSWERS:
+                self.ask_with_sources(query)
+            else:
+                self.retrieve(query)
+
+    def warm_up(self) -> dict:
+        """
+        Pre-load everything the first question would otherwise pay for: build the
+        components, page in the HNSW files and load the segment into Chroma, load the
+        embedding model with an uncached dummy call, open the LLM connection, and
+        replay WARMUP_QUERIES_FILE. A failing step is recorded and the rest still run.
+        """
+        from embedding_cache import CachedEmbeddings
+
+        status = self.warmup_status
+        status.update(state="warming", steps={}, errors={})
+        context = {}
+
+        def raw_embeddings():
+            # Bypass the embedding cache so the model itself is loaded
+            embeddings = self.embeddings
+            return embeddings.embeddings if isinstance(embeddings, CachedEmbeddings) else embeddings
+
+        steps = [
+            ("components", lambda: (
+                self.embeddings, self.collection, self.query_analyzer, self.reranker, self.answer_chain
+            )),
+            ("index_files", self.page_in_index),
+            ("embedding_model", lambda: context.update(embedding=raw_embeddings().embed_query("Nobel Prize"))),
+            ("vector_index", lambda: self.collection.query(
+                query_embeddings=[context.get("embedding") or self.embeddings.embed_query("Nobel Prize")], n_results=1
+            )),
+            ("bm25_index", self.load_sparse_index),
+            ("llm_connection", lambda: warm_up_llm(self.llm)),
+            ("replay", lambda: self.replay(self.load_warmup_queries())),
+        ]
+        for name, func in steps:
+            start = time.perf_counter()
+            try:
+                func()
+            except Exception as e:
+                status["errors"][name] = str(e)
+                print(f" Warm-up step {name} failed: {e}")
+            elapsed = time.perf_counter() - start
+            status["steps"][name] = elapsed
+            metrics.observe("rag_warmup_seconds", elapsed, stage=name)
+
+        status["total"] = sum(status["steps"].values())
+        status["state"] = "failed" if status["errors"] else "ready"
+        return status
+
+    def start_warm_up(self) -> threading.Thread:
+        """Run warm_up() on a background thread (once); progress is in warmup_status"""
+        with self._init_lock:
+            if self._warmup_thread is None:
+                self.warmup_status["state"] = "warming"
+                self._warmup_thread = threading.Thread(target=self.warm_up, name="rag-warm-up", daemon=True)
+                self._warmup_thread.start()
+            return self._warmup_thread
+
+    def collection_fingerprint(self) -> str:
+        """Changes whenever the collection served changes (a new version, or its manifest rewritten)"""
+        self.check_collection_version()
+        manifest = os.path.join(self.persist_directory, config.INGEST_MANIFEST_FILE)
+        try:
+            stat = os.stat(manifest)
+        except OSError:
+            return "no-manifest"
+        return f"{self.collection_version}-{stat.st_mtime_ns}-{stat.st_size}"
+
+    def load_sparse_index(self):
+        """The BM25 index written by ingestion, reloaded whenever ingestion rewrites it"""
+        if not config.HYBRID_RETRIEVAL_ENABLED:
+            return None
+        path = os.path.join(self.persist_directory, config.BM25_INDEX_FILE)
+        try:
+            key = (path, os.stat(path).st_mtime_ns)
+        except OSError:
+            return None
+        with self._sparse_index_lock:
+            if key != self._sparse_index_mtime:
+                self.sparse_index = BM25Index.load(path)
+                self._sparse_index_mtime = key
+            return self.sparse_index
+
+    def load_flat_index(self):
+        """The flat vector index, reloaded whenever it is re-exported or re-ingested"""
+        from flat_index import FlatVectorStore, METADATA_FILE
+        path = os.path.join(self.persist_directory, config.FLAT_INDEX_DIR)
+        try:
+            key = (path, os.stat(os.path.join(path, METADATA_FILE)).st_mtime_ns)
+        except OSError:
+            raise FileNotFoundError(
+                f"No flat vector index in {path}: run `python main.py export-flat` "
+                f"or ingest with VECTOR_STORE_BACKEND=flat"
+            )
+        with self._flat_index_lock:
+            if key != self._flat_index_mtime:
+                self.flat_index = FlatVectorStore.load(
+                    path, decode_cache_bytes=config.FLAT_INDEX_DECODE_CACHE_MB * 2 ** 20
+                )
+                self._flat_index_mtime = key
+            return self.flat_index
+
+    # ---------------- COLLECTION VERSIONS ----------------
+    def _collection_loaded(self) -> bool:
+        return "vectorstore" in self.__dict__ or self.flat_index is not None or self.sparse_index is not None
+
+    def renew_lease(self):
+        in_use = [version for version in (self.collection_version, self._retired_version) if version]
+        try:
+            if in_use:
+                versions.write_lease(self._lease_id, in_use)
+            else:
+                versions.release_lease(self._lease_id)
+        except OSError as e:
+            print(f" Could not renew the collection version lease: {e}")
+
+    def check_collection_version(self):
+        """
+        Notice a newly published collection version (one stat of the pointer file per
+        call) and start loading it in the background. Until anything has been loaded
+        the pipeline simply switches to it.
+        """
+        mtime = versions.pointer_mtime()
+        if mtime == self._pointer_mtime:
+            return
+        with self._swap_lock:
+            if mtime == self._pointer_mtime or (self._swap_thread is not None and self._swap_thread.is_alive()):
+                return
+            version = versions.current_version()
+            if version is None or version == self.collection_version:
+                self._pointer_mtime = mtime
+                return
+            if not self._collection_loaded():
+                self.collection_version = version
+                self.persist_directory = versions.version_path(version)
+                self._pointer_mtime = mtime
+                self.renew_lease()
+                return
+            self._swap_thread = threading.Thread(
+                target=self.swap_to, args=(version, mtime), name="rag-collection-swap", daemon=True
+            )
+            self._swap_thread.start()
+
+    def _load_version(self, path: str) -> dict:
+        """Open and warm every index of a collection version, without touching the live ones"""
+        loaded = {"bytes_paged_in": self.page_in_index(path)}
+        if config.VECTOR_STORE_BACKEND == "flat":
+            from flat_index import FlatVectorStore, METADATA_FILE
+            flat_path = os.path.join(path, config.FLAT_INDEX_DIR)
+            mtime = os.stat(os.path.join(flat_path, METADATA_FILE)).st_mtime_ns
+            store = FlatVectorStore.load(flat_path, decode_cache_bytes=config.FLAT_INDEX_DECODE_CACHE_MB * 2 ** 20)
+            if store.count():
+                store.query(query_embeddings=[[1.0] * store.vectors.shape[1]], n_results=1, include=[])
+            loaded["flat_index"] = (store, (flat_path, mtime))
+        else:
+            vectorstore = self._open_chroma(path)
+            # Loads the HNSW segment into memory
+            sample = vectorstore._collection.get(limit=1, include=["embeddings"])
+            if len(sample["ids"]):
+                vectorstore._collection.query(query_embeddings=[sample["embeddings"][0]], n_results=1, include=[])
+            loaded["vectorstore"] = vectorstore
+        bm25_path = os.path.join(path, config.BM25_INDEX_FILE)
+        if config.HYBRID_RETRIEVAL_ENABLED and os.path.exists(bm25_path):
+            loaded["sparse_index"] = (BM25Index.load(bm25_path), (bm25_path, os.stat(bm25_path).st_mtime_ns))
+        return loaded
+
+    def swap_to(self, version: str, pointer_mtime: int = None) -> bool:
+        """
+        Load a collection version off the request path, then swap it in: vector store,
+        flat index and BM25 index are replaced together, and the answer cache follows
+        the fingerprint. Queries already running finish on the old version.
+        """
+        start = time.perf_counter()
+        path = versions.version_path(version)
+        # Loading allocates enough objects to trigger a full cyclic GC, which holds the
+        # GIL while it scans the whole heap (~150ms, stalling requests); frozen, the
+        # existing heap is skipped and only the new indexes are scanned
+        gc.freeze()
+        try:
+            loaded = self._load_version(path)
+        except Exception as e:
+            print(f" Could not load collection version {version}: {e}")
+            metrics.inc("rag_collection_swaps_total", status="failed")
+            # Not retried until the pointer changes again
+            with self._swap_lock:
+                self._pointer_mtime = pointer_mtime
+            return False
+        finally:
+            gc.unfreeze()
+        load_s = time.perf_counter() - start
+
+        with self._init_lock:
+            retired = self._retired_vectorstore
+            self._retired_vectorstore = self.__dict__.get("vectorstore")
+            if "vectorstore" in loaded:
+                self.vectorstore = loaded["vectorstore"]
+            else:
+                self.__dict__.pop("vectorstore", None)
+            with self._flat_index_lock:
+                self.flat_index, self._flat_index_mtime = loaded.get("flat_index", (None, None))
+            with self._sparse_index_lock:
+                self.sparse_index, self._sparse_index_mtime = loaded.get("sparse_index", (None, None))
+            previous = self.collection_version
+            self.persist_directory = path
+            self.collection_version = version
+            # Queries already running still read the previous version until the next swap
+            self._retired_version = previous
+        self.renew_lease()
+        with self._swap_lock:
+            self._pointer_mtime = pointer_mtime
+
+        if retired is not None:
+            try:
+                retired._client.close()
+            except Exception:
+                pass
+        self.swap_stats.append({"from": previous, "to": version, "load_s": load_s})
+        metrics.inc("rag_collection_swaps_total", status="ok")
+        metrics.observe("rag_collection_swap_seconds", load_s)
+        print(f" Collection version {version} loaded in {load_s:.2f}s and swapped in (was {previous})")
+        return True
+
+    def search(self, embedding, constraints: dict, query: str = None):
+        """
+        Vector search (fused with BM25 when a query text is given) with metadata
+        constraints pushed into the Chroma query. Falls back to unfiltered search
+        when the filter matches nothing.
+        """
+        return self.search_batch([embedding], [constraints], [query])[0]
+
+    def embed_queries(self, queries):
         """
-        Classify user query into categories:
-        greeting, identity, invalid category, ambiguous, nobel-related, off-topic
+        Embed a batch of queries with one model call. Every embedding backend embeds
+        queries exactly like documents; the embedding cache keeps them under "query".
         """
-        query_lower = query.strip().lower()
+        if hasattr(self.embeddings, "embed_queries"):
+            return self.embeddings.embed_queries(queries)
+        return self.embeddings.embed_documents(list(queries))
 
-        greetings = ["hi", "hello", "hey", "good morning", "good evening"]
-        identity_questions = ["who are you", "what are you", "introduce yourself"]
+    def _query_collection(self, embeddings, k: int, where):
+        """One vector store query for several query vectors"""
+        response = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=k,
+            where=where,
+            include=["documents", "metadatas"]
+        )
+        return [
+            [
+                Document(id=doc_id, page_content=text, metadata=metadata or {})
+                for doc_id, text, metadata in zip(ids, texts, metadatas)
+            ]
+            for ids, texts, metadatas in zip(response["ids"], response["documents"], response["metadatas"])
+        ]
 
-        valid_categories = [
-            "physics",
-            "chemistry",
-            "medicine",
-            "literature",
-            "peace",
-            "economic"
+    def _get_documents(self, ids):
+        response = self.collection.get(ids=ids, include=["documents", "metadatas"])
+        return [
+            Document(id=doc_id, page_content=text, metadata=metadata or {})
+            for doc_id, text, metadata in zip(response["ids"], response["documents"], response["metadatas"])
         ]
 
-        # Greeting detection (exact match)
-        if query_lower in greetings:
-            return "greeting"
+    def fuse(self, sparse_index, query: str, vector_docs, k: int, constraints: dict):
+        """Reciprocal-rank fusion of the vector candidates with BM25 candidates for the same filter"""
+        sparse_ids = [doc_id for doc_id, _ in sparse_index.search(query, config.HYBRID_CANDIDATE_K, constraints)]
+        fused_ids = reciprocal_rank_fusion(
+            [[doc.id for doc in vector_docs], sparse_ids],
+            [config.HYBRID_VECTOR_WEIGHT, config.HYBRID_SPARSE_WEIGHT],
+            k=config.RRF_K
+        )[:k]
+
+        by_id = {doc.id: doc for doc in vector_docs}
+        missing = [doc_id for doc_id in fused_ids if doc_id not in by_id]
+        if missing:
+            by_id.update((doc.id, doc) for doc in self._get_documents(missing))
+        return [by_id[doc_id] for doc_id in fused_ids if doc_id in by_id]
+
+    def rerank(self, query: str, docs, constraints: dict, k: int):
+        """Re-score the candidates and keep the best (at most k); timed as its own stage"""
+        start = time.perf_counter()
+        with metrics.span("rerank"):
+            kept, _ = self.reranker.rerank(query, docs, constraints, k)
+        self.rerank_stats.append({
+            "query": query,
+            "candidates": len(docs),
+            "kept": len(kept),
+            "seconds": time.perf_counter() - start
+        })
+        metrics.observe("rag_rerank_candidates", len(docs))
+        metrics.observe("rag_rerank_kept", len(kept))
+        return kept
+
+    def search_batch(self, embeddings, constraints_list, queries=None):
+        """
+        Batched search(): queries sharing the same filter go to Chroma as one
+        multi-vector query, and those whose filter matched nothing share one
+        unfiltered fallback query. With query texts and a BM25 index, each query
+        over-fetches HYBRID_CANDIDATE_K vector candidates and is fused with BM25.
+        With the re-ranker, RERANK_CANDIDATES candidates are fetched and re-scored,
+        and at most k that pass its threshold are kept.
+        """
+        queries = queries or [None] * len(embeddings)
+        sparse_index = self.load_sparse_index()
+        reranker = self.reranker
+        results = [[] for _ in embeddings]
+
+        def run(indexes, k, where, constraints_for):
+            hybrid = sparse_index is not None
+            fetch_k = max(k, config.RERANK_CANDIDATES) if reranker is not None else k
+            n_results = max(fetch_k, config.HYBRID_CANDIDATE_K) if hybrid else fetch_k
+            with metrics.span("vector_search"):
+                docs_lists = self._query_collection([embeddings[i] for i in indexes], n_results, where)
+            for i, docs in zip(indexes, docs_lists):
+                if hybrid and queries[i] and docs:
+                    with metrics.span("bm25_fusion"):
+                        docs = self.fuse(sparse_index, queries[i], docs, fetch_k, constraints_for(i))
+                if reranker is not None and queries[i] and docs:
+                    docs = self.rerank(queries[i], docs, constraints_list[i], k)
+                results[i] = docs[:k]
+
+        groups = defaultdict(list)
+        for i, constraints in enumerate(constraints_list):
+            where = self.query_analyzer.to_where(constraints)
+            # A category + year filter leaves only a handful of laureates
+            k = config.FILTERED_RETRIEVAL_K if {"category", "awardYear"} <= constraints.keys() else config.RETRIEVAL_K
+            groups[(json.dumps(where, sort_keys=True) if where else None, k)].append(i)
+
+        for (where_key, k), indexes in groups.items():
+            where = json.loads(where_key) if where_key else None
+            run(indexes, k, where, lambda i: constraints_list[i] if where else None)
+
+        missing = [i for i, docs in enumerate(results) if not docs]
+        if missing:
+            metrics.inc("rag_filter_fallbacks_total", len(missing))
+            run(missing, config.RETRIEVAL_K, None, lambda i: None)
+        for docs in results:
+            metrics.observe("rag_retrieved_docs", len(docs))
+        return results
+
+    def retrieve(self, query: str, embedding=None):
+        """Chunks for the query; pass its embedding if already computed"""
+        constraints = self.query_analyzer.extract_constraints(query)
+        if embedding is None:
+            with metrics.span("embed"):
+                embedding = self.embeddings.embed_query(query)
+        return self.search(embedding, constraints, query)
+
+    async def aretrieve(self, query: str, embedding=None):
+        constraints = self.query_analyzer.extract_constraints(query)
+        if embedding is None:
+            with metrics.span("embed"):
+                embedding = await self.embeddings.aembed_query(query)
+        # Chroma has no async API; keep its query off the event loop
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.search, embedding, constraints, query)
+
+    def build_context(self, docs, query: str = None) -> str:
+        """
+        Prompt context for the retrieved chunks. With a query and compression enabled,
+        chunks are deduplicated, trimmed to the fields the question needs and cut to
+        CONTEXT_TOKEN_BUDGET; tokens saved are recorded per request.
+        """
+        with metrics.span("prompt"):
+            if self.context_compressor is None or query is None:
+                return "\n\n".join(doc.page_content for doc in docs)
+
+            constraints = self.query_analyzer.extract_constraints(query)
+            context, stats = self.context_compressor.compress(docs, query, constraints)
+            self.context_stats.append({"query": query, **stats})
+            metrics.observe("rag_context_tokens", stats["context_tokens"])
+            metrics.observe("rag_context_tokens_saved", stats["tokens_saved"])
+            return context
+
+    def record_tokens(self, inputs: dict, response=None, completion: str = None):
+        """Prompt/completion token counts: reported usage when the LLM gives it, else an estimate"""
+        if not metrics.enabled:
+            return
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            prompt_tokens, completion_tokens = usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        else:
+            prompt_tokens = estimate_tokens(self.prompt.format(**inputs))
+            completion_tokens = estimate_tokens(response.content if response is not None else completion)
+        metrics.observe("rag_prompt_tokens", prompt_tokens)
+        metrics.observe("rag_completion_tokens", completion_tokens)
+
+    def cache_guard(self, query: str, constraints: dict) -> dict:
+        """
+        What a cached answer's query must share with this one to be reused: the extracted
+        constraints and the laureates it names, so similar questions about two laureates
+        ("What did Marie Curie discover?" / "... Pierre Curie ...") never share an answer.
+        """
+        guard = dict(constraints)
+        if self.structured_index is not None:
+            guard["laureates"] = sorted(self.structured_index.match_laureates(query))
+        return guard
+
+    def lookup_cached_answer(self, query: str):
+        """
+        Check both answer-cache tiers. Returns (cached result or None, query embedding,
+        constraints, cache guard); the embedding is None when the exact tier answered.
+        """
+        constraints = self.query_analyzer.extract_constraints(query)
+        if self.answer_cache is None:
+            return None, None, constraints, None
+
+        guard = self.cache_guard(query, constraints)
+        self.answer_cache.check_fingerprint(self.collection_fingerprint())
+        cached = self.answer_cache.get_exact(query)
+        if cached is not None:
+            metrics.inc("rag_answer_cache_total", result="exact")
+            return cached, None, constraints, guard
+
+        # Callers pass this embedding on to retrieval rather than embedding the query again
+        with metrics.span("embed"):
+            embedding = self.embeddings.embed_query(query)
+        cached = self.answer_cache.get_similar(embedding, guard)
+        metrics.inc("rag_answer_cache_total", result="semantic" if cached is not None else "miss")
+        return cached, embedding, constraints, guard
 
-        # Identity questions
-        if any(q in query_lower for q in identity_questions):
-            return "identity"
+    def run_chain_cached(self, query: str) -> dict:
+        """run_chain behind the answer cache; cached results carry the same source documents"""
+        cached, embedding, _, guard = self.lookup_cached_answer(query)
+        if cached is not None:
+            return cached
 
-        # Detect mathematics (no Nobel Prize exists)
-        if "math" in query_lower:
-            return "invalid_category"
+        result = self.run_chain(query, embedding)
+        if self.answer_cache is not None:
+            self.answer_cache.put(query, embedding, guard, result)
+        return result
 
-        # Ambiguous first winner question without category
-        if "first winner" in query_lower:
-            if not any(cat in query_lower for cat in valid_categories):
-                return "ambiguous"
+    async def arun_chain_cached(self, query: str) -> dict:
+        if self.answer_cache is None:
+            return await self.arun_chain(query)
 
-        # Nobel-related keywords
-        nobel_keywords = ["nobel", "prize", "winner", "laureate", "year"]
+        self.answer_cache.check_fingerprint(self.collection_fingerprint())
+        cached = self.answer_cache.get_exact(query)
+        if cached is not None:
+            metrics.inc("rag_answer_cache_total", result="exact")
+            return cached
 
-        if any(word in query_lower for word in nobel_keywords):
-            return "nobel"
+        with metrics.span("embed"):
+            embedding = await self.embeddings.aembed_query(query)
+        guard = self.cache_guard(query, self.query_analyzer.extract_constraints(query))
+        cached = self.answer_cache.get_similar(embedding, guard)
+        metrics.inc("rag_answer_cache_total", result="semantic" if cached is not None else "miss")
+        if cached is not None:
+            return cached
 
-        return "off_topic"
+        result = await self.arun_chain(query, embedding)
+        self.answer_cache.put(query, embedding, guard, result)
+        return result
+
+    def run_chain(self, query: str, embedding=None) -> dict:
+        """Retrieve context and generate an answer (same result shape as a RetrievalQA chain)"""
+        docs = self.retrieve(query, embedding)
+        inputs = {"context": self.build_context(docs, query), "question": query}
+        with metrics.span("llm"):
+            response = self.answer_chain.invoke(inputs)
+        self.record_tokens(inputs, response)
+        return {
+            "query": query,
+            "result": response.content,
+            "source_documents": docs
+        }
+
+    async def arun_chain(self, query: str, embedding=None) -> dict:
+        docs = await self.aretrieve(query, embedding)
+        inputs = {"context": self.build_context(docs, query), "question": query}
+        async with self._llm_semaphore:
+            with metrics.span("llm"):
+                response = await self.answer_chain.ainvoke(inputs)
+        self.record_tokens(inputs, response)
+        return {
+            "query": query,
+            "result": response.content,
+            "source_documents": docs
+        }
+
+    def preprocess_query(self, query: str) -> str:
+        """
+        Classify user query into an intent (config.QUERY_INTENTS): greeting, identity,
+        invalid category, ambiguous, nobel-related, off-topic
+        """
+        return self.router.route(query)
+
+    def answer_structured(self, query: str):
+        """
+        Try the structured fast path. Returns an ask_with_sources-shaped dict,
+        or None when the query should go through RAG.
+        """
+        if self.structured_index is None:
+            return None
+        with metrics.span("structured"):
+            result = self.structured_index.answer(query)
+        metrics.inc("rag_structured_total", result="hit" if result is not None else "miss")
+        return result
 
     def format_answer(self, answer: str) -> str:
         """
@@ -125,99 +751,329 @@ Answer:
         """
         return answer.strip()
 
+    def static_answer(self, query_type: str) -> str:
+        """
+        Canned answers for queries that never need retrieval.
+        """
+        return self.router.answer(query_type) or self.router.answer(self.router.default_intent)
+
+    def guard_answer(self, answer: str) -> str:
+        """
+        Basic hallucination safeguard applied to LLM answers by ask().
+        """
+        if (
+            not answer
+            or "not included in provided context" in answer.lower()
+            or "not applicable" in answer.lower()
+            or len(answer) < 10
+        ):
+            return "Sorry, I don’t have information about that."
+
+        return self.format_answer(answer)
+
+    def sources_response(self, query: str, result: dict) -> dict:
+        """
+        Shape a chain result the way ask_with_sources returns it.
+        """
+        answer = result.get("result", "").strip()
+
+        if not answer or len(answer) < 10:
+            answer = "Sorry, I don’t have information about that."
+
+        return {
+            "query": query,
+            "answer": answer,
+            "source_documents": [
+                {
+                    "content": doc.page_content,
+                    "metadata": doc.metadata
+                }
+                for doc in result.get("source_documents", [])
+            ]
+        }
+
+    @timed("ask")
     def ask(self, query: str) -> str:
         """
         Main method for answering user queries.
         """
         try:
             query_type = self.preprocess_query(query)
+            self.router.record(query_type)
 
-            if query_type == "greeting":
-                return "Hello! I’m here to help you with Nobel Prize information."
-
-            if query_type == "identity":
-                return "I am an AI assistant specialized in Nobel Prize information."
-
-            if query_type == "invalid_category":
-                return (
-                    "There is no Nobel Prize in Mathematics.\n\n"
-                    "The Nobel Prizes are awarded in:\n"
-                    "• Physics\n"
-                    "• Chemistry\n"
-                    "• Physiology or Medicine\n"
-                    "• Literature\n"
-                    "• Peace\n"
-                    "• Economic Sciences"
-                )
-
-            if query_type == "ambiguous":
-                return (
-                    "Please specify the category for the first winner.\n\n"
-                    "Available categories:\n"
-                    "• Physics\n"
-                    "• Chemistry\n"
-                    "• Physiology or Medicine\n"
-                    "• Literature\n"
-                    "• Peace\n"
-                    "• Economic Sciences"
-                )
+            if query_type != "nobel":
+                return self.static_answer(query_type)
 
-            if query_type == "off_topic":
-                return "Sorry, I only answer questions related to Nobel Prizes."
+            # Simple lookups are answered straight from the structured index
+            structured = self.answer_structured(query)
+            if structured is not None:
+                return structured["answer"]
 
             # Nobel-related query → use retrieval chain
-            result = self.qa_chain.invoke({"query": query})
-            answer = result.get("result", "").strip()
-
-            # Basic hallucination safeguard
-            if (
-                not answer
-                or "not included in provided context" in answer.lower()
-                or "not applicable" in answer.lower()
-                or len(answer) < 10
-            ):
-                return "Sorry, I don’t have information about that."
-
-            return self.format_answer(answer)
+            result = self.run_chain_cached(query)
+            return self.guard_answer(result.get("result", "").strip())
 
         except Exception as e:
             print(f"Error in ask(): {e}")
+            metrics.inc("rag_failed_requests_total", method="ask")
             return "An internal error occurred."
 
+    @timed("ask_with_sources")
     def ask_with_sources(self, query: str) -> dict:
         """
         Returns answer along with retrieved source documents.
         """
         try:
             query_type = self.preprocess_query(query)
+            self.router.record(query_type)
 
             if query_type != "nobel":
                 return {
                     "query": query,
-                    "answer": self.ask(query),
+                    "answer": self.static_answer(query_type),
                     "source_documents": []
                 }
 
-            result = self.qa_chain.invoke({"query": query})
-            answer = result.get("result", "").strip()
+            structured = self.answer_structured(query)
+            if structured is not None:
+                return structured
 
-            if not answer or len(answer) < 10:
-                answer = "Sorry, I don’t have information about that."
+            result = self.run_chain_cached(query)
+            return self.sources_response(query, result)
 
+        except Exception as e:
+            print(f"Error in ask_with_sources(): {e}")
+            metrics.inc("rag_failed_requests_total", method="ask_with_sources")
             return {
                 "query": query,
-                "answer": answer,
-                "source_documents": [
-                    {
-                        "content": doc.page_content,
-                        "metadata": doc.metadata
-                    }
-                    for doc in result.get("source_documents", [])
-                ]
+                "answer": "An internal error occurred.",
+                "source_documents": []
             }
 
+    @timed("ask_with_sources_batch")
+    def ask_with_sources_batch(self, queries, routed: bool = False) -> list:
+        """
+        ask_with_sources() for many queries at once: one embedding call, batched
+        Chroma queries and concurrent LLM calls for everything that needs RAG.
+        routed=True: the caller already classified every query as "nobel" and tried
+        the structured fast path, so they all go straight to RAG.
+        """
+        results = [None] * len(queries)
+        pending = list(range(len(queries))) if routed else []
+        for i, query in enumerate([] if routed else queries):
+            try:
+                query_type = self.preprocess_query(query)
+                self.router.record(query_type)
+                if query_type != "nobel":
+                    results[i] = {"query": query, "answer": self.static_answer(query_type), "source_documents": []}
+                    continue
+                structured = self.answer_structured(query)
+                if structured is not None:
+                    results[i] = structured
+                else:
+                    pending.append(i)
+            except Exception as e:
+                print(f"Error in ask_with_sources_batch(): {e}")
+                results[i] = {"query": query, "answer": "An internal error occurred.", "source_documents": []}
+
+        try:
+            if self.answer_cache is not None and pending:
+                self.answer_cache.check_fingerprint(self.collection_fingerprint())
+                for i in pending:
+                    cached = self.answer_cache.get_exact(queries[i])
+                    if cached is not None:
+                        metrics.inc("rag_answer_cache_total", result="exact")
+                        results[i] = self.sources_response(queries[i], cached)
+                pending = [i for i in pending if results[i] is None]
+
+            if pending:
+                with metrics.span("embed"):
+                    embeddings = self.embed_queries([queries[i] for i in pending])
+                to_run = []
+                for i, embedding in zip(pending, embeddings):
+                    constraints = self.query_analyzer.extract_constraints(queries[i])
+                    guard = self.cache_guard(queries[i], constraints) if self.answer_cache else None
+                    cached = self.answer_cache.get_similar(embedding, guard) if self.answer_cache else None
+                    if self.answer_cache is not None:
+                        metrics.inc("rag_answer_cache_total", result="semantic" if cached is not None else "miss")
+                    if cached is not None:
+                        results[i] = self.sources_response(queries[i], cached)
+                    else:
+                        to_run.append((i, embedding, constraints, guard))
+
+                if to_run:
+                    docs_lists = self.search_batch(
+                        [e for _, e, _, _ in to_run], [c for _, _, c, _ in to_run], [queries[i] for i, _, _, _ in to_run]
+                    )
+                    inputs_list = [
+                        {"context": self.build_context(docs, queries[i]), "question": queries[i]}
+                        for (i, _, _, _), docs in zip(to_run, docs_lists)
+                    ]
+                    with metrics.span("llm_batch"):
+                        responses = self.answer_chain.batch(
+                            inputs_list,
+                            config={"max_concurrency": config.MAX_CONCURRENT_LLM_CALLS},
+                            return_exceptions=True
+                        )
+                    for (i, embedding, _, guard), docs, inputs, response in zip(to_run, docs_lists, inputs_list, responses):
+                        if isinstance(response, Exception):
+                            print(f"Error in ask_with_sources_batch(): {response}")
+                            metrics.inc("rag_errors_total", stage="llm")
+                            continue
+                        self.record_tokens(inputs, response)
+                        result = {"query": queries[i], "result": response.content, "source_documents": docs}
+                        if self.answer_cache is not None:
+                            self.answer_cache.put(queries[i], embedding, guard, result)
+                        results[i] = self.sources_response(queries[i], result)
+
         except Exception as e:
-            print(f"Error in ask_with_sources(): {e}")
+            print(f"Error in ask_with_sources_batch(): {e}")
+            metrics.inc("rag_failed_requests_total", method="ask_with_sources_batch")
+
+        return [
+            result if result is not None
+            else {"query": query, "answer": "An internal error occurred.", "source_documents": []}
+            for query, result in zip(queries, results)
+        ]
+
+    # ---------------- STREAMING API ----------------
+    def stream_with_sources(self, query: str) -> "AnswerStream":
+        """
+        Streaming ask_with_sources(). Retrieval runs here, so the returned stream
+        already carries its source documents; iterating it yields answer tokens.
+        The hallucination guard from ask() is applied once the stream finishes.
+        """
+        start = time.perf_counter()
+        try:
+            query_type = self.preprocess_query(query)
+            self.router.record(query_type)
+            if query_type != "nobel":
+                return AnswerStream.from_text(self, query, self.static_answer(query_type), [], start)
+
+            structured = self.answer_structured(query)
+            if structured is not None:
+                return AnswerStream.from_text(
+                    self, query, structured["answer"], structured["source_documents"], start
+                )
+
+            cached, embedding, constraints, guard = self.lookup_cached_answer(query)
+            if cached is not None:
+                response = self.sources_response(query, cached)
+                return AnswerStream.from_text(
+                    self, query, self.guard_answer(cached.get("result", "").strip()),
+                    response["source_documents"], start
+                )
+
+            if embedding is None:
+                with metrics.span("embed"):
+                    embedding = self.embeddings.embed_query(query)
+            docs = self.search(embedding, constraints, query)
+            inputs = {"context": self.build_context(docs, query), "question": query}
+            chunks = self.answer_chain.stream(inputs)
+
+            def finalize(text: str) -> str:
+                self.record_tokens(inputs, completion=text)
+                if self.answer_cache is not None:
+                    self.answer_cache.put(
+                        query, embedding, guard,
+                        {"query": query, "result": text, "source_documents": docs}
+                    )
+                return self.guard_answer(text.strip())
+
+            return AnswerStream(
+                self, query,
+                self.sources_response(query, {"source_documents": docs})["source_documents"],
+                (chunk.content for chunk in chunks),
+                finalize,
+                start
+            )
+
+        except Exception as e:
+            print(f"Error in stream_with_sources(): {e}")
+            metrics.inc("rag_failed_requests_total", method="stream_with_sources")
+            return AnswerStream.from_text(self, query, "An internal error occurred.", [], start)
+
+    # ---------------- ASYNC API ----------------
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        Pipeline-owned event loop on a daemon thread. The async embedding and LLM
+        clients are bound to the loop they first run on, so every async call is
+        executed here regardless of which thread or loop the caller is on.
+        """
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="rag-pipeline-loop", daemon=True).start()
+            return self._loop
+
+    async def _on_pipeline_loop(self, coro):
+        loop = self._event_loop()
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            return await coro
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    def run_sync(self, coro):
+        """Run a pipeline coroutine from synchronous code (e.g. a Streamlit session thread)"""
+        return asyncio.run_coroutine_threadsafe(coro, self._event_loop()).result()
+
+    async def aask(self, query: str) -> str:
+        """
+        Async ask(): safe to await concurrently from many sessions.
+        """
+        return await self._on_pipeline_loop(self._aask(query))
+
+    async def aask_with_sources(self, query: str) -> dict:
+        """
+        Async ask_with_sources(): safe to await concurrently from many sessions.
+        """
+        return await self._on_pipeline_loop(self._aask_with_sources(query))
+
+    async def _aask(self, query: str) -> str:
+        try:
+            query_type = self.preprocess_query(query)
+            self.router.record(query_type)
+
+            if query_type != "nobel":
+                return self.static_answer(query_type)
+
+            structured = self.answer_structured(query)
+            if structured is not None:
+                return structured["answer"]
+
+            result = await self.arun_chain_cached(query)
+            return self.guard_answer(result.get("result", "").strip())
+
+        except Exception as e:
+            print(f"Error in aask(): {e}")
+            metrics.inc("rag_failed_requests_total", method="aask")
+            return "An internal error occurred."
+
+    async def _aask_with_sources(self, query: str) -> dict:
+        try:
+            query_type = self.preprocess_query(query)
+            self.router.record(query_type)
+
+            if query_type != "nobel":
+                return {
+                    "query": query,
+                    "answer": self.static_answer(query_type),
+                    "source_documents": []
+                }
+
+            structured = self.answer_structured(query)
+            if structured is not None:
+                return structured
+
+            result = await self.arun_chain_cached(query)
+            return self.sources_response(query, result)
+
+        except Exception as e:
+            print(f"Error in aask_with_sources(): {e}")
+            metrics.inc("rag_failed_requests_total", method="aask_with_sources")
             return {
                 "query": query,
                 "answer": "An internal error occurred.",
@@ -225,5 +1081,53 @@ Answer:
             }
 
 
-# Initialize pipeline instance
-pipeline = RetrievalPipeline()
+class AnswerStream:
+    """
+    Iterable of answer tokens (suitable for st.write_stream). Sources are available
+    before the first token; the guarded final answer and the time-to-first-token /
+    total timings are set once iteration completes.
+    """
+
+    def __init__(self, pipeline, query, source_documents, tokens, finalize, start):
+        self.pipeline = pipeline
+        self.query = query
+        self.source_documents = source_documents
+        self.answer = None
+        self.timings = {}
+        self._tokens = tokens
+        self._finalize = finalize
+        self._start = start
+
+    @classmethod
+    def from_text(cls, pipeline, query, text, source_documents, start):
+        """A stream that yields an already known answer as a single token"""
+        return cls(pipeline, query, source_documents, iter([text]), lambda full: full, start)
+
+    def __iter__(self):
+        parts = []
+        try:
+            for token in self._tokens:
+                if not token:
+                    continue
+                if "time_to_first_token" not in self.timings:
+                    self.timings["time_to_first_token"] = time.perf_counter() - self._start
+                parts.append(token)
+                yield token
+            self.answer = self._finalize("".join(parts))
+        except Exception as e:
+            print(f"Error while streaming answer: {e}")
+            self.answer = "An internal error occurred."
+        self.timings.setdefault("time_to_first_token", time.perf_counter() - self._start)
+        self.timings["total"] = time.perf_counter() - self._start
+        self.pipeline.stream_timings.append({"query": self.query, **self.timings})
+        metrics.observe("rag_time_to_first_token_seconds", self.timings["time_to_first_token"])
+        metrics.observe("rag_request_seconds", self.timings["total"], stage="stream_with_sources")
+
+    def to_dict(self) -> dict:
+        """Same shape as ask_with_sources (after the stream has been consumed)"""
+        return {
+            "query": self.query,
+            "answer": self.answer,
+            "source_documents": self.source_documents
+        }
+
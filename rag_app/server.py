@@ -0,0 +1,218 @@
+import json
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from retrieval_pipeline import RetrievalPipeline
+from metrics import registry as metrics
+from utils import percentile
+import config
+
+
+class MicroBatcher:
+    """
+    Collects RAG requests that arrive within a short window and answers them
+    together through RetrievalPipeline.ask_with_sources_batch (one embedding call,
+    batched Chroma queries, concurrent LLM calls). Queries are submitted already
+    routed to RAG by QueryService.
+    """
+
+    def __init__(self, pipeline: RetrievalPipeline, window_ms: float, max_batch_size: int):
+        self.pipeline = pipeline
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self.queue = queue.Queue()
+        self.batch_sizes = Counter()
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="rag-micro-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, query: str) -> Future:
+        future = Future()
+        self.queue.put((query, future))
+        return future
+
+    @property
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def batch_size_counts(self) -> Counter:
+        """Snapshot of batch_sizes, safe to read while batches are being run"""
+        with self._lock:
+            return Counter(self.batch_sizes)
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            with self._lock:
+                self.batch_sizes[len(batch)] += 1
+            try:
+                results = self.pipeline.ask_with_sources_batch([query for query, _ in batch], routed=True)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+
+class QueryService:
+    """ask_with_sources as a service: canned and structured answers inline, RAG answers micro-batched"""
+
+    def __init__(self, pipeline: RetrievalPipeline = None):
+        self.pipeline = pipeline or RetrievalPipeline()
+        self.batcher = MicroBatcher(
+            self.pipeline,
+            window_ms=config.SERVER_BATCH_WINDOW_MS,
+            max_batch_size=config.SERVER_MAX_BATCH_SIZE
+        )
+        self.latencies = deque(maxlen=10000)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def ask(self, query: str) -> dict:
+        start = time.perf_counter()
+        query_type = self.pipeline.preprocess_query(query)
+        self.pipeline.router.record(query_type)
+        if query_type != "nobel":
+            result = {"query": query, "answer": self.pipeline.static_answer(query_type), "source_documents": []}
+        else:
+            # Structured lookups never wait out the batch window
+            result = self.pipeline.answer_structured(query)
+            if result is None:
+                result = self.batcher.submit(query).result(timeout=config.SERVER_REQUEST_TIMEOUT)
+
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - start)
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            latencies = list(self.latencies)
+            requests = self.requests
+        batch_sizes = self.batcher.batch_size_counts()
+        batches = sum(batch_sizes.values())
+        batched_requests = sum(size * count for size, count in batch_sizes.items())
+        return {
+            "requests": requests,
+            "queue_depth": self.batcher.depth,
+            "batches": batches,
+            "mean_batch_size": batched_requests / batches if batches else 0.0,
+            "max_batch_size": max(batch_sizes, default=0),
+            "batch_size_counts": {str(size): count for size, count in sorted(batch_sizes.items())},
+            "latency_ms": {
+                "p50": percentile(latencies, 50) * 1000,
+                "p95": percentile(latencies, 95) * 1000,
+                "p99": percentile(latencies, 99) * 1000
+            },
+            "answer_cache": self.pipeline.answer_cache.stats() if self.pipeline.answer_cache else None,
+            "routes": self.pipeline.router.stats(),
+            "collection": {
+                "version": self.pipeline.collection_version,
+                "swaps": list(self.pipeline.swap_stats)
+            }
+        }
+
+
+class QueryRequestHandler(BaseHTTPRequestHandler):
+    """
+    POST /ask   {"query": "..."}  -> ask_with_sources JSON
+    GET  /health                  -> {"status": "ok", "warm_up": "warming" | "ready" | "failed", "collection_version": ...}
+    GET  /stats                   -> queue depth, batch sizes, latency percentiles, requests per intent
+    GET  /metrics                 -> per-stage metrics, Prometheus text format
+    GET  /metrics.json            -> the same metrics as JSON
+    """
+
+    service: QueryService = None
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_text(self, status: int, text: str):
+        body = text.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {
+                "status": "ok",
+                "warm_up": self.service.pipeline.warmup_status["state"],
+                "collection_version": self.service.pipeline.collection_version
+            })
+        elif self.path == "/stats":
+            self._send_json(200, self.service.stats())
+        elif self.path == "/metrics":
+            self._send_text(200, metrics.to_prometheus())
+        elif self.path == "/metrics.json":
+            self._send_json(200, metrics.to_dict())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/ask":
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            query = str(payload.get("query", "")).strip()
+        except (ValueError, TypeError):
+            self._send_json(400, {"error": "Body must be JSON: {\"query\": \"...\"}"})
+            return
+        if not query:
+            self._send_json(400, {"error": "Missing 'query'"})
+            return
+
+        try:
+            self._send_json(200, self.service.ask(query))
+        except Exception as e:
+            print(f"Error in /ask: {e}")
+            self._send_json(500, {"error": "An internal error occurred."})
+
+    def log_message(self, format, *args):
+        # Keep the console quiet; per-request latency is available from /stats
+        pass
+
+
+def serve(host: str = None, port: int = None):
+    host = host or config.SERVER_HOST
+    port = port or config.SERVER_PORT
+    QueryRequestHandler.service = QueryService()
+    if config.WARMUP_ENABLED:
+        QueryRequestHandler.service.pipeline.start_warm_up()
+    httpd = ThreadingHTTPServer((host, port), QueryRequestHandler)
+    print(f" Serving on http://{host}:{port} (POST /ask, GET /stats, GET /metrics, GET /health)")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        print(" Shutting down")
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    serve()
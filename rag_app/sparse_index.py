@@ -0,0 +1,114 @@
+import json
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+from structured_index import fold
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Accent- and case-folded word tokens; years and acronyms are kept as-is"""
+    return TOKEN_PATTERN.findall(fold(text))
+
+
+class BM25Index:
+    """
+    In-memory BM25 inverted index over the chunk texts stored in Chroma.
+
+    Exact tokens such as names, acronyms and years ("Bohr", "ICRC", "1917") score
+    highly here even when the dense embedding blurs them. Only ids, lengths,
+    metadata and postings are kept; chunk texts are fetched from Chroma.
+    """
+
+    def __init__(self, ids: List[str], lengths: List[int], metadatas: List[dict],
+                 postings: Dict[str, List[Tuple[int, int]]], k1: float = 1.5, b: float = 0.75):
+        self.ids = ids
+        self.lengths = lengths
+        self.metadatas = metadatas
+        self.postings = postings
+        self.k1 = k1
+        self.b = b
+        self.avg_length = sum(lengths) / len(lengths) if lengths else 0.0
+        self.idf = {
+            term: math.log(1 + (len(ids) - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in postings.items()
+        }
+
+    @classmethod
+    def build(cls, ids: Sequence[str], texts: Sequence[str], metadatas: Sequence[dict], **kwargs) -> "BM25Index":
+        lengths = []
+        postings = defaultdict(list)
+        for doc, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings[term].append((doc, tf))
+        return cls(list(ids), lengths, [dict(m or {}) for m in metadatas], dict(postings), **kwargs)
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, **kwargs) -> "BM25Index":
+        data = vectorstore.get(include=["documents", "metadatas"])
+        return cls.build(data["ids"], data["documents"], data["metadatas"], **kwargs)
+
+    # ---------------- PERSISTENCE ----------------
+    def save(self, path: str):
+        """Write atomically, like the ingest manifest"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "k1": self.k1,
+                "b": self.b,
+                "ids": self.ids,
+                "lengths": self.lengths,
+                "metadatas": self.metadatas,
+                "postings": self.postings
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["BM25Index"]:
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f" Warning: could not read BM25 index: {e}")
+            return None
+        postings = {term: [tuple(p) for p in docs] for term, docs in data["postings"].items()}
+        return cls(data["ids"], data["lengths"], data["metadatas"], postings, k1=data["k1"], b=data["b"])
+
+    # ---------------- SEARCH ----------------
+    def _matches(self, doc: int, constraints: dict) -> bool:
+        metadata = self.metadatas[doc]
+        return all(str(metadata.get(key)) == value for key, value in constraints.items())
+
+    def search(self, query: str, k: int, constraints: dict = None) -> List[Tuple[str, float]]:
+        """Top-k (chunk_id, score) pairs, restricted to chunks whose metadata equals the constraints"""
+        scores = defaultdict(float)
+        # Unique terms in query order: a set's order changes with the hash seed, and so
+        # would the float sums and the ranking of near-ties
+        for term in dict.fromkeys(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for doc, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[doc] / self.avg_length)
+                scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        if constraints:
+            scores = {doc: score for doc, score in scores.items() if self._matches(doc, constraints)}
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.ids[doc], score) for doc, score in ranked]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], weights: Sequence[float], k: int = 60) -> List[str]:
+    """Fuse ranked id lists: score(id) = sum(weight / (k + rank)), ranks starting at 1"""
+    scores = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] += weight / (k + rank)
+    return sorted(scores, key=lambda doc_id: scores[doc_id], reverse=True)
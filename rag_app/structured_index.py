@@ -0,0 +1,287 @@
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, List, Optional, Set
+import config
+from utils import build_documents, iter_csv_frames
+
+# Query words that map onto the CSV's category values
+CATEGORY_SYNONYMS = {
+    "physics": "Physics",
+    "chemistry": "Chemistry",
+    "medicine": "Physiology or Medicine",
+    "physiology": "Physiology or Medicine",
+    "literature": "Literature",
+    "peace": "Peace",
+    "economics": "Economic Sciences",
+    "economic": "Economic Sciences",
+    "economy": "Economic Sciences",
+}
+
+ORGANIZATION_WORDS = ["organization", "organizations", "organisation", "organisations", "institution", "institutions"]
+
+GENDER_WORDS = {
+    "woman": "female",
+    "women": "female",
+    "female": "female",
+    "females": "female",
+    "male": "male",
+    "males": "male",
+    "men": "male",
+}
+
+COUNTRY_ALIASES = {
+    "united states": "USA",
+    "america": "USA",
+    "britain": "United Kingdom",
+    "uk": "United Kingdom",
+    "england": "United Kingdom",
+}
+
+# Birth and death wording: a year next to it is not an award year
+BIRTH_WORDS = ["born", "birth", "birthplace", "birthday", "birthdate"]
+DEATH_WORDS = ["died", "die", "dies", "death", "dead", "deceased"]
+
+# Questions that need reasoning or aggregation the index cannot do; these go to RAG
+UNSUPPORTED_WORDS = [
+    "why", "how", "explain", "describe", "compare", "difference", "first", "last",
+    "youngest", "oldest", "most", "least", "before", "after", "between", "since",
+    "until", "impact", "contribution", "contributions", "significance", "work", "life",
+    # Negations: the index can only list who did win
+    "not", "never", "without", "except", "excluding", "other than", "no", "none", "nobody",
+    "didn't", "didn’t", "wasn't", "wasn’t", "weren't", "weren’t", "isn't", "isn’t", "doesn't", "doesn’t",
+    # The index has no death dates or places
+    *DEATH_WORDS,
+    # Fields the answer does not render (birth date and place, affiliations, amounts, ...)
+    "where", "when", "affiliated", "affiliation", "affiliations", "university", "universities",
+    "amount", "money", "share", "shared", "portion", "motivation", "age", "aged"
+]
+
+YEAR_PATTERN = re.compile(r"(?<!\d)(1[89]\d{2}|20\d{2})(?!\d)")
+
+
+def strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents so 'Irene Joliot-Curie' matches 'Irène Joliot-Curie'"""
+    if text.isascii():
+        return text.lower()
+    return strip_accents(text).lower()
+
+
+def compile_terms(terms, flags=0) -> Optional[re.Pattern]:
+    """Single alternation over all terms (longest first) with word-boundary matching"""
+    terms = sorted({t for t in terms if t}, key=len, reverse=True)
+    if not terms:
+        return None
+    return re.compile(r"(?<!\w)(?:" + "|".join(re.escape(t) for t in terms) + r")(?!\w)", flags)
+
+
+class StructuredIndex:
+    """
+    In-memory index over nobel.csv keyed by (category, awardYear), laureate name,
+    country and ind_or_org. Answers simple factual questions directly, without
+    vector search or an LLM call. Anything it cannot parse reliably returns None.
+    """
+
+    def __init__(self, records: List[dict]):
+        self.records = records
+        self.by_category_year = defaultdict(list)
+        self.by_year = defaultdict(list)
+        self.by_laureate = defaultdict(list)
+        self.by_country = defaultdict(list)
+        self.by_type = defaultdict(list)
+
+        full_names = defaultdict(set)
+        family_names = defaultdict(set)
+        for i, record in enumerate(records):
+            self.by_category_year[(record["category"], record["year"])].append(i)
+            self.by_year[record["year"]].append(i)
+            self.by_laureate[record["laureate_id"]].append(i)
+            self.by_country[record["country"]].append(i)
+            self.by_type[record["type"]].append(i)
+            for name in record["names"]:
+                full_names[fold(name)].add(record["laureate_id"])
+            if record["family_name"] and len(record["family_name"]) >= 4:
+                family_names[fold(record["family_name"])].add(record["laureate_id"])
+
+        # Only names that identify exactly one laureate are usable
+        self.full_names = {name: ids.pop() for name, ids in full_names.items() if len(ids) == 1}
+        self.family_names = {name: ids.pop() for name, ids in family_names.items() if len(ids) == 1}
+        self.countries = {fold(c): c for c in self.by_country if c}
+        self.countries.update({alias: c for alias, c in COUNTRY_ALIASES.items() if c in self.by_country})
+
+        self.full_name_pattern = compile_terms(self.full_names)
+        # Family names alone are only trusted when capitalised, so "young" never means Michael Young
+        self.family_name_pattern = compile_terms(self.family_names, re.IGNORECASE)
+        self.country_pattern = compile_terms(self.countries)
+        self.category_pattern = compile_terms(CATEGORY_SYNONYMS)
+        self.organization_pattern = compile_terms(ORGANIZATION_WORDS)
+        self.gender_pattern = compile_terms(GENDER_WORDS)
+        self.unsupported_pattern = compile_terms(UNSUPPORTED_WORDS)
+        self.birth_pattern = compile_terms(BIRTH_WORDS)
+
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_csv(cls, file_path: str) -> "StructuredIndex":
+        """Build the index from the same rendered Documents the ingestion pipeline stores"""
+        records = []
+        for frame in iter_csv_frames(str(file_path), chunksize=config.CSV_READ_CHUNKSIZE):
+            documents = {
+                doc.metadata["row_index"]: doc
+                for doc in build_documents(frame, config.METADATA_COLUMNS, source=str(file_path))
+            }
+            for row_index, row in zip(frame.index.tolist(), frame.to_dict("records")):
+                doc = documents.get(row_index)
+                if doc is None:
+                    continue
+                value = lambda col: row.get(col) if isinstance(row.get(col), str) else ""
+                display_name = value("fullName") or value("orgName")
+                names = {
+                    value("fullName"), value("knownName"), value("name"), value("orgName"),
+                    # "Marie Curie, née Sklodowska" -> "Marie Curie"
+                    value("fullName").split(",")[0], value("name").split(",")[0],
+                    # Acronyms such as "ICRC" or "IPCC"; two-letter ones collide with ordinary words
+                    value("acronym") if len(value("acronym")) >= 3 else ""
+                }
+                records.append({
+                    "laureate_id": value("id") or display_name,
+                    "display_name": display_name,
+                    "names": {n.strip() for n in names if n.strip()},
+                    "family_name": value("familyName").split(",")[0].strip(),
+                    "category": value("category"),
+                    "year": value("awardYear"),
+                    "motivation": value("motivation"),
+                    "country": value("birth_country") or value("org_founded_country"),
+                    "type": value("ind_or_org"),
+                    "gender": value("gender"),
+                    "document": doc
+                })
+        return cls(records)
+
+    # ---------------- QUERY PARSING ----------------
+    def parse(self, query: str) -> Optional[Dict]:
+        """Extract constraints from the query; None if it is not safely answerable"""
+        folded = fold(query)
+        if self.unsupported_pattern.search(folded):
+            return None
+
+        years = set(YEAR_PATTERN.findall(folded))
+        categories = {CATEGORY_SYNONYMS[m] for m in self.category_pattern.findall(folded)}
+        laureates = self.match_laureates(query)
+        countries = {self.countries[m] for m in self.country_pattern.findall(folded)} if self.country_pattern else set()
+        organizations_only = bool(self.organization_pattern.search(folded))
+        genders = {GENDER_WORDS[m] for m in self.gender_pattern.findall(folded)}
+
+        if len(years) > 1 or len(categories) > 1 or len(laureates) > 1 or len(countries) > 1 or len(genders) > 1:
+            return None
+        # "born in 1921" is not the 1921 prize, and "Where was Marie Curie born?" asks for a
+        # field the answer lacks; only "born in <country>" is the birth country the index stores
+        if (years or laureates) and self.birth_pattern.search(folded):
+            return None
+        # "Which organization was Einstein at?" asks about an affiliation, not a laureate list
+        if laureates and organizations_only:
+            return None
+        # Category alone is too broad to list
+        if not (years or laureates or countries or organizations_only):
+            return None
+
+        return {
+            "year": next(iter(years), None),
+            "category": next(iter(categories), None),
+            "laureate_id": next(iter(laureates), None),
+            "country": next(iter(countries), None),
+            "gender": next(iter(genders), None),
+            "organizations_only": organizations_only
+        }
+
+    def match_laureates(self, query: str) -> Set[str]:
+        """Ids of the laureates the query names: full names, else capitalised unique family names"""
+        laureates = {self.full_names[m] for m in self.full_name_pattern.findall(fold(query))}
+        if not laureates and self.family_name_pattern:
+            laureates = {
+                self.family_names[m.lower()]
+                for m in self.family_name_pattern.findall(strip_accents(query))
+                if m[0].isupper()
+            }
+        return laureates
+
+    def lookup(self, parsed: Dict) -> List[dict]:
+        if parsed["laureate_id"]:
+            candidates = self.by_laureate[parsed["laureate_id"]]
+        elif parsed["year"] and parsed["category"]:
+            candidates = self.by_category_year[(parsed["category"], parsed["year"])]
+        elif parsed["year"]:
+            candidates = self.by_year[parsed["year"]]
+        elif parsed["country"]:
+            candidates = self.by_country[parsed["country"]]
+        else:
+            candidates = self.by_type["Organization"]
+
+        rows = [self.records[i] for i in candidates]
+        if parsed["year"]:
+            rows = [r for r in rows if r["year"] == parsed["year"]]
+        if parsed["category"]:
+            rows = [r for r in rows if r["category"] == parsed["category"]]
+        if parsed["country"]:
+            rows = [r for r in rows if r["country"] == parsed["country"]]
+        if parsed["gender"]:
+            rows = [r for r in rows if r["gender"] == parsed["gender"]]
+        if parsed["organizations_only"] and not parsed["laureate_id"]:
+            rows = [r for r in rows if r["type"] == "Organization"]
+        return sorted(rows, key=lambda r: (r["year"], r["category"]))
+
+    # ---------------- ANSWERING ----------------
+    def format_answer(self, parsed: Dict, rows: List[dict]) -> str:
+        if parsed["laureate_id"]:
+            title = rows[0]["display_name"]
+        else:
+            title = "Nobel Prize"
+            if parsed["category"]:
+                title += f" in {parsed['category']}"
+            if parsed["year"]:
+                title += f" {parsed['year']}"
+            if parsed["gender"]:
+                title += " – Women" if parsed["gender"] == "female" else " – Men"
+            if parsed["organizations_only"]:
+                title += " – Organizations"
+            if parsed["country"]:
+                title += f" – Laureates from {parsed['country']}"
+
+        lines = [f"### {title}", ""]
+        for row in rows:
+            line = f"- **{row['display_name']}** – {row['category']}, {row['year']}"
+            if row["motivation"]:
+                line += f": {row['motivation']}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def answer(self, query: str) -> Optional[dict]:
+        """
+        Answer the query from the index in the same shape as ask_with_sources,
+        or return None so the caller falls back to RAG.
+        """
+        parsed = self.parse(query)
+        rows = self.lookup(parsed) if parsed else []
+        if not rows or len(rows) > config.STRUCTURED_FAST_PATH_MAX_ROWS:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        return {
+            "query": query,
+            "answer": self.format_answer(parsed, rows),
+            "source_documents": [
+                {
+                    "content": row["document"].page_content,
+                    "metadata": row["document"].metadata
+                }
+                for row in rows
+            ]
+        }
+
@@ -0,0 +1,15 @@
+import config
+from answer_cache import AnswerCache
+from structured_index import StructuredIndex
+
+
+def test_similar_queries_about_different_laureates_do_not_share_answers():
+    index = StructuredIndex.from_csv(config.CSV_FILE_PATH)
+    marie = {"laureates": sorted(index.match_laureates("What did Marie Curie discover?"))}
+    pierre = {"laureates": sorted(index.match_laureates("What did Pierre Curie discover?"))}
+    assert marie != pierre
+
+    cache = AnswerCache(max_entries=10, ttl_seconds=60, similarity_threshold=0.95)
+    cache.put("What did Marie Curie discover?", [1.0, 0.0], marie, {"result": "radium"})
+    assert cache.get_similar([1.0, 0.0], pierre) is None
+    assert cache.get_similar([1.0, 0.01], marie) == {"result": "radium"}
@@ -0,0 +1,52 @@
+import json
+import os
+import time
+import pytest
+import config
+import collection_versions as versions
+
+
+@pytest.fixture
+def persist_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "CHROMA_PERSIST_DIRECTORY", str(tmp_path))
+    return tmp_path
+
+
+def build(count: int):
+    built = []
+    for _ in range(count):
+        version = versions.new_version()
+        with open(os.path.join(versions.version_path(version), config.INGEST_MANIFEST_FILE), "w") as f:
+            json.dump({"complete": True}, f)
+        versions.publish(version)
+        built.append(version)
+    return built
+
+
+def test_keeps_newest_versions(persist_dir):
+    oldest, previous, live = build(3)
+    assert versions.collect_garbage(keep=2) == [oldest]
+    assert versions.list_versions() == [previous, live]
+
+
+def test_leased_version_is_kept(persist_dir):
+    oldest, previous, live = build(3)
+    versions.write_lease("reader", [oldest])
+    assert versions.collect_garbage(keep=1) == [previous]
+    assert versions.list_versions() == [oldest, live]
+
+
+def test_expired_lease_is_ignored(persist_dir):
+    oldest, previous, live = build(3)
+    versions.write_lease("reader", [oldest])
+    expired = time.time() - config.COLLECTION_LEASE_TTL_SECONDS - 1
+    os.utime(versions.lease_path("reader"), (expired, expired))
+    assert versions.collect_garbage(keep=2) == [oldest]
+    assert not os.path.exists(versions.lease_path("reader"))
+
+
+def test_leases_are_not_copied(persist_dir):
+    (live,) = build(1)
+    versions.write_lease("reader", [live])
+    copy = versions.new_version(copy_from=str(persist_dir))
+    assert config.COLLECTION_LEASES_DIR not in os.listdir(versions.version_path(copy))
@@ -0,0 +1,77 @@
+import json
+import os
+import numpy as np
+import pytest
+import flat_index
+from flat_index import FlatVectorStore, METADATA_FILE
+
+
+def vectors(n, dim=8, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, dim))
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_batched_upserts_match_one_upsert(tmp_path, dtype):
+    data = vectors(300)
+    ids = [f"id{i}" for i in range(300)]
+    batched = FlatVectorStore.empty(str(tmp_path / "batched"), dtype)
+    for start in range(0, 300, 7):
+        batched.upsert(ids[start:start + 7], data[start:start + 7], [{"n": str(i)} for i in range(start, min(300, start + 7))])
+    batched.upsert(["id5"], data[:1], [{"n": "updated"}])
+    whole = FlatVectorStore.empty(str(tmp_path / "whole"), dtype)
+    whole.upsert(ids, np.concatenate([data[:5], data[:1], data[6:]]), [{"n": str(i)} for i in range(300)])
+
+    assert batched.ids == whole.ids
+    np.testing.assert_array_equal(batched.vectors, whole.vectors)
+    assert batched.get(ids=["id5"])["metadatas"] == [{"n": "updated"}]
+
+    batched.save()
+    loaded = FlatVectorStore.load(batched.path)
+    np.testing.assert_array_equal(loaded.vectors, whole.vectors)
+    assert loaded.query(data[42:43], n_results=1)["ids"] == [["id42"]]
+
+
+def test_save_replaces_files(tmp_path):
+    store = FlatVectorStore.empty(str(tmp_path), "int8")
+    store.upsert(["a", "b"], vectors(2))
+    store.save()
+    first = set(os.listdir(tmp_path))
+    store.upsert(["c"], vectors(1, seed=1))
+    store.save()
+    assert not first & set(os.listdir(tmp_path)) - {METADATA_FILE}
+    assert all(os.path.exists(path) for path in store.files())
+    assert FlatVectorStore.load(str(tmp_path)).ids == ["a", "b", "c"]
+
+
+def test_load_retries_when_saved_concurrently(tmp_path, monkeypatch):
+    store = FlatVectorStore.empty(str(tmp_path), "float16")
+    store.upsert(["a", "b"], vectors(2))
+    store.save()
+    with open(tmp_path / METADATA_FILE, encoding="utf-8") as f:
+        stale = json.load(f)
+    store.upsert(["b"], vectors(1, seed=1))
+    store.save()
+
+    # The reader gets the metadata of the first save, whose files the second save deleted
+    reads = []
+    real_load = json.load
+
+    def load_metadata(f):
+        reads.append(f.name)
+        return stale if len(reads) == 1 else real_load(f)
+
+    monkeypatch.setattr(flat_index.json, "load", load_metadata)
+    loaded = FlatVectorStore.load(str(tmp_path))
+    assert len(reads) == 2
+    np.testing.assert_array_equal(loaded.vectors, store.vectors)
+
+
+def test_save_due_doubles(tmp_path):
+    store = FlatVectorStore.empty(str(tmp_path), "float16")
+    saves = 0
+    for start in range(0, 6400, 64):
+        store.upsert([str(i) for i in range(start, start + 64)], vectors(64))
+        if store.save_due():
+            store.save()
+            saves += 1
+    assert saves <= 8
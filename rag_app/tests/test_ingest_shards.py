@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+from ingest_shards import plan_shards, read_shard
+
+CSV = (
+    'id,awardYear,motivation\n'
+    '1,1901,"first line\nsecond line"\n'
+    '\n'
+    '2,1902,plain\n'
+    '3,1903,"with ""quotes""\n\nand a blank line inside"\n'
+    '\n'
+    '\n'
+    '4,1904,"ends with a newline\n"\n'
+    '5,1905,last\n'
+)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "laureates.csv"
+    path.write_bytes(CSV.encode("utf-8"))
+    return str(path)
+
+
+@pytest.mark.parametrize("rows_per_shard", [1, 2, 3, 10])
+def test_shards_reassemble_the_csv(csv_path, rows_per_shard):
+    expected = pd.read_csv(csv_path, dtype=str)
+    header, shards = plan_shards(csv_path, rows_per_shard)
+
+    assert header == b"id,awardYear,motivation\n"
+    assert [shard[0] for shard in shards] == list(range(0, len(expected), rows_per_shard))
+    assert sum(shard[1] for shard in shards) == len(expected)
+    frames = [read_shard(csv_path, "utf-8", header, shard) for shard in shards]
+    pd.testing.assert_frame_equal(pd.concat(frames), expected)
+
+
+def test_header_only(tmp_path):
+    path = tmp_path / "empty.csv"
+    path.write_bytes(b"id,awardYear\n")
+    assert plan_shards(str(path), 2) == (b"id,awardYear\n", [])
@@ -0,0 +1,42 @@
+import pytest
+from intent_router import IntentRouter
+
+
+@pytest.fixture(scope="module")
+def router():
+    return IntentRouter.from_config()
+
+
+@pytest.mark.parametrize("query, intent", [
+    # greeting: whole query only, whatever the punctuation or case
+    ("hi", "greeting"),
+    ("Hello!", "greeting"),
+    ("Hey there!!", "greeting"),
+    ("Good morning.", "greeting"),
+    ("hi, who won the Nobel Prize in Physics in 1921?", "nobel"),
+    # identity
+    ("Who are you?", "identity"),
+    ("Please introduce yourself", "identity"),
+    # invalid_category: "math" as a word, next to prize wording
+    ("Who won the Nobel Prize in Mathematics?", "invalid_category"),
+    ("Is there a math prize?", "invalid_category"),
+    ("What was the aftermath of the Nobel Peace Prize in 1919?", "nobel"),
+    # ambiguous: "first winner" without a category
+    ("Who was the first winner?", "ambiguous"),
+    ("Who was the first winner of the Nobel Prize in Chemistry?", "nobel"),
+    # nobel
+    ("Which laureates were born in Denmark?", "nobel"),
+    ("physics in 1921", "nobel"),
+    ("Literature laureates of the 1990s", "nobel"),
+    # off_topic: a year alone is not a prize question
+    ("What year is it?", "off_topic"),
+    ("What happened in 1921?", "off_topic"),
+    ("Tell me a joke", "off_topic"),
+])
+def test_route(router, query, intent):
+    assert router.route(query) == intent
+
+
+def test_only_retrieval_intents_lack_an_answer(router):
+    assert router.answer("nobel") is None
+    assert router.answer("greeting") is not None
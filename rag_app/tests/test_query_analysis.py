@@ -0,0 +1,27 @@
+from query_analysis import QueryAnalyzer
+
+analyzer = QueryAnalyzer(countries={"germany": "Germany", "usa": "USA"})
+
+
+def test_award_year_and_category():
+    assert analyzer.extract_constraints("Who won the Nobel Prize in Physics in 1921?") == {
+        "category": "Physics", "awardYear": "1921"
+    }
+
+
+def test_birth_and_death_years_are_not_award_years():
+    assert analyzer.extract_constraints("Which Nobel laureates were born in 1921?") == {}
+    assert analyzer.extract_constraints("Which Physics laureates died in 1955?") == {"category": "Physics"}
+
+
+def test_death_country():
+    assert analyzer.extract_constraints("Which laureates died in Germany?") == {"death_country": "Germany"}
+    assert analyzer.extract_constraints("Which laureates were born in Germany?") == {"birth_country": "Germany"}
+
+
+def test_organization_only_when_subject():
+    assert analyzer.extract_constraints("Which organizations won the Nobel Peace Prize in 1917?") == {
+        "category": "Peace", "awardYear": "1917", "ind_or_org": "Organization"
+    }
+    assert analyzer.extract_constraints("List organization laureates") == {"ind_or_org": "Organization"}
+    assert analyzer.extract_constraints("Which organization was Albert Einstein affiliated with?") == {}
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+import pytest
+from transport import BackendTransport
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: str):
+        super().__init__("429")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"retry-after": retry_after})
+
+
+def transport(**overrides):
+    options = {"max_concurrency": 1, "max_attempts": 3, "base_delay": 0, "max_delay": 5}
+    return BackendTransport("test", **{**options, **overrides})
+
+
+def slot_free(backend: BackendTransport) -> bool:
+    if backend._slots.acquire(blocking=False):
+        backend._slots.release()
+        return True
+    return False
+
+
+def test_stream_holds_slot_until_exhausted():
+    backend = transport()
+    stream = backend.stream(lambda: iter(["a", "b"]))
+    assert next(stream) == "a"
+    assert not slot_free(backend)
+    assert list(stream) == ["b"]
+    assert slot_free(backend)
+
+
+def test_stream_releases_slot_when_closed():
+    backend = transport()
+    stream = backend.stream(lambda: iter(["a", "b"]))
+    next(stream)
+    stream.close()
+    assert slot_free(backend)
+
+
+def test_async_calls_share_the_sync_limit():
+    backend = transport()
+    started = []
+
+    async def work():
+        started.append(True)
+        return "ok"
+
+    async def main():
+        release = threading.Event()
+        holder = threading.Thread(target=lambda: backend.call(release.wait))
+        holder.start()
+        await asyncio.sleep(0.05)
+        task = asyncio.ensure_future(backend.acall(work))
+        await asyncio.sleep(0.05)
+        assert not started
+        release.set()
+        assert await task == "ok"
+        holder.join()
+
+    asyncio.run(main())
+    assert slot_free(backend)
+
+
+def test_cancelled_async_wait_returns_its_slot():
+    backend = transport()
+
+    async def main():
+        backend._slots.acquire()
+        task = asyncio.ensure_future(backend.acall(asyncio.sleep, 0))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        backend._slots.release()
+        await asyncio.sleep(0.05)
+
+    asyncio.run(main())
+    assert slot_free(backend)
+
+
+def test_stream_retries_before_first_chunk(monkeypatch):
+    monkeypatch.setattr("transport.time.sleep", lambda seconds: None)
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RateLimited("1")
+        return iter(["ok"])
+
+    backend = transport()
+    assert list(backend.stream(flaky)) == ["ok"]
+    assert len(calls) == 2 and slot_free(backend)
+
+
+def test_long_retry_after_gives_up(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr("transport.time.sleep", sleeps.append)
+
+    def rate_limited():
+        raise RateLimited("3600")
+
+    with pytest.raises(RateLimited):
+        transport().call(rate_limited)
+    assert sleeps == []
+
+
+def test_retry_after_is_capped():
+    assert transport().delay(1, RateLimited("3")) == 3
+    assert transport().delay(1, RateLimited("3600")) == 5
@@ -0,0 +1,257 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from langchain_core.callbacks import CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from metrics import registry as metrics
+import config
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+_END = object()
+
+
+# ---------------- ERROR CLASSIFICATION ----------------
+def status_code(exc: BaseException) -> Optional[int]:
+    """HTTP status of a client error (groq APIStatusError, ollama ResponseError, httpx)"""
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    code = status_code(exc)
+    if code is not None:
+        return code in RETRYABLE_STATUSES
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # httpx.TransportError, groq.APIConnectionError / APITimeoutError, ...
+    names = {cls.__name__ for cls in type(exc).__mro__}
+    return bool(names & {"TransportError", "APIConnectionError", "APITimeoutError"})
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), if the error carries one"""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# ---------------- TRANSPORT ----------------
+class BackendTransport:
+    """
+    Shared call path for one remote backend (e.g. "ollama", "groq"): a concurrency
+    limit across every client of that backend (sync and async alike), and retries with exponential
+    backoff and full jitter. A Retry-After header overrides the computed delay; one
+    longer than max_delay fails the call instead (an ingest then resumes from its
+    checkpoint rather than stalling a worker for as long as the server asks).
+    """
+
+    def __init__(self, name: str, max_concurrency: int, max_attempts: int,
+                 base_delay: float, max_delay: float):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        # Async callers wait for a slot here, off the event loop
+        self._slot_waiters = ThreadPoolExecutor(thread_name_prefix=f"{name}-slots")
+        self._http_client = None
+        self._http_async_client = None
+        self._lock = threading.Lock()
+
+    def delay(self, attempt: int, exc: BaseException) -> float:
+        """Sleep before retry number `attempt` (1-based)"""
+        server_delay = retry_after(exc)
+        if server_delay is not None:
+            return min(server_delay, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def _should_retry(self, attempt: int, exc: BaseException) -> bool:
+        if attempt >= self.max_attempts or not is_retryable(exc):
+            return False
+        server_delay = retry_after(exc)
+        if server_delay is not None and server_delay > self.max_delay:
+            print(f" {self.name}: {type(exc).__name__}; server asks to retry in {server_delay:.0f}s "
+                  f"(more than {self.max_delay}s), giving up")
+            return False
+        metrics.inc("transport_retries_total", backend=self.name, status=str(status_code(exc) or "connection"))
+        print(f" {self.name}: {type(exc).__name__} ({exc}); retry {attempt}/{self.max_attempts - 1}")
+        return True
+
+    def call(self, func: Callable, *args, **kwargs):
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                with self._slots:
+                    return func(*args, **kwargs)
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                time.sleep(self.delay(attempt, e))
+
+    def stream(self, func: Callable, *args, **kwargs) -> Iterator:
+        """
+        Yield from the iterator func() returns, holding a concurrency slot until it is
+        exhausted or closed. Retried only until the first item has been yielded.
+        """
+        attempt = 0
+        while True:
+            attempt += 1
+            self._slots.acquire()
+            try:
+                iterator = func(*args, **kwargs)
+                first = next(iterator, _END)
+            except Exception as e:
+                self._slots.release()
+                if not self._should_retry(attempt, e):
+                    raise
+                time.sleep(self.delay(attempt, e))
+                continue
+            try:
+                if first is not _END:
+                    yield first
+                    yield from iterator
+            finally:
+                self._slots.release()
+            return
+
+    async def _acquire_async(self):
+        """Take a slot from the same semaphore as call()/stream() without blocking the loop"""
+        if self._slots.acquire(blocking=False):
+            return
+        waiter = asyncio.get_running_loop().run_in_executor(self._slot_waiters, self._slots.acquire)
+        try:
+            await asyncio.shield(waiter)
+        except asyncio.CancelledError:
+            # The waiting thread still takes the slot; hand it straight back
+            waiter.add_done_callback(lambda f: f.cancelled() or f.exception() or self._slots.release())
+            raise
+
+    async def acall(self, func: Callable, *args, **kwargs):
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                await self._acquire_async()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._slots.release()
+            except Exception as e:
+                if not self._should_retry(attempt, e):
+                    raise
+                await asyncio.sleep(self.delay(attempt, e))
+
+    # ---------------- POOLED HTTP CLIENTS ----------------
+    def httpx_options(self) -> dict:
+        """Keep-alive pool sized to the concurrency limit, with explicit timeouts"""
+        import httpx
+        return {
+            "limits": httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            ),
+            "timeout": httpx.Timeout(config.HTTP_TIMEOUT_SECONDS, connect=config.HTTP_CONNECT_TIMEOUT_SECONDS)
+        }
+
+    def http_client(self):
+        """One pooled httpx.Client shared by every client of this backend"""
+        import httpx
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(**self.httpx_options())
+            return self._http_client
+
+    def http_async_client(self):
+        import httpx
+        with self._lock:
+            if self._http_async_client is None:
+                self._http_async_client = httpx.AsyncClient(**self.httpx_options())
+            return self._http_async_client
+
+
+_transports: Dict[str, BackendTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(name: str) -> BackendTransport:
+    with _transports_lock:
+        if name not in _transports:
+            _transports[name] = BackendTransport(
+                name,
+                max_concurrency=config.BACKEND_CONCURRENCY.get(name, config.DEFAULT_BACKEND_CONCURRENCY),
+                max_attempts=config.RETRY_MAX_ATTEMPTS,
+                base_delay=config.RETRY_BASE_DELAY,
+                max_delay=config.RETRY_MAX_DELAY
+            )
+        return _transports[name]
+
+
+# ---------------- RESILIENT WRAPPERS ----------------
+class ResilientEmbeddings(Embeddings):
+    """Embeddings whose calls go through a backend transport (limit + retry)"""
+
+    def __init__(self, embeddings: Embeddings, transport: BackendTransport):
+        self.embeddings = embeddings
+        self.transport = transport
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.transport.call(self.embeddings.embed_documents, texts)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.transport.call(self.embeddings.embed_query, text)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        return await self.transport.acall(self.embeddings.aembed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return await self.transport.acall(self.embeddings.aembed_query, text)
+
+
+class ResilientChatModel(BaseChatModel):
+    """
+    Chat model whose calls go through a backend transport. Streams hold their
+    concurrency slot until they end, and are retried only until the first chunk has
+    been yielded; after that an error is raised as-is.
+    """
+
+    inner: BaseChatModel
+    transport: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return self.inner._llm_type
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> ChatResult:
+        return self.transport.call(self.inner._generate, messages, stop=stop, **kwargs)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        return await self.transport.acall(self.inner._agenerate, messages, stop=stop, **kwargs)
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Optional[CallbackManagerForLLMRun] = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        # Token callbacks fire once, from this model's stream()
+        yield from self.transport.stream(self.inner._stream, messages, stop=stop, **kwargs)
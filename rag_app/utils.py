@@ -1,92 +1,293 @@
-import pandas as pd
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from __future__ import annotations
+
+import codecs
+import hashlib
+import json
+import math
+import time
 from langchain_core.documents import Document
-from typing import List
+from itertools import chain, islice
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional
 
-def load_csv_data(file_path: str, text_columns: List[str], metadata_columns: List[str]) -> List[Document]:
-    try:
-        df = pd.read_csv(file_path, encoding='utf-8')
-    except UnicodeDecodeError:
+# pandas and the text splitters are imported where they are used, so modules that only
+# need the small helpers here (percentile, iter_batches, ...) start fast
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Columns that identify a CSV row wherever it sits in the file: one laureate's prize
+ROW_KEY_COLUMNS = ["id", "awardYear", "category"]
+# Positional/location metadata, left out of chunk hashes so moving a row or the CSV changes nothing
+UNHASHED_METADATA = ("row_index", "source")
+
+def detect_encoding(file_path: str, candidates=("utf-8", "latin1", "cp1252")) -> str:
+    """Pick the CSV encoding once, up front, by incrementally decoding the raw bytes"""
+    for encoding in candidates:
+        decoder = codecs.getincrementaldecoder(encoding)()
         try:
-            df = pd.read_csv(file_path, encoding='latin1')
-        except:
-            df = pd.read_csv(file_path, encoding='cp1252')
-    
-    documents = []
+            with open(file_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    decoder.decode(block)
+            decoder.decode(b"", final=True)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return candidates[-1]
+
+def iter_csv_frames(file_path: str, chunksize: int = 500, encoding: str = None) -> Iterator[pd.DataFrame]:
+    """
+    Read the CSV in row chunks. Columns are read as strings so values render the same
+    no matter which chunk they land in (per-chunk dtype inference would turn ints into
+    floats wherever a chunk happens to contain a missing value).
+    """
+    import pandas as pd
+    encoding = encoding or detect_encoding(file_path)
+    with pd.read_csv(file_path, encoding=encoding, dtype=str, chunksize=chunksize) as reader:
+        yield from reader
+
+def iter_csv_documents(file_path: str, metadata_columns: List[str], chunksize: int = 500) -> Iterator[Document]:
+    """Stream Documents from the CSV without holding the whole file in memory"""
+    for frame in iter_csv_frames(file_path, chunksize=chunksize):
+        yield from build_documents(frame, metadata_columns, source=str(file_path))
+
+def load_csv_data(file_path: str, text_columns: List[str], metadata_columns: List[str]) -> List[Document]:
+    documents = list(iter_csv_documents(file_path, metadata_columns))
     
-    for idx, row in df.iterrows():
-        text_parts = []
-        
-        # Laureate/Organization name
-        if pd.notna(row.get('fullName')):
-            text_parts.append(f"Laureate: {row['fullName']}")
-        elif pd.notna(row.get('orgName')):
-            text_parts.append(f"Organization: {row['orgName']}")
+    print(f"Created {len(documents)} documents from CSV")
+    return documents
+
+def _column(df: pd.DataFrame, name: str) -> pd.Series:
+    """Column as an object Series (values str() exactly like a row lookup); all-missing if absent"""
+    if name in df.columns:
+        return df[name].astype(object)
+    import pandas as pd
+    return pd.Series(None, index=df.index, dtype=object)
+
+def _line(label: str, values: pd.Series, mask: pd.Series, suffix: str = "") -> pd.Series:
+    """Render "Label: value" lines column-wise; rows outside mask get an empty string"""
+    return (label + values.astype(str) + suffix + "\n").where(mask, "")
+
+def row_keys(df: pd.DataFrame) -> pd.Series:
+    """
+    Stable identity of every row, independent of its position in the CSV: laureate id,
+    award year and category ("745-2001-economic-sciences"). A row missing one of them
+    falls back to a hash of all its values, so editing it reads as delete + add.
+    """
+    columns = [_column(df, col) for col in ROW_KEY_COLUMNS]
+    key = columns[0].astype(str)
+    for values in columns[1:]:
+        key = key + "-" + values.astype(str)
+    key = key.str.lower().str.replace(r"\s+", "-", regex=True)
+    complete = columns[0].notna()
+    for values in columns[1:]:
+        complete = complete & values.notna()
+    if not complete.all():
+        fallback = df.astype(object).astype(str).agg("\x1f".join, axis=1).map(
+            lambda values: "row-" + hashlib.sha256(values.encode("utf-8")).hexdigest()[:16]
+        )
+        key = key.where(complete, fallback)
+    return key
 
+def build_documents(df: pd.DataFrame, metadata_columns: List[str], source: str) -> List[Document]:
+    """
+    Column-wise Document builder. Every field is rendered for all rows at once with
+    vectorized string operations; output matches the original per-row loop exactly.
+    """
+    if df.empty:
+        return []
+
+    full_name = _column(df, 'fullName')
+    org_name = _column(df, 'orgName')
+    has_full_name = full_name.notna()
+    has_org = org_name.notna()
+
+    birth_city = _column(df, 'birth_city')
+    birth_country = _column(df, 'birth_country')
+    birth_place = (
+        "Birth Place: " + birth_city.astype(str)
+        + (", " + birth_country.astype(str)).where(birth_country.notna(), "")
+        + "\n"
+    ).where(birth_city.notna(), "")
+
+    def simple(label, col, suffix="", mask=None):
+        values = _column(df, col)
+        present = values.notna() if mask is None else mask & values.notna()
+        return _line(label, values, present, suffix)
+
+    parts = [
+        # Laureate/Organization name
+        _line("Laureate: ", full_name, has_full_name),
+        _line("Organization: ", org_name, ~has_full_name & has_org),
         # Prize information
-        if pd.notna(row.get('awardYear')):
-            text_parts.append(f"Year: {row['awardYear']}")
-        if pd.notna(row.get('category')):
-            text_parts.append(f"Category: {row['category']}")
-        if pd.notna(row.get('categoryFullName')):
-            text_parts.append(f"Category Full Name: {row['categoryFullName']}")
-        if pd.notna(row.get('motivation')):
-            text_parts.append(f"Motivation: {row['motivation']}")
-        if pd.notna(row.get('prizeAmount')):
-            text_parts.append(f"Prize Amount: {row['prizeAmount']} SEK")
-        if pd.notna(row.get('dateAwarded')):
-            text_parts.append(f"Date Awarded: {row['dateAwarded']}")
-        
+        simple("Year: ", 'awardYear'),
+        simple("Category: ", 'category'),
+        simple("Category Full Name: ", 'categoryFullName'),
+        simple("Motivation: ", 'motivation'),
+        simple("Prize Amount: ", 'prizeAmount', suffix=" SEK"),
+        simple("Date Awarded: ", 'dateAwarded'),
         # Personal information
-        if pd.notna(row.get('gender')):
-            text_parts.append(f"Gender: {row['gender']}")
-        if pd.notna(row.get('birth_date')):
-            text_parts.append(f"Birth Date: {row['birth_date']}")
-        if pd.notna(row.get('birth_city')):
-            birth_info = f"Birth Place: {row['birth_city']}"
-            if pd.notna(row.get('birth_country')):
-                birth_info += f", {row['birth_country']}"
-            text_parts.append(birth_info)
-        
+        simple("Gender: ", 'gender'),
+        simple("Birth Date: ", 'birth_date'),
+        birth_place,
         # Organizational information
-        if pd.notna(row.get('orgName')):
-            if pd.notna(row.get('acronym')):
-                text_parts.append(f"Acronym: {row['acronym']}")
-            if pd.notna(row.get('org_founded_date')):
-                text_parts.append(f"Founded: {row['org_founded_date']}")
-        
-        # Affiliations
-        for i in range(1, 5):
-            col = f'affiliation_{i}'
-            if col in row and pd.notna(row[col]):
-                text_parts.append(f"Affiliation {i}: {row[col]}")
-        
-        # Type of laureate
-        if pd.notna(row.get('ind_or_org')):
-            text_parts.append(f"Type: {row['ind_or_org']}")
-        
-        if text_parts:
-            combined_text = "\n".join(text_parts)
-            
-            metadata = {}
-            for col in metadata_columns:
-                if col in row and pd.notna(row[col]):
-                    metadata[col] = str(row[col])
-            
-            metadata["row_index"] = idx
-            metadata["source"] = str(file_path)
-            
-            doc = Document(page_content=combined_text, metadata=metadata)
-            documents.append(doc)
-    
-    print(f"Created {len(documents)} documents from CSV")
+        simple("Acronym: ", 'acronym', mask=has_org),
+        simple("Founded: ", 'org_founded_date', mask=has_org),
+    ]
+    # Affiliations
+    for i in range(1, 5):
+        col = f'affiliation_{i}'
+        if col in df.columns:
+            parts.append(simple(f"Affiliation {i}: ", col))
+    # Type of laureate
+    parts.append(simple("Type: ", 'ind_or_org'))
+
+    text = parts[0]
+    for part in parts[1:]:
+        text = text + part
+    keep = (text != "").tolist()
+    # Every rendered line ends with "\n"; drop the trailing one
+    texts = text.str[:-1].tolist()
+
+    meta_columns = [
+        (col, values.astype(str).tolist(), values.notna().tolist())
+        for col, values in ((col, df[col].astype(object)) for col in metadata_columns if col in df.columns)
+    ]
+    row_indexes = df.index.tolist()
+    keys = row_keys(df).tolist()
+
+    documents = []
+    for i, row_index in enumerate(row_indexes):
+        if not keep[i]:
+            continue
+        metadata = {col: values[i] for col, values, present in meta_columns if present[i]}
+        metadata["row_index"] = row_index
+        metadata["row_key"] = keys[i]
+        metadata["source"] = source
+        documents.append(Document(page_content=texts[i], metadata=metadata))
     return documents
 
+def compute_chunk_hash(doc: Document) -> str:
+    """
+    Content hash of a chunk (text + metadata) used for incremental ingest. The row's
+    position and the CSV path are left out: a row only changes when its content does.
+    """
+    metadata = {key: value for key, value in doc.metadata.items() if key not in UNHASHED_METADATA}
+    payload = json.dumps(
+        {"page_content": doc.page_content, "metadata": metadata},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def iter_batches(items: Iterable, batch_size: int) -> Iterator[list]:
+    """Yield lists of up to batch_size items from any iterable (lists or generators)"""
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+def peek(items: Iterable) -> Optional[Iterator]:
+    """Return an iterator over items, or None if it is empty (consumes nothing else)"""
+    iterator = iter(items)
+    first = next(iterator, None)
+    if first is None:
+        return None
+    return chain([first], iterator)
+
+_EXHAUSTED = object()
+
+def timed_iter(items: Iterable, timings: dict, stage: str) -> Iterator:
+    """Yield from items, adding the time spent producing them to timings[stage]"""
+    iterator = iter(items)
+    while True:
+        start = time.perf_counter()
+        item = next(iterator, _EXHAUSTED)
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+        if item is _EXHAUSTED:
+            return
+        yield item
+
+class lazy_property:
+    """
+    Like functools.cached_property, but the value is built under the instance's
+    `_init_lock` (an RLock), so concurrent first use builds a component only once.
+    Once built, the value lives in the instance __dict__ and the lock is not touched.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        with instance._init_lock:
+            if self.name not in instance.__dict__:
+                instance.__dict__[self.name] = self.factory(instance)
+            return instance.__dict__[self.name]
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (pct in 0-100); 0.0 for an empty list"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
 def create_text_splitter(chunk_size: int, chunk_overlap: int):
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
 
     return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
         length_function=len,
         separators=["\n\n", "\n", ". ", " ", ""]
-    )
\ No newline at end of file
+    )
+
+
+def chunk_document(doc: Document, chunk_size: int, get_splitter: Callable) -> tuple:
+    """
+    (chunks, was_split) for one Document, each chunk tagged with a stable chunk_id
+    "{row_key}_{i}". A text that fits in chunk_size passes straight through
+    as a single chunk; get_splitter() builds or returns the text splitter and is
+    only called for oversize texts.
+    """
+    row_key = doc.metadata['row_key']
+    if len(doc.page_content) <= chunk_size:
+        # Same result the splitter gives for a text under the limit
+        return [Document(
+            page_content=doc.page_content.strip(),
+            metadata={**doc.metadata, "chunk_id": f"{row_key}_0"}
+        )], False
+    chunks = get_splitter().split_documents([doc])
+    for i, chunk in enumerate(chunks):
+        chunk.metadata = doc.metadata.copy()
+        chunk.metadata["chunk_id"] = f"{row_key}_{i}"
+    return chunks, True
+
+
+def unique_row_keys(chunks: Iterable[Document]) -> Iterator[Document]:
+    """
+    Make row keys (and so chunk ids) unique across the whole CSV, in row order: the
+    n-th repeat of a key, i.e. a duplicated row, becomes "{row_key}~{n}". Chunks of
+    one row arrive together, so a new row starts wherever row_index changes.
+    """
+    seen = {}
+    row_index = repeat = None
+    for chunk in chunks:
+        metadata = chunk.metadata
+        if metadata["row_index"] != row_index:
+            row_index = metadata["row_index"]
+            repeat = seen.get(metadata["row_key"], 0)
+            seen[metadata["row_key"]] = repeat + 1
+        if repeat:
+            row_key = f"{metadata['row_key']}~{repeat}"
+            metadata["chunk_id"] = row_key + metadata["chunk_id"][len(metadata["row_key"]):]
+            metadata["row_key"] = row_key
+        yield chunk